@@ -43,11 +43,14 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'mysite.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'mysite.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mysite.middleware.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,9 +83,127 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # reads of clients, projects, tasks and time entries, and reports,
+    # exports and the dashboard (mysite.db). The same file by default;
+    # point NAME at a replica to move those reads off the primary.
+    'readonly': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Alias read_alias() hands out for read-only queries; its connections are
+# opened with PRAGMA query_only
+READ_DATABASE = 'readonly'
+
+DATABASE_ROUTERS = ['mysite.db.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write, so it
+# sees its own writes while the replica catches up
+REPLICA_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection (mysite.db). WAL lets reads run
+# while time entries are written; busy_timeout (ms) makes writers queue
+# for the lock rather than fail with "database is locked". A negative
+# cache_size is in KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+}
+
+
+# Tenant resolution (mysite.middleware.TenantMiddleware)
+# The tenant comes from a subdomain of TENANT_BASE_DOMAIN, or from the
+# TENANT_HEADER header holding the tenant's subdomain.
+
+TENANT_BASE_DOMAIN = None
+TENANT_HEADER = 'X-Tenant'
+TENANT_CACHE_TTL = 300
+TENANT_LOCAL_CACHE_TTL = 30
+TENANT_LOCAL_CACHE_SIZE = 1024
+
+# Locmem is per process, so a write only invalidates the cached responses
+# of the process that served it; with several workers point this at a
+# shared backend, e.g. django.core.cache.backends.filebased.FileBasedCache
+# with LOCATION set to a directory all workers can write.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Seconds a tenant's /api/dashboard/summary/ response is cached
+DASHBOARD_CACHE_TTL = 30
+
+# Threads (and so database connections per process) the async dashboard
+# and report views spread their queries over (mysite.querypool)
+ASYNC_QUERY_WORKERS = 4
+
+# Seconds a cached client/project list or detail response is kept; any
+# write to the tenant's data invalidates it earlier (mysite.responsecache)
+API_CACHE_TTL = 300
+
+# Project and task lists render from values_list() rows (mysite.rowplans)
+# instead of instantiating models and serializer fields per row
+ROW_PLAN_LISTS = True
+
+# Background jobs (mysite.jobs, run by `manage.py run_workers`).
+# JOB_TENANT_CONCURRENCY caps one tenant's running jobs. A worker renews
+# its running job's lease every JOB_HEARTBEAT_SECONDS; a job whose lease
+# is not renewed for JOB_LEASE_SECONDS is taken to have lost its worker
+# and is retried. A failed attempt waits JOB_RETRY_DELAY seconds, doubled
+# for every further attempt.
+JOB_TENANT_CONCURRENCY = 2
+JOB_LEASE_SECONDS = 300
+JOB_HEARTBEAT_SECONDS = 60
+JOB_RETRY_DELAY = 30
+JOB_POLL_SECONDS = 1.0
+
+# Where export_tenant_data jobs write their files; GET /api/jobs/<id>/download/
+# serves them
+EXPORT_ROOT = BASE_DIR / 'exports'
+
+# Per-request query counting (mysite.middleware.QueryCountMiddleware).
+# Requests running more queries than their budget are logged. Budgets are
+# per URL name for GET/HEAD and per "<METHOD> <name>" for other methods,
+# with QUERY_BUDGET for the rest, and leave room for the
+# session/authentication lookups. QUERY_COUNT_HEADERS adds X-Query-Count
+# and a Server-Timing db metric to every non-streaming response.
+QUERY_COUNT_HEADERS = True
+QUERY_BUDGET = 12
+QUERY_BUDGETS = {
+    'client-list': 5,
+    'client-detail': 6,
+    'project-list': 5,
+    'project-detail': 8,
+    'task-list': 4,
+    'task-detail': 5,
+    'time-entry-list': 4,
+    'invoice-list': 4,
+    'invoice-detail': 6,
+    # copying a project is a fixed series of bulk writes
+    'POST project-clone': 16,
+    'POST project-template-instantiate': 16,
+    # a locked numbering read and a handful of bulk writes per 500 clients
+    'POST invoice-generate': 20,
+    # the delete collector visits every relation of the cascade
+    'DELETE client-detail': 40,
+    'DELETE project-detail': 30,
+}
+
+REST_FRAMEWORK = {
+    # orjson-backed, byte-compatible with the stock JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'mysite.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
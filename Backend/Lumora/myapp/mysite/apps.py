@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MysiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mysite'
+
+    def ready(self):
+        # connect the SQLite tuning, query counting, rollup counter, tenant
+        # cache, response cache and search index signal handlers
+        from . import db, querycount, responsecache, rollups, search, tenancy  # noqa: F401
@@ -0,0 +1,312 @@
+"""Tenant archives: a whole tenant as a stream of NDJSON lines.
+
+An archive starts with a header line, then holds one section per model in
+``SECTIONS`` order, parents before children. Each section is a series of
+chunk lines ``{"model", "fields", "rows"}`` of at most ``chunk_size`` rows,
+and a trailer line carries the row count of every section, so a truncated
+archive is refused. Archives may be gzipped; ``open_archive`` tells them
+apart by their first bytes.
+
+Writing streams every section with ``values_list().iterator()``; each
+model is read up to the largest primary key it had when the export
+started, so rows added meanwhile cannot reference parents missing from
+the archive. Loading goes a chunk at a time through ``bulk_create`` in
+the same order. Rows get new primary keys, and foreign keys are remapped
+through the old-to-new ids of the parents loaded before them. Only those
+maps stay in memory, not the rows.
+
+Users are global: they are matched by username, and the missing ones are
+created without a usable password. Derived data (daily rollups, search
+documents) is rebuilt after loading rather than archived.
+"""
+import gzip
+import json
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from . import tenancy
+from .models import (
+    Client, ClientContact, Invoice, InvoiceLine, Project, Task, Tenant, TenantMembership, TimeEntry,
+)
+from .responsecache import bump_tenant_version
+from .rollups import rebuild_daily_rollups
+from .search import rebuild_index
+
+User = get_user_model()
+
+ARCHIVE_FORMAT = 'lumora-tenant-archive'
+ARCHIVE_VERSION = 1
+
+# (section, model, lookup from the model to its tenant); users are
+# exported as far as the other sections reference them
+SECTIONS = [
+    ('user', User, None),
+    ('tenant', Tenant, 'pk'),
+    ('membership', TenantMembership, 'tenant'),
+    ('client', Client, 'tenant'),
+    ('client_contact', ClientContact, 'client__tenant'),
+    ('project', Project, 'tenant'),
+    ('project_member', Project.assigned_to.through, 'project__tenant'),
+    ('task', Task, 'project__tenant'),
+    ('invoice', Invoice, 'tenant'),
+    ('invoice_line', InvoiceLine, 'invoice__tenant'),
+    ('time_entry', TimeEntry, 'task__project__tenant'),
+]
+SECTION_MODELS = dict((name, model) for name, model, _ in SECTIONS)
+
+# no password hashes or permissions leave the source environment
+USER_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name']
+
+# models whose old -> new ids must be kept while loading
+REFERENCED = {
+    field.related_model
+    for _, model, _ in SECTIONS
+    for field in model._meta.concrete_fields
+    if field.is_relation
+}
+
+
+def _foreign_keys(model):
+    return [field for field in model._meta.concrete_fields if field.is_relation]
+
+
+def _fields(model):
+    if model is User:
+        return USER_FIELDS
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _line(data):
+    return json.dumps(data, separators=(',', ':'), default=_encode) + '\n'
+
+
+def open_archive(path, mode='r', compress=None):
+    """Open an archive file as text; ``compress`` defaults to a ``.gz`` suffix.
+
+    Reading detects gzip from the file itself.
+    """
+    if mode == 'r':
+        with open(path, 'rb') as handle:
+            compress = handle.read(2) == b'\x1f\x8b'
+    elif compress is None:
+        compress = str(path).endswith('.gz')
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8', newline='\n')
+
+
+def _section_querysets(tenant):
+    "section -> queryset of the tenant's rows, each capped at its current largest pk"
+    querysets = {}
+    for name, model, lookup in SECTIONS[1:]:
+        queryset = model.objects.filter(**{lookup: tenant.pk})
+        ceiling = queryset.aggregate(last=Max('pk'))['last']
+        querysets[name] = queryset.filter(pk__lte=ceiling or 0)
+    referenced_users = Q(pk=tenant.owner_id)
+    for name, model, _ in SECTIONS[1:]:
+        for field in _foreign_keys(model):
+            if field.related_model is User:
+                referenced_users |= Q(pk__in=querysets[name].values(field.attname))
+    return {'user': User.objects.filter(referenced_users), **querysets}
+
+
+def archive_lines(tenant, chunk_size=5000, counts=None):
+    "Yield the lines of ``tenant``'s archive, counting the rows of each section into ``counts``"
+    yield _line({
+        'archive': ARCHIVE_FORMAT, 'version': ARCHIVE_VERSION,
+        'tenant': tenant.subdomain, 'exported_at': timezone.now(),
+    })
+    counts = {} if counts is None else counts
+    for name, queryset in _section_querysets(tenant).items():
+        fields = _fields(queryset.model)
+        rows, counts[name] = [], 0
+        for row in queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size):
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield _line({'model': name, 'fields': fields, 'rows': rows})
+                counts[name] += len(rows)
+                rows = []
+        if rows:
+            yield _line({'model': name, 'fields': fields, 'rows': rows})
+            counts[name] += len(rows)
+    yield _line({'counts': counts})
+
+
+def write_archive(tenant, handle, chunk_size=5000):
+    "Write ``tenant``'s archive to the text file ``handle``; returns the row counts"
+    counts = {}
+    handle.writelines(archive_lines(tenant, chunk_size, counts))
+    return counts
+
+
+class ArchiveError(ValueError):
+    "the archive is malformed, truncated or does not fit this database"
+
+
+@contextmanager
+def _archived_timestamps():
+    """Let bulk_create keep the archived auto_now/auto_now_add values.
+
+    The flags live on the shared model fields, so nothing else in the
+    process should be saving these models meanwhile (the loader runs from
+    a management command).
+    """
+    fields = [
+        field
+        for _, model, _ in SECTIONS
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class _Loader:
+    "loads an archive's chunks into new rows, remapping ids as it goes"
+
+    def __init__(self, subdomain, name):
+        self.subdomain = subdomain
+        self.name = name
+        self.maps = {model: {} for model in REFERENCED}
+        self.counts = {}
+        self.tenant = None
+        self._converters = {}
+
+    def converters(self, model, fields):
+        "per column: the function turning its JSON value back into a Python one"
+        key = (model, tuple(fields))
+        if key not in self._converters:
+            by_attname = {field.attname: field for field in model._meta.concrete_fields}
+            unknown = set(fields) - set(by_attname)
+            if unknown:
+                raise ArchiveError(f"{model.__name__} has no {', '.join(sorted(unknown))}")
+            converters = []
+            for attname in fields:
+                field = by_attname[attname]
+                if isinstance(field, (models.DateField, models.DecimalField)):
+                    converters.append(field.to_python)
+                else:
+                    converters.append(None)
+            self._converters[key] = converters
+        return self._converters[key]
+
+    def remap(self, model, field, old):
+        if old is None:
+            return None
+        try:
+            return self.maps[field.related_model][old]
+        except KeyError:
+            raise ArchiveError(
+                f'{model.__name__}.{field.name} references a missing '
+                f'{field.related_model.__name__} {old}'
+            )
+
+    def load(self, section, fields, rows):
+        model = SECTION_MODELS.get(section)
+        if model is None:
+            raise ArchiveError(f'Unknown section {section!r}')
+        self.counts[section] = self.counts.get(section, 0) + len(rows)
+        if model is User:
+            return self.load_users(fields, rows)
+        converters = self.converters(model, fields)
+        foreign_keys = {field.attname: field for field in _foreign_keys(model)}
+        old_ids, instances = [], []
+        for row in rows:
+            values = {}
+            for attname, convert, value in zip(fields, converters, row):
+                if attname == 'id':
+                    old_ids.append(value)
+                    continue
+                if attname in foreign_keys:
+                    value = self.remap(model, foreign_keys[attname], value)
+                elif convert is not None and value is not None:
+                    value = convert(value)
+                values[attname] = value
+            instances.append(model(**values))
+        if model is Tenant:
+            if len(instances) != 1:
+                raise ArchiveError('An archive holds exactly one tenant')
+            tenant = instances[0]
+            tenant.subdomain = self.subdomain or tenant.subdomain
+            tenant.name = self.name or tenant.name
+            if Tenant.objects.filter(subdomain=tenant.subdomain).exists():
+                raise ArchiveError(f'A tenant {tenant.subdomain!r} already exists')
+            self.tenant = tenant
+        created = model.objects.bulk_create(instances)
+        if model in self.maps:
+            self.maps[model].update(zip(old_ids, (instance.pk for instance in created)))
+
+    def load_users(self, fields, rows):
+        archived = [dict(zip(fields, row)) for row in rows]
+        existing = dict(
+            User.objects.filter(username__in=[user['username'] for user in archived])
+            .values_list('username', 'pk')
+        )
+        for user in archived:
+            pk = existing.get(user['username'])
+            if pk is None:
+                created = User(**{name: value for name, value in user.items() if name != 'id'})
+                created.set_unusable_password()
+                # save() rather than bulk_create, for the profile signal
+                created.save()
+                pk = created.pk
+            self.maps[User][user['id']] = pk
+
+
+def read_archive(handle, subdomain=None, name=None):
+    """Load the archive in the text file ``handle`` as a new tenant.
+
+    ``subdomain`` and ``name`` override the archived ones. Everything is
+    loaded in one transaction, so a failed load leaves nothing behind.
+    Returns the tenant and the row counts.
+    """
+    header = json.loads(next(iter(handle), '{}') or '{}')
+    if header.get('archive') != ARCHIVE_FORMAT:
+        raise ArchiveError('Not a tenant archive')
+    if header.get('version') != ARCHIVE_VERSION:
+        raise ArchiveError(f"Unsupported archive version {header.get('version')!r}")
+    loader = _Loader(subdomain, name)
+    expected = None
+    with transaction.atomic(), _archived_timestamps():
+        for line in handle:
+            data = json.loads(line)
+            if 'counts' in data:
+                expected = data['counts']
+                break
+            loader.load(data['model'], data['fields'], data['rows'])
+        if expected is None or {k: v for k, v in expected.items() if v} != loader.counts:
+            raise ArchiveError('The archive is truncated')
+        if loader.tenant is None:
+            raise ArchiveError('The archive holds no tenant')
+        tenant = loader.tenant
+        dates = TimeEntry.objects.filter(task__project__tenant=tenant).aggregate(
+            first=Min('date'), last=Max('date'),
+        )
+        if dates['first'] is not None:
+            rebuild_daily_rollups(dates['first'], dates['last'], tenant)
+        rebuild_index(tenant)
+    # bulk_create sends no post_save, and a lookup of the subdomain made
+    # before the import is cached as a miss
+    tenancy.forget_tenant(tenant.subdomain)
+    bump_tenant_version(tenant.pk)
+    return tenant, loader.counts
@@ -0,0 +1,87 @@
+"""Async variants of the dashboard and report endpoints.
+
+Under ASGI these run their independent queries concurrently on the query
+pool (mysite.querypool) instead of holding a worker thread for the whole
+request. DRF views cannot be async, so authentication goes through DRF's
+``Request`` in a thread and the response is rendered directly; the JSON
+is byte-for-byte what the sync views return.
+"""
+from functools import wraps
+
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .dashboard import aget_summary
+from .querypool import run_in_pool
+from .renderers import FastJSONRenderer
+from .reports import time_report
+from .tenancy import attach_membership
+from .views import dashboard_params, report_params
+
+
+def _render(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _error(exc, authenticators):
+    response = _render(
+        exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail},
+        exc.status_code,
+    )
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        # same rule as APIView: 401 when the first authenticator can challenge
+        header = authenticators[0].authenticate_header(None) if authenticators else None
+        if header:
+            response['WWW-Authenticate'] = header
+        else:
+            response.status_code = 403
+    return response
+
+
+def _get_tenant(request, authenticators):
+    """The active tenant of the request's user, authenticated the way DRF views are.
+
+    Raises the same exceptions TenantScopedMixin does.
+    """
+    user = Request(request, authenticators=authenticators).user
+    if not user or not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    if getattr(request, 'tenant', None) is not None:
+        # TenantMiddleware cannot see users that DRF authenticates itself
+        if getattr(request, 'tenant_membership', None) is None:
+            attach_membership(request, user)
+        if request.tenant_membership is None:
+            raise exceptions.PermissionDenied('You are not a member of this tenant.')
+    tenant = getattr(user, 'current_tenant', None)
+    if tenant is None:
+        raise exceptions.PermissionDenied('No active tenant.')
+    return tenant
+
+
+def tenant_view(view):
+    "GET-only async view called as ``view(request, tenant)``, with DRF-style errors"
+    @wraps(view)
+    async def wrapper(request):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            tenant = await run_in_pool(_get_tenant, request, authenticators)
+            return _render(await view(request, tenant))
+        except exceptions.APIException as exc:
+            return _error(exc, authenticators)
+    return wrapper
+
+
+@tenant_view
+async def dashboard_summary(request, tenant):
+    "DashboardSummaryView with the summary sections built concurrently"
+    return await aget_summary(tenant, **dashboard_params(request.GET))
+
+
+@tenant_view
+async def time_report_view(request, tenant):
+    "TimeReportView run on the query pool"
+    return await run_in_pool(time_report, tenant, **report_params(request.GET))
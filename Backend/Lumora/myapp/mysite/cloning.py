@@ -0,0 +1,115 @@
+"""Project cloning and project templates.
+
+A clone copies a project with its tasks and members; a template keeps the
+same structure with its dates as day offsets from the project start.
+Tasks and member rows are written with ``bulk_create``, so copying a
+project costs the same handful of queries whatever its size.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import Project, ProjectTemplate, Task, TaskTemplate
+from .responsecache import bump_tenant_version
+from .search import index_objects
+
+# task columns carried over as they are
+TASK_FIELDS = ('title', 'description', 'priority', 'hours_estimated')
+
+
+def _shift(day, delta):
+    return None if day is None else day + delta
+
+
+def _create_project(tenant_id, client_id, user, tasks, member_ids, **fields):
+    "a new project with ``tasks`` (unsaved Tasks) and ``member_ids`` in its assigned_to"
+    with transaction.atomic():
+        # bulk_create skips the rollup handlers, so start the counter here
+        project = Project.objects.create(
+            tenant_id=tenant_id, client_id=client_id, created_by=user, task_count=len(tasks), **fields
+        )
+        for task in tasks:
+            task.project = project
+            task.created_by = user
+        Task.objects.bulk_create(tasks)
+        Members = Project.assigned_to.through
+        Members.objects.bulk_create(Members(project=project, user_id=pk) for pk in member_ids)
+        index_objects('task', Task.objects.filter(project=project))
+    # neither bulk_create sends post_save
+    bump_tenant_version(tenant_id)
+    return project
+
+
+def clone_project(source, start_date, user, client=None, name=None):
+    """Copy ``source`` with its tasks and members to start on ``start_date``.
+
+    Every date moves by the difference between the two start dates. The
+    copy starts in planning, with its tasks to do and nothing logged.
+    """
+    delta = start_date - source.start_date
+    tasks = [
+        Task(**dict(zip(TASK_FIELDS, values)), due_date=_shift(due_date, delta), assigned_to_id=assignee)
+        for *values, due_date, assignee in source.tasks.order_by('pk').values_list(
+            *TASK_FIELDS, 'due_date', 'assigned_to_id'
+        )
+    ]
+    member_ids = Project.assigned_to.through.objects.filter(project=source).values_list('user_id', flat=True)
+    return _create_project(
+        source.tenant_id, client.pk if client is not None else source.client_id, user,
+        tasks, list(member_ids),
+        name=name or f'{source.name} (copy)',
+        description=source.description,
+        priority=source.priority,
+        start_date=start_date,
+        end_date=_shift(source.end_date, delta),
+        estimated_hours=source.estimated_hours,
+        hourly_rate=source.hourly_rate,
+        budget=source.budget,
+    )
+
+
+def create_template(project, user, name=None):
+    "Save ``project``'s structure as a template of the same tenant"
+    with transaction.atomic():
+        template = ProjectTemplate.objects.create(
+            tenant_id=project.tenant_id,
+            name=name or project.name,
+            description=project.description,
+            priority=project.priority,
+            estimated_hours=project.estimated_hours,
+            # an end date before the start (the API allows it) becomes 0 days:
+            # projects made from the template start and end on the same day
+            duration_days=max(0, (project.end_date - project.start_date).days) if project.end_date else None,
+            created_by=user,
+        )
+        TaskTemplate.objects.bulk_create(
+            TaskTemplate(
+                template=template, **dict(zip(TASK_FIELDS, values)),
+                due_offset_days=(due_date - project.start_date).days if due_date else None,
+            )
+            for *values, due_date in project.tasks.order_by('pk').values_list(*TASK_FIELDS, 'due_date')
+        )
+    return template
+
+
+def instantiate_template(template, client, start_date, user, name=None):
+    "A new project for ``client`` from ``template``, starting on ``start_date``"
+    tasks = [
+        Task(
+            **dict(zip(TASK_FIELDS, values)),
+            due_date=start_date + timedelta(days=offset) if offset is not None else None,
+        )
+        for *values, offset in template.tasks.values_list(*TASK_FIELDS, 'due_offset_days')
+    ]
+    return _create_project(
+        template.tenant_id, client.pk, user, tasks, [],
+        name=name or template.name,
+        description=template.description,
+        priority=template.priority,
+        start_date=start_date,
+        end_date=(
+            start_date + timedelta(days=template.duration_days)
+            if template.duration_days is not None else None
+        ),
+        estimated_hours=template.estimated_hours,
+    )
@@ -0,0 +1,124 @@
+"""Aggregated dashboard summary.
+
+One response with the handful of counts and recent rows the dashboard
+shows, built from a few aggregate queries instead of full list payloads,
+and cached per tenant for ``DASHBOARD_CACHE_TTL`` seconds or until the
+tenant's data changes.
+
+The sections are independent, so ``aget_summary`` builds them
+concurrently on the query pool for the async view.
+"""
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .db import read_alias
+from .models import Client, DailyTimeRollup, Invoice, Project
+from .querypool import run_in_pool
+from .responsecache import tenant_version
+from .serializer import ClientListSerializer, InvoiceListSerializer, ProjectListSerializer
+
+
+def clients_section(tenant, recent):
+    clients = Client.objects.using(read_alias()).filter(tenant=tenant)
+    return {
+        'count': clients.count(),
+        'recent': ClientListSerializer(
+            clients.with_stats().order_by('-created_at', '-id')[:recent], many=True
+        ).data,
+    }
+
+
+def projects_section(tenant, recent):
+    projects = Project.objects.using(read_alias()).filter(tenant=tenant)
+    counts = projects.aggregate(
+        total=Count('pk'),
+        open=Count('pk', filter=~Q(status='completed')),
+    )
+    return {
+        'count': counts['total'],
+        'open': counts['open'],
+        'recent': ProjectListSerializer(
+            projects.for_listing().order_by('-created_at', '-id')[:recent], many=True
+        ).data,
+    }
+
+
+def hours_section(tenant, recent):
+    "hours logged this week and this month, from the daily rollups"
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    zero = Decimal('0.00')
+    return DailyTimeRollup.objects.using(read_alias()).filter(
+        tenant=tenant, date__gte=min(week_start, month_start), date__lte=today,
+    ).aggregate(
+        this_week=Coalesce(Sum('hours', filter=Q(date__gte=week_start)), zero),
+        this_month=Coalesce(Sum('hours', filter=Q(date__gte=month_start)), zero),
+    )
+
+
+def invoices_section(tenant, recent):
+    invoices = Invoice.objects.using(read_alias()).filter(tenant=tenant)
+    outstanding = invoices.filter(status__in=Invoice.OUTSTANDING_STATUSES).aggregate(
+        count=Count('pk'),
+        total=Coalesce(Sum('total'), Decimal('0.00')),
+    )
+    return {
+        'outstanding_count': outstanding['count'],
+        'outstanding_total': outstanding['total'],
+        'recent': InvoiceListSerializer(
+            invoices.select_related('client').order_by('-issue_date', '-id')[:recent], many=True
+        ).data,
+    }
+
+
+SECTIONS = {
+    'clients': clients_section,
+    'projects': projects_section,
+    'hours': hours_section,
+    'invoices': invoices_section,
+}
+
+
+def build_summary(tenant, recent=3):
+    return {name: section(tenant, recent) for name, section in SECTIONS.items()}
+
+
+async def abuild_summary(tenant, recent=3):
+    "build_summary() with every section's queries running concurrently"
+    results = await asyncio.gather(*(
+        run_in_pool(section, tenant, recent) for section in SECTIONS.values()
+    ))
+    return dict(zip(SECTIONS, results))
+
+
+def _summary_key(tenant, recent):
+    # the data version retires the summary as soon as the tenant's data changes
+    return f'dashboard:summary:{tenant.pk}:{tenant_version(tenant.pk)}:{recent}'
+
+
+def get_summary(tenant, recent=3):
+    "build_summary() through the per-tenant cache"
+    key = _summary_key(tenant, recent)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(tenant, recent)
+        cache.set(key, summary, getattr(settings, 'DASHBOARD_CACHE_TTL', 30))
+    return summary
+
+
+async def aget_summary(tenant, recent=3):
+    "abuild_summary() through the same cache as get_summary()"
+    key = await run_in_pool(_summary_key, tenant, recent)
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = await abuild_summary(tenant, recent)
+        await cache.aset(key, summary, getattr(settings, 'DASHBOARD_CACHE_TTL', 30))
+    return summary
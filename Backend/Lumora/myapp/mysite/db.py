@@ -0,0 +1,125 @@
+"""SQLite connection tuning, the read alias and replica routing.
+
+Every new SQLite connection gets the ``SQLITE_PRAGMAS`` from settings.
+WAL lets readers carry on while a time entry is being written, and
+``busy_timeout`` makes writers wait for the lock instead of failing with
+"database is locked". Connections of the ``READ_DATABASE`` alias are also
+made ``query_only``, so a stray write through them fails loudly.
+
+Point ``READ_DATABASE`` at a replica and ``ReplicaRouter`` sends reads of
+clients, projects, tasks and time entries there; read-only endpoints
+(reports, exports, the dashboard) query it explicitly through
+``read_alias()``. Writes always go to the primary. A request or job that
+writes is pinned to the primary for the rest of it, and
+``ReplicaPinMiddleware`` keeps the user's following requests there for
+``REPLICA_PIN_SECONDS`` so they read their own writes while the replica
+catches up.
+
+The pin is set by an execute wrapper when an INSERT, UPDATE or DELETE
+actually runs, rather than when the router is asked for the write alias:
+``get_or_create()`` and ``validate_constraints()`` ask without writing,
+and ``update()``, ``bulk_create()`` and raw deletes write without sending
+any model signal.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(alias):
+    "the PRAGMA statements for a new connection of ``alias``"
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if alias == getattr(settings, 'READ_DATABASE', None):
+        # nothing to switch to WAL from a connection that cannot write
+        pragmas.pop('journal_mode', None)
+        pragmas['query_only'] = 'on'
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(connection.alias):
+            cursor.execute(statement)
+
+
+# contextvars rather than thread locals, so the state follows a request
+# through sync_to_async and the query pool
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+# models whose reads ReplicaRouter sends to the read alias
+REPLICA_MODELS = {'mysite.client', 'mysite.project', 'mysite.task', 'mysite.timeentry'}
+
+
+def pin_to_primary(wrote=False):
+    "Send the rest of the current request's reads to the primary"
+    _pinned.set(True)
+    if wrote:
+        _wrote.set(True)
+
+
+def start_request(pinned):
+    "Reset the pinning state at the start of a request or a job"
+    _pinned.set(pinned)
+    _wrote.set(False)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def pin_on_write(execute, sql, params, many, context):
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        pin_to_primary(wrote=True)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_write_pin(sender, connection, **kwargs):
+    if pin_on_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(pin_on_write)
+
+
+def read_alias():
+    """The alias for read-only queries.
+
+    That is the primary while the request is pinned to it, and inside a
+    transaction, so the transaction's own writes are visible.
+    """
+    alias = getattr(settings, 'READ_DATABASE', None)
+    if alias is None or _pinned.get() or connections['default'].in_atomic_block:
+        return 'default'
+    return alias
+
+
+class ReplicaRouter:
+    "reads of REPLICA_MODELS from read_alias(), every write to the primary"
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in REPLICA_MODELS:
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', getattr(settings, 'READ_DATABASE', None) or 'default'}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from the primary
+        if db == getattr(settings, 'READ_DATABASE', None):
+            return False
+        return None
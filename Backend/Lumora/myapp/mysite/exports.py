@@ -0,0 +1,152 @@
+"""Streaming CSV / NDJSON exports of tenant data.
+
+Rows are read with ``values().iterator(chunk_size=...)`` and encoded one
+line at a time, so memory stays flat whatever the export size and the
+first bytes go out before the query has been fully consumed.
+"""
+import csv
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+
+from .db import read_alias
+from .models import Project, TimeEntry
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column name, values() lookup)
+TIME_ENTRY_COLUMNS = [
+    ('id', 'id'),
+    ('date', 'date'),
+    ('hours', 'hours'),
+    ('description', 'description'),
+    ('user_id', 'user_id'),
+    ('user_email', 'user__email'),
+    ('task_id', 'task_id'),
+    ('task_title', 'task__title'),
+    ('project_id', 'task__project_id'),
+    ('project_name', 'task__project__name'),
+    ('client_name', 'task__project__client__name'),
+    ('created_at', 'created_at'),
+]
+
+PROJECT_COLUMNS = [
+    ('id', 'id'),
+    ('name', 'name'),
+    ('status', 'status'),
+    ('priority', 'priority'),
+    ('client_id', 'client_id'),
+    ('client_name', 'client__name'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+    ('estimated_hours', 'estimated_hours'),
+    ('hourly_rate', 'hourly_rate'),
+    ('budget', 'budget'),
+    ('task_count', 'task_count'),
+    ('completed_task_count', 'completed_task_count'),
+    ('hours_logged_total', 'hours_logged_total'),
+    ('created_at', 'created_at'),
+]
+
+
+def time_entry_export_queryset(tenant, start=None, end=None, project_id=None):
+    queryset = TimeEntry.objects.using(read_alias()).filter(task__project__tenant=tenant)
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    if project_id is not None:
+        queryset = queryset.filter(task__project_id=project_id)
+    return queryset.order_by('date', 'id')
+
+
+def project_export_queryset(tenant, start=None, end=None, project_id=None):
+    "projects whose start_date falls in the range"
+    queryset = Project.objects.using(read_alias()).filter(tenant=tenant)
+    if start is not None:
+        queryset = queryset.filter(start_date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(start_date__lte=end)
+    if project_id is not None:
+        queryset = queryset.filter(pk=project_id)
+    return queryset.order_by('id')
+
+
+EXPORTS = {
+    'time-entries': (time_entry_export_queryset, TIME_ENTRY_COLUMNS),
+    'projects': (project_export_queryset, PROJECT_COLUMNS),
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    "Yield export rows as ``{column: value}`` dicts without caching the queryset"
+    lookups = [lookup for _, lookup in columns]
+    for row in queryset.values(*lookups).iterator(chunk_size=chunk_size):
+        yield {name: _plain(row[lookup]) for name, lookup in columns}
+
+
+class _Echo:
+    "file-like object whose write() hands the line back to the csv writer"
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow([row[name] for name, _ in columns])
+
+
+def ndjson_lines(rows, columns=None):
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+def stream_export(resource, fmt, tenant, start=None, end=None, project_id=None, chunk_size=2000):
+    "Lines of the requested export, ready for a StreamingHttpResponse or a file"
+    build_queryset, columns = EXPORTS[resource]
+    rows = iter_rows(build_queryset(tenant, start, end, project_id), columns, chunk_size)
+    encode = csv_lines if fmt == 'csv' else ndjson_lines
+    return encode(rows, columns)
+
+
+def export_path(name):
+    "where the export file ``name`` lives, under ``EXPORT_ROOT``"
+    return os.path.join(settings.EXPORT_ROOT, os.path.basename(name))
+
+
+def write_export_file(name, lines, progress=None, every=2000):
+    """Write ``lines`` to the export file ``name``; returns the number of lines.
+
+    The lines go to a temporary file that replaces ``name`` once complete,
+    so a reader never sees half an export. ``progress(lines_written)`` is
+    called every ``every`` lines.
+    """
+    path = export_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.partial'
+    count = 0
+    with open(partial, 'w', newline='', encoding='utf-8') as handle:
+        for line in lines:
+            handle.write(line)
+            count += 1
+            if progress is not None and count % every == 0:
+                progress(count)
+    os.replace(partial, path)
+    return count
@@ -0,0 +1,216 @@
+"""Batch invoice generation from unbilled time entries.
+
+The tenant's unbilled hours are grouped per client, project and task a
+chunk of clients at a time; invoices and lines are written with
+``bulk_create`` and the billed entries are stamped with their invoice
+line. Entries already stamped are never billed again, so re-running a
+period only picks up hours logged since the last run. Invoices are
+numbered ``INV-000001`` on from the integer ``Invoice.sequence`` of the
+tenant's last generated invoice, never from the text of the numbers.
+
+Each chunk is read, written and stamped in one transaction that holds the
+tenant's row, so runs of one tenant that overlap (two invoice jobs, or a
+job retried while its first attempt is still going) cannot both bill the
+same hours; a chunk whose entries are billed or removed by anything else
+meanwhile is rolled back with ``BillingConflict``.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+from .models import Invoice, InvoiceLine, Tenant, TimeEntry
+from .responsecache import bump_tenant_version
+
+CENT = Decimal('0.01')
+NUMBER_PREFIX = 'INV-'
+
+
+class BillingConflict(RuntimeError):
+    "time entries of an invoice chunk were billed or removed meanwhile; the chunk was rolled back"
+
+
+def _lock_tenant(tenant):
+    """Hold ``tenant``'s row until the transaction ends, so invoice runs
+    of one tenant number their invoices one after the other.
+
+    A no-op UPDATE rather than select_for_update(): it locks the row on
+    PostgreSQL as well, and as the first statement of the transaction it
+    takes SQLite's write lock before anything is read, where a read first
+    would make the later lock upgrade fail.
+    """
+    Tenant.objects.filter(pk=tenant.pk).update(is_active=F('is_active'))
+
+
+def _next_numbers(tenant, count):
+    """``count`` (sequence, invoice number) pairs following ``tenant``'s last
+    generated invoice, to be taken with the tenant locked.
+
+    Numbers already used by invoices entered by hand or imported are
+    skipped.
+    """
+    last = Invoice.objects.filter(tenant=tenant).aggregate(last=Max('sequence'))['last'] or 0
+    numbers = []
+    while len(numbers) < count:
+        candidates = {
+            f'{NUMBER_PREFIX}{sequence:06d}': sequence
+            for sequence in range(last + 1, last + 1 + count - len(numbers))
+        }
+        taken = set(
+            Invoice.objects.filter(tenant=tenant, invoice_number__in=list(candidates))
+            .values_list('invoice_number', flat=True)
+        )
+        numbers += [(sequence, number) for number, sequence in candidates.items() if number not in taken]
+        last += len(candidates)
+    return numbers
+
+
+def generate_invoices(tenant, period_start, period_end, issue_date=None, due_days=30, chunk_size=500,
+                      progress=None):
+    """Invoice every client of ``tenant`` for unbilled hours in the period.
+
+    Hours are priced at ``Project.hourly_rate``; projects without a rate
+    are left unbilled and counted in ``unpriced_projects``. Returns a
+    summary of what was generated; ``progress(clients_done, clients_total)``
+    is called after every chunk of clients.
+    """
+    issue_date = issue_date or date.today()
+    summary = {
+        'invoices': 0,
+        'lines': 0,
+        'hours': Decimal('0.00'),
+        'total': Decimal('0.00'),
+        'unpriced_projects': 0,
+    }
+    # entries logged while the run is in progress wait for the next run
+    ceiling = TimeEntry.objects.aggregate(last=Max('pk'))['last']
+    if ceiling is None:
+        return summary
+    unbilled = TimeEntry.objects.filter(
+        task__project__tenant=tenant,
+        invoice_line__isnull=True,
+        date__range=(period_start, period_end),
+        pk__lte=ceiling,
+    )
+    summary['unpriced_projects'] = (
+        unbilled.filter(task__project__hourly_rate__isnull=True)
+        .values('task__project_id').distinct().count()
+    )
+    priced = unbilled.filter(task__project__hourly_rate__isnull=False)
+    client_ids = list(
+        priced.order_by('task__project__client_id')
+        .values_list('task__project__client_id', flat=True).distinct()
+    )
+
+    run = _InvoiceRun(tenant, priced, period_start, period_end, issue_date, due_days, ceiling, summary)
+    for offset in range(0, len(client_ids), chunk_size):
+        run.flush(client_ids[offset:offset + chunk_size])
+        if progress is not None:
+            progress(min(offset + chunk_size, len(client_ids)), len(client_ids))
+    if summary['invoices']:
+        # invoices are bulk created, so no post_save bumps the client stats
+        bump_tenant_version(tenant.pk)
+    return summary
+
+
+class _InvoiceRun:
+    "reads, writes and stamps one chunk of clients' invoices per transaction"
+
+    def __init__(self, tenant, priced, period_start, period_end, issue_date, due_days, ceiling, summary):
+        self.tenant = tenant
+        self.priced = priced
+        self.period_start = period_start
+        self.period_end = period_end
+        self.issue_date = issue_date
+        self.due_date = issue_date + timedelta(days=due_days) if due_days is not None else None
+        self.ceiling = ceiling
+        self.summary = summary
+
+    def unbilled(self, client_ids):
+        "client -> project -> its unbilled hours, rate and tasks"
+        rows = (
+            self.priced.filter(task__project__client_id__in=client_ids)
+            .values(
+                'task__project__client_id', 'task__project_id',
+                'task__project__name', 'task__project__hourly_rate', 'task_id',
+            )
+            .annotate(hours=Sum('hours'), entries=Count('pk'))
+            .order_by('task__project__client_id', 'task__project_id', 'task_id')
+        )
+        clients = {}
+        for row in rows:
+            project = clients.setdefault(row['task__project__client_id'], {}).setdefault(
+                row['task__project_id'], {
+                    'name': row['task__project__name'],
+                    'rate': row['task__project__hourly_rate'],
+                    'hours': Decimal('0.00'),
+                    'entries': 0,
+                    'tasks': [],
+                },
+            )
+            project['hours'] += row['hours']
+            project['entries'] += row['entries']
+            project['tasks'].append(row['task_id'])
+        return clients
+
+    def flush(self, client_ids):
+        with transaction.atomic():
+            # before anything is read: an overlapping run of the tenant
+            # waits here, then finds the hours it would bill stamped
+            _lock_tenant(self.tenant)
+            clients = self.unbilled(client_ids)
+            numbers = _next_numbers(self.tenant, len(clients))
+            invoices = []
+            for (client_id, projects), (sequence, number) in zip(clients.items(), numbers):
+                subtotal = sum(
+                    ((p['hours'] * p['rate']).quantize(CENT) for p in projects.values()),
+                    Decimal('0.00'),
+                )
+                invoices.append(Invoice(
+                    tenant=self.tenant,
+                    client_id=client_id,
+                    invoice_number=number,
+                    sequence=sequence,
+                    period_start=self.period_start,
+                    period_end=self.period_end,
+                    issue_date=self.issue_date,
+                    due_date=self.due_date,
+                    subtotal=subtotal,
+                    total=subtotal,
+                ))
+            Invoice.objects.bulk_create(invoices)
+
+            lines, line_projects = [], []
+            for invoice, projects in zip(invoices, clients.values()):
+                for project_id, project in projects.items():
+                    lines.append(InvoiceLine(
+                        invoice=invoice,
+                        project_id=project_id,
+                        description=f"{project['name']} ({self.period_start} to {self.period_end})",
+                        hours=project['hours'],
+                        rate=project['rate'],
+                        amount=(project['hours'] * project['rate']).quantize(CENT),
+                    ))
+                    line_projects.append(project)
+            InvoiceLine.objects.bulk_create(lines)
+
+            for line, project in zip(lines, line_projects):
+                stamped = 0
+                tasks = project['tasks']
+                for offset in range(0, len(tasks), 500):
+                    stamped += TimeEntry.objects.filter(
+                        task_id__in=tasks[offset:offset + 500],
+                        invoice_line__isnull=True,
+                        date__range=(self.period_start, self.period_end),
+                        pk__lte=self.ceiling,
+                    ).update(invoice_line=line)
+                if stamped != project['entries']:
+                    raise BillingConflict(
+                        f"{line.description}: {stamped} of {project['entries']} entries were still unbilled"
+                    )
+
+        self.summary['invoices'] += len(invoices)
+        self.summary['lines'] += len(lines)
+        self.summary['hours'] += sum((line.hours for line in lines), Decimal('0.00'))
+        self.summary['total'] += sum((invoice.total for invoice in invoices), Decimal('0.00'))
@@ -0,0 +1,294 @@
+"""Background jobs stored in the database.
+
+Jobs are ``Job`` rows; ``manage.py run_workers`` runs a pool of worker
+processes that claim and run them, so no broker is needed. A claim is a
+single conditional UPDATE from ``queued`` to ``running``: two workers
+racing for the same job cannot both win, and the same statement checks
+the tenant's ``JOB_TENANT_CONCURRENCY``. Where the database has row locks
+the tenant row is locked first, so concurrent claims of one tenant's
+jobs are counted one after the other.
+
+A failing job is retried after ``JOB_RETRY_DELAY`` seconds, doubling per
+attempt, until ``max_attempts``. A running job holds a lease that a
+heartbeat thread renews every ``JOB_HEARTBEAT_SECONDS`` for as long as
+the job function runs, however long one of its steps takes; when the
+lease runs out, the worker is taken to be gone and the job goes back to
+the queue.
+
+Job functions are registered with ``@job(kind, serializer)`` and called
+as ``func(tenant, **payload)``; the serializer validates the payload
+when the job is enqueued and again when it runs.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from .db import start_request
+from .exports import stream_export, write_export_file
+from .invoicing import generate_invoices
+from .models import Job, Tenant
+from .rollups import rebuild_daily_rollups
+from .search import rebuild_index
+from .serializer import (
+    DateRangeSerializer, ExportJobSerializer, InvoiceGenerateSerializer, TenantDeletionSerializer,
+)
+from .tenantdeletion import DELETE_JOB, delete_tenant_data
+
+logger = logging.getLogger(__name__)
+
+# kind -> (function, payload serializer or None)
+JOBS = {}
+
+# how many candidates one claim() tries before giving up
+CLAIM_CANDIDATES = 10
+
+_current_job = ContextVar('current_job', default=None)
+
+
+def job(kind, serializer=None):
+    "Register the decorated function as the job ``kind``"
+    def register(func):
+        JOBS[kind] = (func, serializer)
+        return func
+    return register
+
+
+def validate_payload(kind, payload):
+    "``payload`` checked by the job's serializer, as stored on the Job"
+    func, serializer = JOBS[kind]
+    if serializer is None:
+        return {}
+    checked = serializer(data=payload)
+    checked.is_valid(raise_exception=True)
+    return checked.data
+
+
+def enqueue(kind, tenant=None, payload=None, priority=0, max_attempts=3, created_by=None):
+    "Queue a ``kind`` job; raises ValidationError for an unknown kind or a bad payload"
+    if kind not in JOBS:
+        raise serializers.ValidationError({'kind': [f'Unknown job {kind!r}.']})
+    try:
+        payload = validate_payload(kind, payload or {})
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({'payload': exc.detail})
+    return Job.objects.create(
+        tenant=tenant, kind=kind, payload=payload,
+        priority=priority, max_attempts=max_attempts, created_by=created_by,
+    )
+
+
+def _lease():
+    return timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def _running_for_tenant():
+    "running job count of the tenant of ``OuterRef('tenant')``"
+    running = (
+        Job.objects.filter(tenant=OuterRef('tenant'), status=Job.RUNNING)
+        .order_by().values('tenant').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(running), 0)
+
+
+def _claim_one(pk, tenant_id, worker, limit):
+    claimable = Job.objects.filter(pk=pk, status=Job.QUEUED)
+    if tenant_id is not None:
+        claimable = claimable.annotate(running=_running_for_tenant()).filter(running__lt=limit)
+    return claimable.update(
+        status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+        started_at=timezone.now(), lease_expires=_lease(), progress_done=0, progress_total=None,
+    )
+
+
+def claim(worker):
+    "The next runnable job, now running for ``worker``; None when there is none"
+    limit = settings.JOB_TENANT_CONCURRENCY
+    busy = (
+        Job.objects.filter(status=Job.RUNNING, tenant__isnull=False)
+        .order_by().values('tenant').annotate(n=Count('pk')).filter(n__gte=limit).values('tenant')
+    )
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+        .exclude(tenant__in=busy)
+        .order_by('-priority', 'run_after', 'id')
+        .values_list('pk', 'tenant_id')[:CLAIM_CANDIDATES]
+    )
+    row_locks = connection.features.has_select_for_update
+    for pk, tenant_id in candidates:
+        if tenant_id is not None and row_locks:
+            with transaction.atomic():
+                list(Tenant.objects.select_for_update().filter(pk=tenant_id).values_list('pk'))
+                claimed = _claim_one(pk, tenant_id, worker, limit)
+        else:
+            # SQLite runs one write at a time, so the UPDATE alone is
+            # atomic; a read first would only make its lock upgrade fail
+            claimed = _claim_one(pk, tenant_id, worker, limit)
+        if claimed:
+            return Job.objects.select_related('tenant').get(pk=pk)
+    return None
+
+
+def report_progress(done, total=None):
+    "Record the current job's progress and renew its lease; a no-op outside a job"
+    pk = _current_job.get()
+    if pk is not None:
+        Job.objects.filter(pk=pk, status=Job.RUNNING).update(
+            progress_done=done, progress_total=total, lease_expires=_lease(),
+        )
+
+
+class _Heartbeat(threading.Thread):
+    "renews a claimed job's lease while its worker runs it"
+
+    def __init__(self, claimed):
+        super().__init__(name=f'job-{claimed.pk}-heartbeat', daemon=True)
+        self.pk = claimed.pk
+        self.ours = Job.objects.filter(pk=claimed.pk, status=Job.RUNNING, worker=claimed.worker)
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_SECONDS):
+                try:
+                    self.ours.update(lease_expires=_lease())
+                except DatabaseError:
+                    # e.g. the database is busy; the lease outlasts a few missed beats
+                    logger.warning("Could not renew the lease of job %s", self.pk, exc_info=True)
+        finally:
+            # the thread's own connection
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(claimed):
+    "Run a claimed job and record its outcome"
+    # only while the job is still ours: a lost lease may have handed it on
+    ours = Job.objects.filter(pk=claimed.pk, status=Job.RUNNING, worker=claimed.worker)
+    token = _current_job.set(claimed.pk)
+    # reads go to the replica until the job writes, as in a request
+    start_request(pinned=False)
+    heartbeat = _Heartbeat(claimed)
+    heartbeat.start()
+    # an unknown kind or a bad payload fails the same way every time
+    retry = False
+    try:
+        if claimed.kind not in JOBS:
+            raise LookupError(f'Unknown job {claimed.kind!r}')
+        func, serializer = JOBS[claimed.kind]
+        payload = claimed.payload
+        if serializer is not None:
+            checked = serializer(data=payload)
+            checked.is_valid(raise_exception=True)
+            payload = checked.validated_data
+        retry = True
+        result = func(claimed.tenant, **payload)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", claimed.pk, claimed.kind)
+        error = f'{type(exc).__name__}: {exc}'
+        if retry and claimed.attempts < claimed.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            ours.update(
+                status=Job.QUEUED, error=error, lease_expires=None,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            ours.update(status=Job.FAILED, error=error, lease_expires=None, finished_at=timezone.now())
+    else:
+        ours.update(
+            status=Job.SUCCEEDED, result=result, error='', lease_expires=None, finished_at=timezone.now(),
+        )
+    finally:
+        heartbeat.stop()
+        _current_job.reset(token)
+
+
+def requeue_lost():
+    "Put running jobs whose lease ran out back in the queue, or fail them when out of attempts"
+    lost = Job.objects.filter(status=Job.RUNNING, lease_expires__lt=timezone.now())
+    error = 'Worker lost: the lease expired'
+    retried = lost.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, error=error, lease_expires=None,
+    )
+    failed = lost.update(status=Job.FAILED, error=error, lease_expires=None, finished_at=timezone.now())
+    return retried + failed
+
+
+def worker_name(number=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{number}'
+
+
+def work(worker, stop=None, once=False, poll=None):
+    """Claim and run jobs until ``stop`` (an Event) is set.
+
+    With ``once``, return as soon as there is nothing runnable instead of
+    polling. Returns how many jobs were run.
+    """
+    poll = settings.JOB_POLL_SECONDS if poll is None else poll
+    processed = 0
+    while stop is None or not stop.is_set():
+        # a worker lives as long as a server, so age out connections the
+        # way request_finished does
+        close_old_connections()
+        requeue_lost()
+        claimed = claim(worker)
+        if claimed is None:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll)
+            else:
+                time.sleep(poll)
+            continue
+        run_job(claimed)
+        processed += 1
+    return processed
+
+
+@job('generate_invoices', InvoiceGenerateSerializer)
+def generate_invoices_job(tenant, **params):
+    return generate_invoices(tenant, **params, progress=report_progress)
+
+
+@job('rebuild_daily_rollups', DateRangeSerializer)
+def rebuild_daily_rollups_job(tenant, start, end):
+    return {'rows': rebuild_daily_rollups(start, end, tenant, progress=report_progress)}
+
+
+@job('rebuild_search_index')
+def rebuild_search_index_job(tenant):
+    return rebuild_index(tenant, progress=report_progress)
+
+
+def export_file_name(tenant, job_id, resource, fmt):
+    return f'{tenant.subdomain}-{resource}-{job_id}.{fmt}'
+
+
+@job('export_tenant_data', ExportJobSerializer)
+def export_tenant_data_job(tenant, resource, fmt, start, end, project_id):
+    "an export too large for a streamed response, written under EXPORT_ROOT"
+    name = export_file_name(tenant, _current_job.get(), resource, fmt)
+    lines = stream_export(resource, fmt, tenant, start=start, end=end, project_id=project_id)
+    return {'file': name, 'lines': write_export_file(name, lines, progress=report_progress)}
+
+
+@job(DELETE_JOB, TenantDeletionSerializer)
+def delete_tenant_job(tenant, tenant_id, batch_size):
+    # queued without a tenant: the tenant's own jobs go with it
+    tenant = Tenant.objects.filter(pk=tenant_id).first()
+    if tenant is None:
+        return {'deleted': {}}
+    return {'deleted': delete_tenant_data(tenant, batch_size, progress=report_progress)}
@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+
+from mysite.models import Client, Project, Task, Tenant, TenantMembership, TimeEntry
+from mysite.rollups import bulk_create_time_entries
+
+ENDPOINTS = [
+    ('dashboard', '/api/dashboard/summary/', '/api/dashboard/summary/async/'),
+    ('time report', '/api/reports/time/?group_by=project', '/api/reports/time/async/?group_by=project'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare p50/p99 latency of the sync and async dashboard/report views "
+        "under concurrent requests through the ASGI handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at once")
+        parser.add_argument(
+            '--tenant',
+            help="Subdomain of an existing tenant to query as its owner; "
+                 "by default a throwaway tenant is seeded and deleted afterwards",
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2 or options['concurrency'] < 1:
+            raise CommandError("--requests must be at least 2 and --concurrency at least 1")
+        seeded = None
+        if options['tenant']:
+            tenant = Tenant.objects.filter(subdomain=options['tenant']).select_related('owner').first()
+            if tenant is None:
+                raise CommandError(f"No tenant {options['tenant']!r}")
+        else:
+            # the pool's connections only see committed rows, so the seed
+            # data cannot live in a rolled back transaction
+            tenant = seeded = self.seed()
+        try:
+            client = AsyncClient()
+            client.force_login(tenant.owner)
+            # per request: AsyncClient ignores constructor headers on 4.2
+            self.headers = {'X-Tenant': tenant.subdomain}
+            # measure the views, not the summary cache
+            with override_settings(DASHBOARD_CACHE_TTL=0):
+                for label, sync_url, async_url in ENDPOINTS:
+                    for path, url in (('sync', sync_url), ('async', async_url)):
+                        timings = asyncio.run(
+                            self.load(client, url, options['requests'], options['concurrency'])
+                        )
+                        self.report(f'{label} {path}', timings)
+        finally:
+            if seeded is not None:
+                owner = seeded.owner
+                seeded.delete()
+                owner.delete()
+
+    async def load(self, client, url, num_requests, concurrency):
+        response = await client.get(url, headers=self.headers)
+        if response.status_code != 200:
+            raise CommandError(f"{url}: {response.status_code} {response.content[:200]!r}")
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await client.get(url, headers=self.headers)
+                timings.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one() for _ in range(num_requests)))
+        return timings
+
+    def report(self, label, timings):
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        self.stdout.write(
+            f"{label:<18} p50 {cuts[49] * 1000:7.1f} ms   p99 {cuts[98] * 1000:7.1f} ms   "
+            f"mean {statistics.mean(timings) * 1000:7.1f} ms"
+        )
+
+    def seed(self, num_clients=40, projects_per_client=5, tasks_per_project=10):
+        owner = get_user_model().objects.create_user(
+            username='bench-async-views', email='bench-async@example.com'
+        )
+        tenant = Tenant.objects.create(name='Bench', subdomain='bench-async-views', owner=owner)
+        TenantMembership.objects.create(user=owner, tenant=tenant, role='owner')
+        clients = Client.objects.bulk_create(
+            Client(tenant=tenant, name=f'Client {i}', email=f'c{i}@example.com')
+            for i in range(num_clients)
+        )
+        today = timezone.localdate()
+        projects = Project.objects.bulk_create(
+            Project(tenant=tenant, client=client, name=f'Project {i}', status='active',
+                    start_date=today - timedelta(days=90), hourly_rate=Decimal('100.00'))
+            for client in clients for i in range(projects_per_client)
+        )
+        tasks = Task.objects.bulk_create(
+            Task(project=project, title=f'Task {t}', status='todo')
+            for project in projects for t in range(tasks_per_project)
+        )
+        entries = [
+            TimeEntry(task=task, user=owner, hours=Decimal('1.50'), date=today - timedelta(days=d))
+            for task in tasks for d in range(0, 60, 7)
+        ]
+        bulk_create_time_entries(entries, {task.pk: task.project_id for task in tasks})
+        return tenant
@@ -0,0 +1,100 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from mysite.models import Client, Project, Task, Tenant
+from mysite import renderers
+from mysite.renderers import FastJSONRenderer
+from mysite.rowplans import get_row_plan
+from mysite.serializer import ProjectListSerializer, TaskListSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time list rendering through the serializers + JSONRenderer against the "
+        "values_list() row plans + FastJSONRenderer, on throwaway seeded data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=200, help="Projects to seed")
+        parser.add_argument('--tasks', type=int, default=25, help="Tasks per project")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (best is kept)")
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write(self.style.WARNING(
+                "orjson is not installed: FastJSONRenderer falls back to the stdlib encoder, "
+                "so these timings are not what production sees (pip install -r requirements.txt)"
+            ))
+        try:
+            with transaction.atomic():
+                self.seed(options['projects'], options['tasks'])
+                # the querysets the list views use
+                self.compare('tasks', Task.objects.filter(project__tenant=self.tenant)
+                             .select_related('assigned_to__profile'),
+                             TaskListSerializer, options['repeat'])
+                self.compare('projects', Project.objects.filter(tenant=self.tenant).for_listing(),
+                             ProjectListSerializer, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, num_projects, tasks_per_project):
+        User = get_user_model()
+        users = [
+            User.objects.create_user(username=f'bench{i}', email=f'bench{i}@example.com')
+            for i in range(10)
+        ]
+        self.tenant = Tenant.objects.create(name='Bench', subdomain='bench-list-rendering', owner=users[0])
+        clients = Client.objects.bulk_create(
+            Client(tenant=self.tenant, name=f'Client {i}', email=f'c{i}@example.com')
+            for i in range(max(1, num_projects // 5))
+        )
+        projects = Project.objects.bulk_create(
+            Project(tenant=self.tenant, client=clients[i % len(clients)], name=f'Project {i}',
+                    status='active', start_date=date(2025, 1, 1), budget=Decimal('5000.00'))
+            for i in range(num_projects)
+        )
+        Task.objects.bulk_create(
+            Task(project=project, title=f'Task {t}', priority=1 + t % 4,
+                 status='completed' if t % 3 == 0 else 'todo',
+                 assigned_to=users[t % len(users)] if t % 5 else None,
+                 due_date=date(2025, 1, 1) + timedelta(days=t), hours_estimated=Decimal('4.00'))
+            for project in projects for t in range(tasks_per_project)
+        )
+
+    def compare(self, label, queryset, serializer_class, repeat):
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def row_plan_path():
+            plan = get_row_plan(serializer_class, queryset)
+            return FastJSONRenderer().render(plan.render(plan.values_list(queryset.all())))
+
+        if serializer_path() != row_plan_path():
+            self.stderr.write(self.style.ERROR(f"{label}: outputs differ"))
+            return
+        slow = self.best_of(serializer_path, repeat)
+        fast = self.best_of(row_plan_path, repeat)
+        self.stdout.write(
+            f"{label} ({queryset.count()} rows): serializer {slow * 1000:.1f} ms, "
+            f"row plan {fast * 1000:.1f} ms, {slow / fast:.1f}x faster"
+        )
+
+    @staticmethod
+    def best_of(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
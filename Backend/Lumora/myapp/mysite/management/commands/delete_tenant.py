@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.models import Tenant
+from mysite.tenantdeletion import deactivate_tenant, delete_tenant_data, schedule_tenant_deletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Deactivate a tenant and delete it with everything it owns in batches, "
+        "from a background job or, with --now, right here; rerun to resume"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', required=True, help="Subdomain of the tenant to delete")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per DELETE (default: 500)")
+        parser.add_argument(
+            '--now', action='store_true',
+            help="Delete in this process instead of queueing a delete_tenant job",
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options['batch_size'] <= 10000:
+            raise CommandError("--batch-size must be between 1 and 10000")
+        tenant = Tenant.objects.filter(subdomain=options['tenant']).first()
+        if tenant is None:
+            raise CommandError(f"Unknown tenant {options['tenant']!r}")
+        if not options['now']:
+            job = schedule_tenant_deletion(tenant, options['batch_size'])
+            self.stdout.write(f"Tenant {tenant.subdomain} deactivated; deletion is job {job.pk}")
+            return
+
+        if tenant.is_active:
+            deactivate_tenant(tenant)
+
+        def progress(done, total):
+            if total and (done == total or done % (options['batch_size'] * 100) == 0):
+                self.stdout.write(f"{done}/{total} rows deleted")
+
+        deleted = delete_tenant_data(tenant, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {options['tenant']}: "
+            + ", ".join(f"{count} {name}" for name, count in deleted.items() if count)
+        ))
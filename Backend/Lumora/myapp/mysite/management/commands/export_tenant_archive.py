@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.archive import open_archive, write_archive
+from mysite.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a tenant with its clients, projects, tasks, time entries and invoices "
+        "to a streaming NDJSON archive, for import_tenant_archive"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', required=True, help="Subdomain of the tenant to export")
+        parser.add_argument('--output', required=True, help="Archive file to write")
+        parser.add_argument(
+            '--compress', action='store_true', default=None,
+            help="Gzip the archive (default: when the file name ends in .gz)",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per archive line (default: 5000)")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+        tenant = Tenant.objects.filter(subdomain=options['tenant']).first()
+        if tenant is None:
+            raise CommandError(f"Unknown tenant {options['tenant']!r}")
+        with open_archive(options['output'], 'w', compress=options['compress']) as handle:
+            counts = write_archive(tenant, handle, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {tenant.subdomain}: " + ", ".join(f"{count} {name}" for name, count in counts.items())
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from mysite.exports import EXPORT_FORMATS, EXPORTS, stream_export
+from mysite.models import Tenant
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Stream a tenant's time entries or projects to a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(EXPORTS))
+        parser.add_argument('--tenant', required=True, help="Subdomain of the tenant to export")
+        parser.add_argument('--format', dest='fmt', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--start', type=_date, help="First date to include (YYYY-MM-DD)")
+        parser.add_argument('--end', type=_date, help="Last date to include (YYYY-MM-DD)")
+        parser.add_argument('--project', type=int, help="Only this project")
+        parser.add_argument('--output', help="File to write (default: stdout)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(subdomain=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant {options['tenant']!r}")
+
+        lines = stream_export(
+            options['resource'], options['fmt'], tenant,
+            start=options['start'], end=options['end'],
+            project_id=options['project'], chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from mysite.invoicing import generate_invoices
+from mysite.models import Tenant
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Invoice every client for its unbilled hours in a period (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, help="First day (YYYY-MM-DD, default: first of last month)")
+        parser.add_argument('--end', type=_date, help="Last day (YYYY-MM-DD, default: end of last month)")
+        parser.add_argument('--issue-date', type=_date, help="Issue date (YYYY-MM-DD, default: today)")
+        parser.add_argument('--due-days', type=int, default=30, help="Days until payment is due")
+        parser.add_argument('--tenant', help="Only this tenant's subdomain")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Clients written per transaction")
+
+    def handle(self, *args, **options):
+        end = options['end'] or date.today().replace(day=1) - timedelta(days=1)
+        start = options['start'] or end.replace(day=1)
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        tenants = Tenant.objects.filter(is_active=True).order_by('pk')
+        if options['tenant']:
+            tenants = Tenant.objects.filter(subdomain=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Unknown tenant {options['tenant']!r}")
+
+        for tenant in tenants.iterator():
+            summary = generate_invoices(
+                tenant, start, end,
+                issue_date=options['issue_date'],
+                due_days=options['due_days'],
+                chunk_size=options['chunk_size'],
+            )
+            message = (
+                f"{tenant.subdomain}: {summary['invoices']} invoices, {summary['lines']} lines, "
+                f"{summary['hours']} hours, total {summary['total']}"
+            )
+            if summary['unpriced_projects']:
+                message += f" ({summary['unpriced_projects']} projects without an hourly rate skipped)"
+            self.stdout.write(message)
+        self.stdout.write(self.style.SUCCESS(f"Invoiced {start} to {end}"))
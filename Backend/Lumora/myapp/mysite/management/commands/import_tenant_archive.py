@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.archive import ArchiveError, open_archive, read_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an export_tenant_archive archive (plain or gzipped) as a new tenant; "
+        "users are matched by username and created when missing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help="Archive file to load")
+        parser.add_argument('--subdomain', help="Subdomain for the new tenant (default: the archived one)")
+        parser.add_argument('--name', help="Name for the new tenant (default: the archived one)")
+
+    def handle(self, *args, **options):
+        try:
+            with open_archive(options['archive']) as handle:
+                tenant, counts = read_archive(handle, options['subdomain'], options['name'])
+        except (ArchiveError, OSError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {tenant.subdomain} (id {tenant.pk}): "
+            + ", ".join(f"{count} {name}" for name, count in counts.items())
+        ))
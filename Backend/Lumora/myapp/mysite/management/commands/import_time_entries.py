@@ -0,0 +1,91 @@
+import csv
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from mysite.models import Task, Tenant, TenantMembership, TimeEntry
+from mysite.responsecache import bump_tenant_version
+from mysite.rollups import bulk_create_time_entries
+from mysite.serializer import TimeEntryImportSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import time entries for one tenant from a CSV file with the columns "
+        "task_id, user_id, hours, date and optionally description. The file is "
+        "streamed in chunks; invalid rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import")
+        parser.add_argument('--tenant', required=True, help="Subdomain of the tenant the entries belong to")
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Rows validated and inserted per batch (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(subdomain=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant {options['tenant']!r}")
+
+        imported = skipped = 0
+        with open(options['path'], newline='', encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            missing = {'task_id', 'user_id', 'hours', 'date'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+            while True:
+                # line numbers are 1-based and the header is line 1
+                first_line = reader.line_num + 1
+                chunk = list(islice(reader, options['chunk_size']))
+                if not chunk:
+                    break
+                created, rejected = self.import_chunk(tenant, chunk, first_line)
+                imported += created
+                skipped += rejected
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} time entries, skipped {skipped}"))
+
+    def import_chunk(self, tenant, chunk, first_line):
+        row_serializer = TimeEntryImportSerializer()
+        rows = []
+        rejected = 0
+        for line, raw in enumerate(chunk, start=first_line):
+            try:
+                rows.append((line, row_serializer.run_validation(raw)))
+            except serializers.ValidationError as exc:
+                rejected += 1
+                self.stderr.write(f"line {line}: {exc.detail}")
+        if not rows:
+            return 0, rejected
+
+        task_projects = dict(
+            Task.objects.filter(
+                pk__in={row['task_id'] for _, row in rows}, project__tenant=tenant
+            ).values_list('pk', 'project_id')
+        )
+        members = set(
+            TenantMembership.objects.filter(
+                tenant=tenant,
+                user_id__in={row['user_id'] for _, row in rows},
+                is_active=True,
+            ).values_list('user_id', flat=True)
+        )
+
+        entries = []
+        for line, row in rows:
+            if row['task_id'] not in task_projects:
+                rejected += 1
+                self.stderr.write(f"line {line}: task {row['task_id']} not found in tenant")
+            elif row['user_id'] not in members:
+                rejected += 1
+                self.stderr.write(f"line {line}: user {row['user_id']} is not a member of the tenant")
+            else:
+                entries.append(TimeEntry(**row))
+        if entries:
+            bulk_create_time_entries(entries, task_projects)
+            bump_tenant_version(tenant.pk)
+        return len(entries), rejected
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from mysite.overdue import prune_digests, write_digests
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the per-user and per-project overdue task digests of every active "
+        "tenant for a day; meant to run daily from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=_date, help="Day of the digest (YYYY-MM-DD, default: today)")
+        parser.add_argument(
+            '--keep-days', type=int, default=30,
+            help="Delete digests older than this many days (default: 30, 0 keeps everything)",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Overdue tasks fetched per round trip (default: 2000)",
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_days'] < 0 or options['chunk_size'] < 1:
+            raise CommandError("--keep-days must not be negative and --chunk-size must be positive")
+        today = options['date'] or timezone.now().date()
+        counts = write_digests(today, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {counts['digests']} digests for {counts['tasks']} overdue tasks "
+            f"in {counts['tenants']} tenants ({today})"
+        ))
+        if options['keep_days']:
+            pruned = prune_digests(today - timedelta(days=options['keep_days']))
+            if pruned:
+                self.stdout.write(f"Deleted {pruned} digests older than {options['keep_days']} days")
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from mysite.models import Tenant
+from mysite.rollups import rebuild_daily_rollups
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Backfill or repair the daily time rollup table for a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, help="First day (YYYY-MM-DD, default: 30 days ago)")
+        parser.add_argument('--end', type=_date, help="Last day (YYYY-MM-DD, default: today)")
+        parser.add_argument('--tenant', help="Only this tenant's subdomain")
+
+    def handle(self, *args, **options):
+        end = options['end'] or date.today()
+        start = options['start'] or end - timedelta(days=30)
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        tenant = None
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(subdomain=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Unknown tenant {options['tenant']!r}")
+
+        written = rebuild_daily_rollups(start, end, tenant)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} daily rollup rows for {start} to {end}"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from mysite.rollups import rebuild_project_counters, rebuild_task_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized task and project rollup counters in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help="Rows recomputed per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        # tasks first: project hours are the sum of task hours
+        tasks = rebuild_task_counters(chunk_size)
+        projects = rebuild_project_counters(chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {tasks} tasks and {projects} projects"
+        ))
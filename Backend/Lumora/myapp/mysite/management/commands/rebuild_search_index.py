@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mysite.models import Tenant
+from mysite.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of one tenant or of every tenant"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help="Subdomain of the tenant to rebuild (default: all)")
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Documents written per INSERT (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant']:
+            tenant = Tenant.objects.filter(subdomain=options['tenant']).first()
+            if tenant is None:
+                raise CommandError(f"No tenant {options['tenant']!r}")
+        counts = rebuild_index(tenant, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            "Indexed " + ", ".join(f"{count} {kind}s" for kind, count in counts.items())
+        ))
@@ -0,0 +1,74 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from mysite.jobs import work, worker_name
+
+
+def _worker_process(number, stop, once, poll):
+    # the parent turns Ctrl-C and SIGTERM into ``stop``; the job in hand
+    # is finished before the worker exits
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        work(worker_name(number), stop, once, poll)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (mysite.jobs) in a pool of worker processes until "
+        "interrupted; Ctrl-C or SIGTERM lets running jobs finish first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help="Worker processes (default: 2)")
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once no job is runnable instead of waiting for more",
+        )
+        parser.add_argument(
+            '--poll', type=float,
+            help="Seconds an idle worker waits before looking again (default: JOB_POLL_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError("--processes must be at least 1")
+        if options['processes'] == 1:
+            processed = work(worker_name(), once=options['once'], poll=options['poll'])
+            self.stdout.write(f"Ran {processed} jobs")
+            return
+
+        # forked workers must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: stop.set())
+
+        def start(number):
+            process = context.Process(
+                target=_worker_process, args=(number, stop, options['once'], options['poll']),
+                name=f'job-worker-{number}', daemon=True,
+            )
+            process.start()
+            return process
+
+        workers = {number: start(number) for number in range(options['processes'])}
+        self.stdout.write(f"Started {len(workers)} workers")
+        while workers:
+            for number, process in list(workers.items()):
+                process.join(timeout=1)
+                if process.is_alive():
+                    continue
+                if process.exitcode != 0 and not stop.is_set():
+                    # a crashed worker's job comes back once its lease runs out
+                    self.stderr.write(f"Worker {number} exited with {process.exitcode}; restarting it")
+                    workers[number] = start(number)
+                else:
+                    del workers[number]
+        self.stdout.write("Workers stopped")
@@ -0,0 +1,107 @@
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from mysite.models import Client, Project, Task, Tenant, TenantMembership, TimeEntry
+from mysite.reports import time_report
+
+# what a connection gets without the tuning layer: SQLite's defaults
+UNTUNED_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the SQLite database with concurrent time entry writes and report "
+        "reads, with and without SQLITE_PRAGMAS. Switches the journal mode of the "
+        "database file, so point it at a copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help="Threads creating time entries")
+        parser.add_argument('--readers', type=int, default=8, help="Threads reading the time report")
+        parser.add_argument('--seconds', type=float, default=5, help="Duration of each run")
+        parser.add_argument(
+            '--mode', choices=['untuned', 'tuned', 'both'], default='both',
+            help="Run without the pragmas, with them, or both one after the other",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError("Needs the default database to be an SQLite file")
+        self.seed()
+        try:
+            if options['mode'] in ('untuned', 'both'):
+                with override_settings(SQLITE_PRAGMAS=UNTUNED_PRAGMAS):
+                    self.run('untuned', options)
+            if options['mode'] in ('tuned', 'both'):
+                self.run('tuned', options)
+        finally:
+            connections.close_all()
+            owner = self.tenant.owner
+            self.tenant.delete()
+            owner.delete()
+
+    def seed(self):
+        owner = get_user_model().objects.create_user(username='stress-sqlite', email='stress@example.com')
+        self.tenant = Tenant.objects.create(name='Stress', subdomain='stress-sqlite', owner=owner)
+        TenantMembership.objects.create(user=owner, tenant=self.tenant, role='owner')
+        client = Client.objects.create(tenant=self.tenant, name='Stress client', email='stress@example.com')
+        projects = Project.objects.bulk_create(
+            Project(tenant=self.tenant, client=client, name=f'Project {i}', start_date=date(2025, 1, 1))
+            for i in range(10)
+        )
+        self.tasks = Task.objects.bulk_create(
+            Task(project=project, title=f'Task {t}') for project in projects for t in range(10)
+        )
+
+    def run(self, label, options):
+        # reopen every connection so the pragmas of this run apply
+        connections.close_all()
+        counts = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def worker(operation):
+            done = failed = 0
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        operation(done)
+                        done += 1
+                    except OperationalError:
+                        # "database is locked"
+                        failed += 1
+            finally:
+                connections.close_all()
+            with lock:
+                counts['writes' if operation is write else 'reads'] += done
+                counts['errors'] += failed
+
+        def write(n):
+            TimeEntry.objects.create(
+                task=self.tasks[n % len(self.tasks)], user=self.tenant.owner,
+                hours=Decimal('0.25'), date=date(2025, 1, 1 + n % 28),
+            )
+
+        def read(n):
+            time_report(self.tenant, group_by='day')
+
+        threads = [threading.Thread(target=worker, args=(write,)) for _ in range(options['writers'])]
+        threads += [threading.Thread(target=worker, args=(read,)) for _ in range(options['readers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{label:<8} writes {counts['writes'] / elapsed:8.1f}/s   "
+            f"reads {counts['reads'] / elapsed:8.1f}/s   locked errors {counts['errors']}"
+        )
@@ -0,0 +1,114 @@
+import logging
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .db import start_request, wrote_to_primary
+from .querycount import start_counting, stop_counting
+from .tenancy import attach_membership, get_tenant, tenant_subdomain_from_request
+
+logger = logging.getLogger(__name__)
+
+
+class TenantMiddleware(MiddlewareMixin):
+    """Attach the active tenant and the user's membership to the request.
+
+    Sets ``request.tenant`` and ``request.tenant_membership`` and, for
+    members, ``request.user.current_tenant``. Users authenticated later by
+    DRF (token/JWT) get their membership resolved in TenantScopedMixin.
+    Must come after AuthenticationMiddleware.
+
+    MiddlewareMixin makes it async-capable, so under ASGI async views are
+    not forced onto the sync thread.
+    """
+
+    def process_request(self, request):
+        request.tenant = None
+        request.tenant_membership = None
+        subdomain = tenant_subdomain_from_request(request)
+        if subdomain:
+            tenant = get_tenant(subdomain)
+            if tenant is None or not tenant.is_active:
+                return JsonResponse({'detail': 'Unknown tenant.'}, status=404)
+            request.tenant = tenant
+            if request.user.is_authenticated:
+                attach_membership(request, request.user)
+        return None
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """Keep a client's reads on the primary for a while after it writes.
+
+    Requests with an unsafe method, or carrying the pin cookie set by a
+    recent write, read from the primary (see mysite.db). A request that
+    wrote sets the cookie for ``REPLICA_PIN_SECONDS``.
+    """
+
+    cookie_name = 'pin_primary'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def process_request(self, request):
+        start_request(
+            pinned=request.method not in self.safe_methods or self.cookie_name in request.COOKIES
+        )
+
+    def process_response(self, request, response):
+        if wrote_to_primary():
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class QueryCountMiddleware(MiddlewareMixin):
+    """Count each request's queries and database time.
+
+    Works without DEBUG, through the execute wrapper of mysite.querycount,
+    and includes the queries an async view sends to the query pool. With
+    ``QUERY_COUNT_HEADERS`` the response carries ``X-Query-Count`` and a
+    ``Server-Timing`` db metric. A request running more queries than its
+    budget is logged as a warning: ``QUERY_BUDGETS`` maps URL names to the
+    budgets of their GET/HEAD requests, and ``"<METHOD> <name>"`` to those
+    of other methods; ``QUERY_BUDGET`` is the default. Streaming responses
+    (exports, downloads) run their queries after the middleware is done,
+    so they get neither the headers nor a budget check. Goes first, to
+    count the other middleware's queries too.
+    """
+
+    read_methods = ('GET', 'HEAD')
+
+    def process_request(self, request):
+        request.query_counter = start_counting()
+
+    def process_response(self, request, response):
+        stop_counting()
+        counter = getattr(request, 'query_counter', None)
+        if counter is None or response.streaming:
+            return response
+        milliseconds = counter.seconds * 1000
+        if getattr(settings, 'QUERY_COUNT_HEADERS', True):
+            response['X-Query-Count'] = str(counter.count)
+            timing = f'db;dur={milliseconds:.1f};desc="{counter.count} queries"'
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+        budget = self.query_budget(request)
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                "%s %s (%s) ran %d queries, over its budget of %d, in %.1fms",
+                request.method, request.path, self.url_name(request), counter.count, budget, milliseconds,
+            )
+        return response
+
+    def url_name(self, request):
+        match = request.resolver_match
+        return match.url_name if match is not None else None
+
+    def query_budget(self, request):
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        name = self.url_name(request)
+        key = name if request.method in self.read_methods else f'{request.method} {name}'
+        return budgets.get(key, getattr(settings, 'QUERY_BUDGET', None))
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:26
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('mysite', 'Project')
+    Task = apps.get_model('mysite', 'Task')
+    TimeEntry = apps.get_model('mysite', 'TimeEntry')
+
+    entries = TimeEntry.objects.filter(task=OuterRef('pk')).order_by().values('task')
+    Task.objects.update(
+        time_entry_count=Coalesce(
+            Subquery(entries.annotate(n=Count('pk')).values('n')), 0
+        )
+    )
+    tasks = Task.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    Project.objects.update(
+        task_count=Coalesce(Subquery(tasks.annotate(n=Count('pk')).values('n')), 0),
+        completed_task_count=Coalesce(
+            Subquery(tasks.filter(status='completed').annotate(n=Count('pk')).values('n')), 0
+        ),
+        hours_logged_total=Coalesce(
+            Subquery(tasks.annotate(total=Sum('hours_logged')).values('total')),
+            Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0003_client_project_task_timeentry_clientcontact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='completed_task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='hours_logged_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='time_entry_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
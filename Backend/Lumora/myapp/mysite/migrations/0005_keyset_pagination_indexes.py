@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0004_rollup_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['tenant', '-created_at', '-id'], name='projects_pr_tenant__a17d46_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'priority', '-created_at', '-id'], name='projects_ta_project_a784ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority', '-created_at', '-id'], name='projects_ta_priorit_afa2dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['task', '-date', '-created_at', '-id'], name='projects_ti_task_id_66d69d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='projects_ti_date_af4712_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['tenant', 'name'], name='clients_cli_tenant__157b19_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['tenant', 'status'], name='projects_pr_tenant__3f3849_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='projects_ta_project_cd2085_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'due_date'], name='projects_ta_assigne_c46021_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('due_date__isnull', False), models.Q(('status', 'completed'), _negated=True)), fields=['due_date'], name='task_open_due_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'date'], name='projects_ti_user_id_b5bb9d_idx'),
+        ),
+    ]
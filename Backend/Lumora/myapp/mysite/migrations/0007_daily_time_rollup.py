@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:34
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mysite', '0006_tenant_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_time_rollups', to='mysite.project')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_time_rollups', to='mysite.task')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_time_rollups', to='mysite.tenant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_time_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Time Rollup',
+                'verbose_name_plural': 'Daily Time Rollups',
+                'db_table': 'reports_dailytimerollup',
+                'indexes': [models.Index(fields=['tenant', 'date'], name='reports_dai_tenant__18e198_idx'), models.Index(fields=['tenant', 'project', 'date'], name='reports_dai_tenant__49212a_idx'), models.Index(fields=['tenant', 'user', 'date'], name='reports_dai_tenant__f4df00_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailytimerollup',
+            constraint=models.UniqueConstraint(fields=('task', 'user', 'date'), name='unique_daily_rollup_per_task_user_day'),
+        ),
+    ]
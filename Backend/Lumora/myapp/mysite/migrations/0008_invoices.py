@@ -0,0 +1,95 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:38
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0007_daily_time_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('invoice_number', models.CharField(max_length=50, verbose_name='invoice number')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('sent', 'Sent'), ('paid', 'Paid'), ('cancelled', 'Cancelled')], default='draft', max_length=10)),
+                ('period_start', models.DateField(verbose_name='period start')),
+                ('period_end', models.DateField(verbose_name='period end')),
+                ('issue_date', models.DateField(verbose_name='issue date')),
+                ('due_date', models.DateField(blank=True, null=True, verbose_name='due date')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('notes', models.TextField(blank=True, verbose_name='notes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Invoice',
+                'verbose_name_plural': 'Invoices',
+                'db_table': 'invoices_invoice',
+                'ordering': ['-issue_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('hours', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                'verbose_name': 'Invoice Line',
+                'verbose_name_plural': 'Invoice Lines',
+                'db_table': 'invoices_line',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='invoiceline',
+            name='invoice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='mysite.invoice'),
+        ),
+        migrations.AddField(
+            model_name='invoiceline',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='invoice_lines', to='mysite.project'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to='mysite.client'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to='mysite.tenant'),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='invoice_line',
+            field=models.ForeignKey(blank=True, help_text='Set once the entry has been billed', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='time_entries', to='mysite.invoiceline'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['client', 'status'], name='invoices_in_client__d0ba52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['tenant', 'status'], name='invoices_in_tenant__0fd538_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(condition=models.Q(('invoice_line__isnull', True)), fields=['task', 'date'], name='timeentry_unbilled_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='invoice',
+            unique_together={('tenant', 'invoice_number')},
+        ),
+    ]
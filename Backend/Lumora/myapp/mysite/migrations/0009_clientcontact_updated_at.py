@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0008_invoices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientcontact',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
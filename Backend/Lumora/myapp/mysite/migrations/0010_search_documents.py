@@ -0,0 +1,114 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# SQLite: an external-content FTS5 table over search_document, kept in
+# step by triggers. tenant_id is indexed too, so a search can be narrowed
+# to one tenant inside the MATCH.
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE search_document_fts USING fts5(
+        title, body, tenant_id,
+        content='search_document', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER search_document_ai AFTER INSERT ON search_document BEGIN
+        INSERT INTO search_document_fts(rowid, title, body, tenant_id)
+        VALUES (new.id, new.title, new.body, new.tenant_id);
+    END""",
+    """CREATE TRIGGER search_document_ad AFTER DELETE ON search_document BEGIN
+        INSERT INTO search_document_fts(search_document_fts, rowid, title, body, tenant_id)
+        VALUES ('delete', old.id, old.title, old.body, old.tenant_id);
+    END""",
+    """CREATE TRIGGER search_document_au AFTER UPDATE ON search_document BEGIN
+        INSERT INTO search_document_fts(search_document_fts, rowid, title, body, tenant_id)
+        VALUES ('delete', old.id, old.title, old.body, old.tenant_id);
+        INSERT INTO search_document_fts(rowid, title, body, tenant_id)
+        VALUES (new.id, new.title, new.body, new.tenant_id);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS search_document_au',
+    'DROP TRIGGER IF EXISTS search_document_ad',
+    'DROP TRIGGER IF EXISTS search_document_ai',
+    'DROP TABLE IF EXISTS search_document_fts',
+]
+
+# PostgreSQL: a generated tsvector column, titles weighted above bodies
+POSTGRES_INDEX = [
+    """ALTER TABLE search_document ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', title), 'A') ||
+            setweight(to_tsvector('simple', body), 'B')
+        ) STORED""",
+    'CREATE INDEX search_document_vector_idx ON search_document USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS search_document_vector_idx',
+    'ALTER TABLE search_document DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX})
+
+
+def drop_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('mysite', 'SearchDocument')
+    sources = [
+        ('client', apps.get_model('mysite', 'Client'), 'tenant_id', 'name', 'company'),
+        ('project', apps.get_model('mysite', 'Project'), 'tenant_id', 'name', 'description'),
+        ('task', apps.get_model('mysite', 'Task'), 'project__tenant_id', 'title', 'description'),
+    ]
+    for kind, model, tenant, title, body in sources:
+        rows = model.objects.values_list('pk', tenant, title, body).order_by('pk')
+        batch = []
+        for pk, tenant_id, title_text, body_text in rows.iterator(chunk_size=2000):
+            batch.append(SearchDocument(
+                tenant_id=tenant_id, kind=kind, object_id=pk, title=title_text[:200], body=body_text,
+            ))
+            if len(batch) == 2000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0009_clientcontact_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('client', 'Client'), ('project', 'Project'), ('task', 'Task')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='mysite.tenant')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'db_table': 'search_document',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:15
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mysite', '0010_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='name')),
+                ('description', models.TextField(blank=True, verbose_name='description')),
+                ('priority', models.IntegerField(choices=[(1, 'Low'), (2, 'Medium'), (3, 'High'), (4, 'Urgent')], default=2)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=8, verbose_name='estimated hours')),
+                ('duration_days', models.PositiveIntegerField(blank=True, help_text='Days from start to end date; empty for open-ended projects', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_project_templates', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_templates', to='mysite.tenant')),
+            ],
+            options={
+                'verbose_name': 'Project Template',
+                'verbose_name_plural': 'Project Templates',
+                'db_table': 'projects_template',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='title')),
+                ('description', models.TextField(blank=True, verbose_name='description')),
+                ('priority', models.IntegerField(choices=[(1, 'Low'), (2, 'Medium'), (3, 'High'), (4, 'Urgent')], default=2)),
+                ('hours_estimated', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=5, verbose_name='estimated hours')),
+                ('due_offset_days', models.IntegerField(blank=True, help_text='Days from the project start to the due date', null=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='mysite.projecttemplate')),
+            ],
+            options={
+                'verbose_name': 'Task Template',
+                'verbose_name_plural': 'Task Templates',
+                'db_table': 'projects_tasktemplate',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='projecttemplate',
+            index=models.Index(fields=['tenant', 'name'], name='projects_te_tenant__07055b_idx'),
+        ),
+    ]
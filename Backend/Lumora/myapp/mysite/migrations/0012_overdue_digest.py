@@ -0,0 +1,48 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mysite', '0011_project_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('task_ids', models.JSONField(default=list, help_text='Overdue task IDs, longest overdue first')),
+                ('task_count', models.PositiveIntegerField(default=0)),
+                ('oldest_due_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='overdue_digests', to='mysite.project')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overdue_digests', to='mysite.tenant')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='overdue_digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Overdue Digest',
+                'verbose_name_plural': 'Overdue Digests',
+                'db_table': 'reports_overduedigest',
+                'indexes': [models.Index(fields=['tenant', 'date'], name='reports_ove_tenant__477312_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='overduedigest',
+            constraint=models.CheckConstraint(check=models.Q(('user__isnull', True), ('project__isnull', True), _connector='XOR'), name='overdue_digest_user_xor_project'),
+        ),
+        migrations.AddConstraint(
+            model_name='overduedigest',
+            constraint=models.UniqueConstraint(fields=('date', 'user', 'tenant'), name='unique_overdue_digest_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='overduedigest',
+            constraint=models.UniqueConstraint(fields=('date', 'project'), name='unique_overdue_digest_per_project'),
+        ),
+    ]
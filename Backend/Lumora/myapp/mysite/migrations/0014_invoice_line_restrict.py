@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0013_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoiceline',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='invoice_lines', to='mysite.project'),
+        ),
+    ]
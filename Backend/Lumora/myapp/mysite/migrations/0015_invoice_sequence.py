@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:32
+
+import re
+
+from django.db import migrations, models
+
+GENERATED_NUMBER = re.compile(r'^INV-(\d+)$')
+
+
+def backfill_sequence(apps, schema_editor):
+    Invoice = apps.get_model('mysite', 'Invoice')
+    numbered = []
+    for invoice in Invoice.objects.only('pk', 'invoice_number').iterator():
+        match = GENERATED_NUMBER.match(invoice.invoice_number)
+        if match:
+            invoice.sequence = int(match.group(1))
+            numbered.append(invoice)
+    Invoice.objects.bulk_update(numbered, ['sequence'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysite', '0014_invoice_line_restrict'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='sequence',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['tenant', 'sequence'], name='invoices_in_tenant__12bd2d_idx'),
+        ),
+        migrations.RunPython(backfill_sequence, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
@@ -119,6 +122,109 @@ class TenantMembership(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.tenant.name} ({self.role})"
     
+class RollupCountersMixin:
+    """Shared plumbing for models carrying denormalized rollup counters.
+
+    ``counter_fields`` are owned by the handlers in ``mysite.rollups`` and
+    are left out of ordinary UPDATEs so a stale instance cannot overwrite
+    concurrent F() increments. ``tracked_fields`` are snapshotted when a
+    row is loaded so the handlers can compute deltas on save.
+    """
+
+    counter_fields = ()
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked()
+        return instance
+
+    def snapshot_tracked(self):
+        # to_python: an instance created from strings ('1.50', '2025-01-02')
+        # must compare and subtract like one loaded from the database
+        self._tracked = {
+            name: self._meta.get_field(name).to_python(self.__dict__.get(name))
+            for name in self.tracked_fields
+        }
+
+    def tracked_previous(self, name):
+        return getattr(self, '_tracked', {}).get(name)
+
+    def save(self, *args, **kwargs):
+        if (
+            self.counter_fields
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def _children_changed(model, fk, ref):
+    """``(latest updated_at, row count)`` subqueries over the ``model`` rows
+    whose ``fk`` points at ``OuterRef(ref)``"""
+    rows = model.objects.filter(**{fk: models.OuterRef(ref)}).order_by().values(fk)
+    return (
+        models.Subquery(rows.annotate(latest=models.Max('updated_at')).values('latest')),
+        Coalesce(models.Subquery(rows.annotate(n=models.Count('pk')).values('n')), 0),
+    )
+
+
+def _change_validators(queryset, children, **fields):
+    """One aggregate over ``queryset`` and its ``children`` for conditional GETs.
+
+    ``children`` maps a name to ``(model, fk, ref)``; each contributes its
+    latest ``updated_at`` and its row count, since deleted rows leave no
+    timestamp behind.
+    """
+    annotations, aggregates = {}, {}
+    for name, (model, fk, ref) in children.items():
+        latest, count = _children_changed(model, fk, ref)
+        annotations[f'v_{name}_updated'] = latest
+        annotations[f'v_{name}'] = count
+        aggregates[f'{name}_updated'] = models.Max(f'v_{name}_updated')
+        aggregates[name] = models.Sum(f'v_{name}')
+    return queryset.order_by().annotate(**annotations).aggregate(
+        rows=models.Count('pk'),
+        updated=models.Max('updated_at'),
+        **fields,
+        **aggregates,
+    )
+
+
+class ClientQuerySet(models.QuerySet):
+    "queryset helpers for client listings"
+
+    def with_stats(self):
+        """Annotate project counts and invoiced total in one query.
+
+        The annotation names differ from the model properties so the
+        properties keep working on un-annotated instances.
+        """
+        return self.annotate(
+            num_projects=models.Count('projects', distinct=True),
+            num_active_projects=models.Count(
+                'projects',
+                filter=models.Q(projects__status='active'),
+                distinct=True,
+            ),
+            invoiced_sum=invoiced_total(models.OuterRef('pk')),
+        )
+
+    def change_validators(self):
+        "what the client serializers render, reduced to one aggregate row"
+        return _change_validators(self, {
+            'projects': (Project, 'client', 'pk'),
+            'invoices': (Invoice, 'client', 'pk'),
+            'contacts': (ClientContact, 'client', 'pk'),
+        })
+
+
 class Client(models.Model):
     "client model for tenant's customers"
 
@@ -142,12 +248,17 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClientQuerySet.as_manager()
+
     class Meta:
         db_table = 'clients_client'
         verbose_name = _('Client')
         verbose_name_plural = _('Clients')
         unique_together = ['tenant', 'email']
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.company})" if self.company else self.name
@@ -162,10 +273,9 @@ class Client(models.Model):
 
     @property
     def total_invoiced(self):
-        from apps.invoices.models import Invoice
         return Invoice.objects.filter(
             client=self,
-            status__in=['sent', 'paid']
+            status__in=Invoice.INVOICED_STATUSES
         ).aggregate(total=models.Sum('total'))['total'] or 0
 
 
@@ -179,6 +289,7 @@ class ClientContact(models.Model):
     position = models.CharField(max_length=100, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'clients_contact'
@@ -187,7 +298,72 @@ class ClientContact(models.Model):
     def __str__(self):
         return f"{self.name} - {self.client.name}"
     
-class Project(models.Model):
+class ProjectQuerySet(models.QuerySet):
+    "queryset helpers for project listings"
+
+    def with_task_stats(self):
+        """Annotate task counts and logged hours from a single join on tasks.
+
+        This recomputes from scratch; reads should use the counter columns.
+        """
+        return self.annotate(
+            num_tasks=models.Count('tasks'),
+            num_completed_tasks=models.Count(
+                'tasks', filter=models.Q(tasks__status='completed')
+            ),
+            hours_logged_sum=Coalesce(
+                models.Sum('tasks__hours_logged'),
+                models.Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+    def with_client_stats(self):
+        """Annotate the owning client's stats as ``client_<name>``.
+
+        Correlated subqueries keep these from multiplying the task join
+        in with_task_stats().
+        """
+        client_projects = self.model.objects.filter(
+            client=models.OuterRef('client_id')
+        ).order_by().values('client')
+        return self.annotate(
+            client_num_projects=Coalesce(
+                models.Subquery(
+                    client_projects.annotate(n=models.Count('pk')).values('n')
+                ),
+                0,
+            ),
+            client_num_active_projects=Coalesce(
+                models.Subquery(
+                    client_projects.filter(status='active')
+                    .annotate(n=models.Count('pk')).values('n')
+                ),
+                0,
+            ),
+            client_invoiced_sum=invoiced_total(models.OuterRef('client_id')),
+        )
+
+    def change_validators(self):
+        """What the project serializers render, reduced to one aggregate row.
+
+        Covers the projects, their client and the client's stats (its
+        projects and invoices) and tasks. Assignees are not covered: users
+        carry no ``updated_at``.
+        """
+        return _change_validators(self, {
+            'tasks': (Task, 'project', 'pk'),
+            'client_projects': (Project, 'client', 'client_id'),
+            'client_invoices': (Invoice, 'client', 'client_id'),
+        }, client_updated=models.Max('client__updated_at'))
+
+    def for_listing(self):
+        "Everything ProjectListSerializer needs, in one query"
+        # task stats come from the rollup counter columns
+        return self.select_related('client').with_client_stats()
+
+
+class Project(RollupCountersMixin, models.Model):
     """Project model for tracking client work"""
     
     STATUS_CHOICES = [
@@ -244,40 +420,84 @@ class Project(models.Model):
         related_name='assigned_projects',
         blank=True
     )
+    task_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_task_count = models.PositiveIntegerField(default=0, editable=False)
+    hours_logged_total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
+    counter_fields = ('task_count', 'completed_task_count', 'hours_logged_total')
+
     class Meta:
         db_table = 'projects_project'
         verbose_name = _('Project')
         verbose_name_plural = _('Projects')
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination: Meta.ordering plus id, per tenant
+            models.Index(fields=['tenant', '-created_at', '-id']),
+            models.Index(fields=['tenant', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.client.name}"
 
     @property
     def total_tasks(self):
-        return self.tasks.count()
+        return self.task_count
 
     @property
     def completed_tasks(self):
-        return self.tasks.filter(status='completed').count()
+        return self.completed_task_count
 
     @property
     def progress_percentage(self):
-        if self.total_tasks == 0:
+        # prefer the with_task_stats() annotations over two extra counts
+        total = getattr(self, 'num_tasks', None)
+        completed = getattr(self, 'num_completed_tasks', None)
+        if total is None or completed is None:
+            total, completed = self.total_tasks, self.completed_tasks
+        if total == 0:
             return 0
-        return round((self.completed_tasks / self.total_tasks) * 100, 1)
+        return round((completed / total) * 100, 1)
 
     @property
     def total_hours_logged(self):
-        return self.tasks.aggregate(
-            total=models.Sum('hours_logged')
-        )['total'] or Decimal('0.00')
+        return self.hours_logged_total
+
+
+def _today():
+    return timezone.now().date()
+
+
+class TaskQuerySet(models.QuerySet):
+    "queryset helpers for the overdue checks"
+
+    # matches the condition of task_open_due_date_idx, so the database can
+    # answer overdue() from that partial index
+    OPEN_WITH_DUE_DATE = models.Q(due_date__isnull=False) & ~models.Q(status='completed')
+
+    def overdue(self, today=None):
+        "Tasks not completed whose due date is before ``today``"
+        return self.filter(self.OPEN_WITH_DUE_DATE, due_date__lt=today or _today())
+
+    def with_overdue(self, today=None):
+        "Annotate ``overdue``, what Task.is_overdue computes row by row"
+        return self.annotate(overdue=models.Case(
+            models.When(self.OPEN_WITH_DUE_DATE & models.Q(due_date__lt=today or _today()), then=True),
+            default=False,
+            output_field=models.BooleanField(),
+        ))
 
 
-class Task(models.Model):
+class Task(RollupCountersMixin, models.Model):
     """Task model for project breakdown"""
     
     STATUS_CHOICES = [
@@ -327,27 +547,129 @@ class Task(models.Model):
         related_name='created_tasks'
     )
     completed_at = models.DateTimeField(null=True, blank=True)
+    time_entry_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('hours_logged', 'time_entry_count')
+    tracked_fields = ('project_id', 'status')
+
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         db_table = 'projects_task'
         verbose_name = _('Task')
         verbose_name_plural = _('Tasks')
         ordering = ['priority', '-created_at']
+        indexes = [
+            # keyset pagination: Meta.ordering plus id, per project and overall;
+            # there is no tenant column, so tenant-wide pages also step over
+            # other tenants' tasks (see KeysetPagination)
+            models.Index(fields=['project', 'priority', '-created_at', '-id']),
+            models.Index(fields=['priority', '-created_at', '-id']),
+            models.Index(fields=['project', 'status']),
+            models.Index(fields=['assigned_to', 'due_date']),
+            # tasks that can still become overdue (see TaskQuerySet.overdue)
+            models.Index(
+                fields=['due_date'],
+                name='task_open_due_date_idx',
+                condition=TaskQuerySet.OPEN_WITH_DUE_DATE,
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.project.name}"
 
     @property
     def is_overdue(self):
+        # listings read the with_overdue() annotation instead
         if self.due_date and self.status != 'completed':
-            from django.utils import timezone
-            return timezone.now().date() > self.due_date
+            return _today() > self.due_date
         return False
 
 
-class TimeEntry(models.Model):
+class Invoice(models.Model):
+    """Invoice for a client, built from billed time entries"""
+
+    STATUS_CHOICES = [
+        ('draft', _('Draft')),
+        ('sent', _('Sent')),
+        ('paid', _('Paid')),
+        ('cancelled', _('Cancelled')),
+    ]
+    # statuses that count towards Client.total_invoiced
+    INVOICED_STATUSES = ['sent', 'paid']
+    # statuses the dashboard reports as outstanding
+    OUTSTANDING_STATUSES = ['draft', 'sent']
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='invoices')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='invoices')
+    invoice_number = models.CharField(_('invoice number'), max_length=50)
+    # the counter a generated invoice_number was made from (mysite.invoicing);
+    # None for numbers entered by hand
+    sequence = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
+    period_start = models.DateField(_('period start'))
+    period_end = models.DateField(_('period end'))
+    issue_date = models.DateField(_('issue date'))
+    due_date = models.DateField(_('due date'), null=True, blank=True)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    notes = models.TextField(_('notes'), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'invoices_invoice'
+        verbose_name = _('Invoice')
+        verbose_name_plural = _('Invoices')
+        unique_together = ['tenant', 'invoice_number']
+        ordering = ['-issue_date', '-id']
+        indexes = [
+            models.Index(fields=['client', 'status']),
+            models.Index(fields=['tenant', 'status']),
+            models.Index(fields=['tenant', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice_number} - {self.client.name}"
+
+
+class InvoiceLine(models.Model):
+    """One project's billed hours on an invoice"""
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='lines')
+    # a project cannot go while billed, unless its invoice goes with it
+    # (deleting the client removes both)
+    project = models.ForeignKey(Project, on_delete=models.RESTRICT, related_name='invoice_lines')
+    description = models.CharField(max_length=255)
+    hours = models.DecimalField(max_digits=10, decimal_places=2)
+    rate = models.DecimalField(max_digits=8, decimal_places=2)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        db_table = 'invoices_line'
+        verbose_name = _('Invoice Line')
+        verbose_name_plural = _('Invoice Lines')
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.invoice.invoice_number}: {self.description}"
+
+
+def invoiced_total(client_ref):
+    "Sum of sent/paid invoice totals for the client ``client_ref`` points at"
+    return Coalesce(
+        models.Subquery(
+            Invoice.objects.filter(client=client_ref, status__in=Invoice.INVOICED_STATUSES)
+            .order_by().values('client').annotate(total=models.Sum('total')).values('total')
+        ),
+        models.Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class TimeEntry(RollupCountersMixin, models.Model):
     """Time tracking for tasks"""
     
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='time_entries')
@@ -355,13 +677,260 @@ class TimeEntry(models.Model):
     hours = models.DecimalField(max_digits=5, decimal_places=2)
     description = models.TextField(blank=True)
     date = models.DateField()
+    invoice_line = models.ForeignKey(
+        InvoiceLine,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='time_entries',
+        help_text="Set once the entry has been billed"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ('task_id', 'user_id', 'date', 'hours')
+
     class Meta:
         db_table = 'projects_timeentry'
         verbose_name = _('Time Entry')
         verbose_name_plural = _('Time Entries')
         ordering = ['-date', '-created_at']
+        indexes = [
+            # keyset pagination: Meta.ordering plus id, per task and overall
+            # (tenant-wide pages also step over other tenants' entries, see
+            # KeysetPagination); the per-task one also serves (task, date)
+            # range filters
+            models.Index(fields=['task', '-date', '-created_at', '-id']),
+            models.Index(fields=['-date', '-created_at', '-id']),
+            models.Index(fields=['user', 'date']),
+            # what the invoice run scans for
+            models.Index(
+                fields=['task', 'date'],
+                name='timeentry_unbilled_idx',
+                condition=models.Q(invoice_line__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hours}h - {self.task.title} ({self.date})"
+
+
+class DailyTimeRollup(models.Model):
+    """Logged hours per tenant, project, task, user and day.
+
+    Maintained incrementally from TimeEntry writes (see mysite.rollups) so
+    reports aggregate days instead of raw entries.
+    """
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='daily_time_rollups')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='daily_time_rollups')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='daily_time_rollups')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_time_rollups')
+    date = models.DateField()
+    hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'reports_dailytimerollup'
+        verbose_name = _('Daily Time Rollup')
+        verbose_name_plural = _('Daily Time Rollups')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['task', 'user', 'date'], name='unique_daily_rollup_per_task_user_day'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'date']),
+            models.Index(fields=['tenant', 'project', 'date']),
+            models.Index(fields=['tenant', 'user', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.hours}h - task {self.task_id} / user {self.user_id} ({self.date})"
+
+
+class SearchDocument(models.Model):
+    """The searchable text of one client, project or task.
+
+    Kept in step with its object by mysite.search. The full-text index over
+    it (an FTS5 table on SQLite, a tsvector column on PostgreSQL) is
+    created by the migration and maintained by the database itself.
+    """
+
+    KIND_CHOICES = [
+        ('client', _('Client')),
+        ('project', _('Project')),
+        ('task', _('Task')),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='search_documents')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'search_document'
+        verbose_name = _('Search Document')
+        verbose_name_plural = _('Search Documents')
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class OverdueDigest(models.Model):
+    """The overdue tasks of one user, or of one project, on a given day.
+
+    Written for every tenant at once by the ``overdue_digest`` command
+    (see mysite.overdue). Unassigned tasks only show up in their
+    project's digest.
+    """
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='overdue_digests')
+    date = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='overdue_digests'
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True, related_name='overdue_digests'
+    )
+    task_ids = models.JSONField(default=list, help_text="Overdue task IDs, longest overdue first")
+    task_count = models.PositiveIntegerField(default=0)
+    oldest_due_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'reports_overduedigest'
+        verbose_name = _('Overdue Digest')
+        verbose_name_plural = _('Overdue Digests')
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(user__isnull=True) ^ models.Q(project__isnull=True),
+                name='overdue_digest_user_xor_project',
+            ),
+            models.UniqueConstraint(fields=['date', 'user', 'tenant'], name='unique_overdue_digest_per_user'),
+            models.UniqueConstraint(fields=['date', 'project'], name='unique_overdue_digest_per_project'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'date']),
+        ]
+
+    def __str__(self):
+        owner = f"user {self.user_id}" if self.user_id else f"project {self.project_id}"
+        return f"{self.task_count} overdue - {owner} ({self.date})"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_workers``.
+
+    ``kind`` names a function registered in mysite.jobs, called with the
+    tenant and ``payload``. Higher ``priority`` runs first.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (SUCCEEDED, _('Succeeded')),
+        (FAILED, _('Failed')),
+    ]
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs_job'
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # the claim query: next runnable job by priority
+            models.Index(fields=['status', '-priority', 'run_after', 'id']),
+            models.Index(fields=['tenant', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ProjectTemplate(models.Model):
+    """A reusable project structure: a list of tasks with estimates.
+
+    Dates are kept as day offsets from the project start, so a project
+    made from the template can start on any date (see mysite.cloning).
+    """
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='project_templates')
+    name = models.CharField(_('name'), max_length=200)
+    description = models.TextField(_('description'), blank=True)
+    priority = models.IntegerField(choices=Project.PRIORITY_CHOICES, default=2)
+    estimated_hours = models.DecimalField(
+        _('estimated hours'), max_digits=8, decimal_places=2, default=Decimal('0.00')
+    )
+    duration_days = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Days from start to end date; empty for open-ended projects"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_project_templates'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'projects_template'
+        verbose_name = _('Project Template')
+        verbose_name_plural = _('Project Templates')
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TaskTemplate(models.Model):
+    "one task of a project template"
+
+    template = models.ForeignKey(ProjectTemplate, on_delete=models.CASCADE, related_name='tasks')
+    title = models.CharField(_('title'), max_length=200)
+    description = models.TextField(_('description'), blank=True)
+    priority = models.IntegerField(choices=Task.PRIORITY_CHOICES, default=2)
+    hours_estimated = models.DecimalField(
+        _('estimated hours'), max_digits=5, decimal_places=2, default=Decimal('0.00')
+    )
+    due_offset_days = models.IntegerField(
+        null=True, blank=True, help_text="Days from the project start to the due date"
+    )
+
+    class Meta:
+        db_table = 'projects_tasktemplate'
+        verbose_name = _('Task Template')
+        verbose_name_plural = _('Task Templates')
+        ordering = ['id']
 
     def __str__(self):
-        return f"{self.hours}h - {self.task.title} ({self.date})"
\ No newline at end of file
+        return self.title
@@ -0,0 +1,65 @@
+"""Daily digests of overdue tasks.
+
+``write_digests`` reads the overdue tasks of every active tenant in one
+query, answered from the ``task_open_due_date_idx`` partial index, and
+streams them ordered by tenant: each tenant's tasks are grouped by
+assignee and by project and written as ``OverdueDigest`` rows before the
+next tenant is read.
+"""
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OverdueDigest, Task
+
+
+def _digests(tenant_id, today, tasks):
+    "the digests of one tenant's overdue ``(pk, project_id, user_id, due_date)`` tasks"
+    by_user, by_project = defaultdict(list), defaultdict(list)
+    for pk, project_id, user_id, due_date in tasks:
+        by_project[project_id].append((pk, due_date))
+        if user_id is not None:
+            by_user[user_id].append((pk, due_date))
+    # tasks arrive longest overdue first, and stay in that order
+    return [
+        OverdueDigest(
+            tenant_id=tenant_id, date=today, **{owner: owner_id},
+            task_ids=[pk for pk, _ in items], task_count=len(items), oldest_due_date=items[0][1],
+        )
+        for owner, groups in (('user_id', by_user), ('project_id', by_project))
+        for owner_id, items in groups.items()
+    ]
+
+
+def write_digests(today=None, chunk_size=2000):
+    """Replace the digests of ``today`` (default: the current date).
+
+    Returns how many tenants, overdue tasks and digests were written.
+    """
+    today = today or timezone.now().date()
+    rows = (
+        Task.objects.overdue(today)
+        .filter(project__tenant__is_active=True)
+        .order_by('project__tenant_id', 'due_date', 'pk')
+        .values_list('project__tenant_id', 'pk', 'project_id', 'assigned_to_id', 'due_date')
+    )
+    counts = {'tenants': 0, 'tasks': 0, 'digests': 0}
+    # one transaction, so a rerun swaps the day's digests atomically
+    with transaction.atomic():
+        OverdueDigest.objects.filter(date=today).delete()
+        for tenant_id, tenant_rows in groupby(rows.iterator(chunk_size=chunk_size), key=itemgetter(0)):
+            tasks = [row[1:] for row in tenant_rows]
+            digests = OverdueDigest.objects.bulk_create(_digests(tenant_id, today, tasks), batch_size=500)
+            counts['tenants'] += 1
+            counts['tasks'] += len(tasks)
+            counts['digests'] += len(digests)
+    return counts
+
+
+def prune_digests(before):
+    "Delete the digests older than ``before``; returns how many"
+    deleted, _ = OverdueDigest.objects.filter(date__lt=before).delete()
+    return deleted
@@ -0,0 +1,59 @@
+"""Per-request query counting (see QueryCountMiddleware).
+
+Every database connection gets one execute wrapper when it is opened;
+it adds each query and its time to the counter of the current context.
+The counter lives in a ContextVar rather than on the connection, so it
+follows the request through sync_to_async and the query pool, and
+requests sharing a thread under ASGI do not count each other's queries.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_counter = ContextVar('query_counter', default=None)
+
+
+class QueryCounter:
+    "the number of queries run for a request and their total time"
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # the query pool runs one request's queries on several threads
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+def start_counting():
+    "Count the queries of the current context from now on; returns the counter"
+    counter = QueryCounter()
+    _counter.set(counter)
+    return counter
+
+
+def stop_counting():
+    _counter.set(None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.add(time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
@@ -0,0 +1,56 @@
+"""Bounded thread pool for running ORM work concurrently from async views.
+
+Django's async ORM methods all funnel through the one thread-sensitive
+executor, so independent queries issued from an async view still run one
+after another. ``run_in_pool`` sends them to a separate pool of
+``ASYNC_QUERY_WORKERS`` threads instead. Each thread keeps its own
+database connection between jobs, so the pool also bounds the number of
+extra connections; a connection is only replaced once it is broken.
+
+Work sent here runs outside the caller's transaction, so it only sees
+committed data.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ASYNC_QUERY_WORKERS', 4),
+                    thread_name_prefix='querypool',
+                )
+    return _executor
+
+
+def _drop_broken_connections():
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None and conn.errors_occurred:
+            if conn.is_usable():
+                conn.errors_occurred = False
+            else:
+                conn.close()
+
+
+def _with_connection(func):
+    def run(*args, **kwargs):
+        _drop_broken_connections()
+        return func(*args, **kwargs)
+    return run
+
+
+def run_in_pool(func, *args, **kwargs):
+    "Awaitable running ``func(*args, **kwargs)`` on the query pool"
+    return sync_to_async(_with_connection(func), thread_sensitive=False, executor=get_executor())(
+        *args, **kwargs
+    )
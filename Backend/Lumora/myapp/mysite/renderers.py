@@ -0,0 +1,49 @@
+"""JSON renderer backed by orjson, with the stdlib encoder as fallback.
+
+Output is byte-for-byte what ``rest_framework.renderers.JSONRenderer``
+produces with the default settings: compact separators, unescaped
+unicode, ``\\u2028``/``\\u2029`` escaped, and dates, decimals and every
+other non-JSON type encoded by DRF's own ``JSONEncoder``. Whenever the
+two could differ (indented output, non-default settings, values orjson
+refuses) the stdlib renderer is used instead. The known differences left
+are floats: exponent notation (``1e16`` rather than ``1e+16``) and NaN,
+which orjson writes as null where the stdlib renderer raises. The API
+only emits small finite floats such as ``progress_percentage``.
+
+orjson is pinned in requirements.txt; an install without it silently
+renders everything through the stdlib path, which
+``manage.py benchmark_list_rendering`` warns about.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encoder.default,
+                # dates/times go through DRF's encoder, which trims
+                # microseconds to milliseconds and writes UTC as Z
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. integers beyond 64 bits or non-str dict keys
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+_encoder = JSONEncoder()
@@ -0,0 +1,44 @@
+"""Time reports read from DailyTimeRollup rather than raw time entries."""
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .db import read_alias
+from .models import DailyTimeRollup
+
+# group_by value -> values() columns of each report row
+REPORT_GROUPINGS = {
+    'day': ['date'],
+    'project': ['project_id', 'project__name'],
+    'client': ['project__client_id', 'project__client__name'],
+    'task': ['task_id', 'task__title', 'project_id'],
+    'user': ['user_id', 'user__email'],
+}
+
+
+def time_report(tenant, group_by='project', start=None, end=None, project_id=None, user_id=None):
+    "Hours and entry counts for the tenant, grouped by ``group_by``"
+    rollups = DailyTimeRollup.objects.using(read_alias()).filter(tenant=tenant)
+    if start is not None:
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        rollups = rollups.filter(date__lte=end)
+    if project_id is not None:
+        rollups = rollups.filter(project_id=project_id)
+    if user_id is not None:
+        rollups = rollups.filter(user_id=user_id)
+
+    columns = REPORT_GROUPINGS[group_by]
+    rows = list(
+        rollups.values(*columns)
+        .annotate(hours=Sum('hours'), entries=Sum('entry_count'))
+        .order_by(*columns)
+    )
+    return {
+        'group_by': group_by,
+        'start': start,
+        'end': end,
+        'total_hours': sum((row['hours'] for row in rows), Decimal('0.00')),
+        'total_entries': sum(row['entries'] for row in rows),
+        'rows': rows,
+    }
@@ -0,0 +1,104 @@
+"""Per-tenant API response cache.
+
+Cached responses are keyed by tenant, URL and a per-tenant version
+counter. Saving or deleting any of the tenant's clients, contacts,
+projects, tasks, time entries or invoices bumps the counter, so every
+cached response of that tenant goes stale at once without having to
+know which keys exist. Works with any cache backend that supports
+``incr`` (locmem, file, memcached, redis).
+
+Writes that bypass the model signals (``bulk_create``, ``update()``)
+must call ``bump_tenant_version`` themselves.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Client, ClientContact, Invoice, Project, Task, Tenant, TimeEntry
+
+TRACKED_MODELS = (Client, ClientContact, Project, Task, TimeEntry, Invoice)
+
+
+def _version_key(tenant_id):
+    return f'api:version:{tenant_id}'
+
+
+def tenant_version(tenant_id):
+    "the tenant's current version, starting one if the cache has none"
+    key = _version_key(tenant_id)
+    version = cache.get(key)
+    if version is None:
+        # start from the clock rather than 1: if the counter is evicted, a
+        # restarted one must not reach versions that still have entries
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tenant_version(tenant_id):
+    "Invalidate every cached response of the tenant, now and again on commit"
+    _bump(tenant_id)
+    # a read between this bump and the commit may cache the old rows under
+    # the new version; the second bump retires them
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(tenant_id))
+
+
+def _bump(tenant_id):
+    try:
+        cache.incr(_version_key(tenant_id))
+    except ValueError:
+        tenant_version(tenant_id)
+
+
+def response_key(tenant_id, url, version=None):
+    if version is None:
+        version = tenant_version(tenant_id)
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f'api:response:{tenant_id}:{version}:{digest}'
+
+
+def get_cached(tenant_id, url):
+    "``(key, cached value or None)`` for the tenant's current version"
+    key = response_key(tenant_id, url)
+    return key, cache.get(key)
+
+
+def set_cached(key, value):
+    cache.set(key, value, getattr(settings, 'API_CACHE_TTL', 300))
+
+
+def _tenant_id(instance):
+    "the tenant an instance belongs to, through cached relations when possible"
+    if isinstance(instance, (Client, Project, Invoice)):
+        return instance.tenant_id
+    if isinstance(instance, ClientContact):
+        owner, model, pk = 'client', Client, instance.client_id
+    elif isinstance(instance, Task):
+        owner, model, pk = 'project', Project, instance.project_id
+    else:
+        owner, model, pk = 'task', Task, instance.task_id
+    if owner in instance._state.fields_cache:
+        parent = instance._state.fields_cache[owner]
+        return _tenant_id(parent) if parent is not None else None
+    lookup = 'project__tenant_id' if model is Task else 'tenant_id'
+    return model.objects.filter(pk=pk).values_list(lookup, flat=True).first()
+
+
+def tenant_data_changed(sender, instance, origin=None, **kwargs):
+    # rows deleted in a cascade are covered by the bump for the tracked
+    # instance that started it; a deleted tenant has nothing left to serve
+    if origin is not instance and isinstance(origin, TRACKED_MODELS + (Tenant,)):
+        return
+    tenant_id = _tenant_id(instance)
+    if tenant_id is not None:
+        bump_tenant_version(tenant_id)
+
+
+for _model in TRACKED_MODELS:
+    post_save.connect(tenant_data_changed, sender=_model, dispatch_uid=f'responsecache.{_model.__name__}')
+    post_delete.connect(tenant_data_changed, sender=_model, dispatch_uid=f'responsecache.{_model.__name__}')
@@ -0,0 +1,393 @@
+"""Denormalized rollup counters for projects and tasks.
+
+``Project.task_count``/``completed_task_count``/``hours_logged_total`` and
+``Task.hours_logged``/``time_entry_count`` are kept current with F()
+deltas from the signal handlers below, so reading them is O(1) and a
+write never re-aggregates its siblings. A counter change also moves the
+row's ``updated_at``, which the ETag validators read.
+``rebuild_*`` recompute them from scratch (see the ``rebuild_rollups``
+management command).
+
+The same handlers keep ``DailyTimeRollup`` in step with time entries;
+``rebuild_daily_rollups`` repairs a date range of it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, Q, QuerySet, Sum, When
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Client, DailyTimeRollup, Project, Task, Tenant, TimeEntry
+
+
+def apply_project_deltas(project_id, tasks=0, completed=0, hours=Decimal('0')):
+    "Shift one project's counters by the given deltas in a single UPDATE"
+    hours = Decimal(str(hours))
+    updates = {}
+    if tasks:
+        updates['task_count'] = F('task_count') + tasks
+    if completed:
+        updates['completed_task_count'] = F('completed_task_count') + completed
+    if hours:
+        updates['hours_logged_total'] = F('hours_logged_total') + hours
+    if updates and project_id is not None:
+        Project.objects.filter(pk=project_id).update(updated_at=Now(), **updates)
+
+
+def apply_task_deltas(task_id, entries=0, hours=Decimal('0')):
+    """Shift one task's counters, and its project's hours, by the deltas.
+
+    Costs two UPDATEs regardless of how many entries the task has.
+    """
+    hours = Decimal(str(hours))
+    if task_id is None or not (entries or hours):
+        return
+    _shift_task(task_id, entries, hours)
+    if hours:
+        Project.objects.filter(tasks__pk=task_id).update(
+            updated_at=Now(),
+            hours_logged_total=F('hours_logged_total') + hours
+        )
+
+
+def _shift_task(task_id, entries, hours):
+    updates = {}
+    if entries:
+        updates['time_entry_count'] = F('time_entry_count') + entries
+    if hours:
+        updates['hours_logged'] = F('hours_logged') + hours
+    Task.objects.filter(pk=task_id).update(updated_at=Now(), **updates)
+
+
+def apply_daily_deltas(deltas):
+    """Apply ``{(task_id, user_id, date): (entries, hours)}`` to DailyTimeRollup.
+
+    Added entries are upserted in one statement per batch; removals and
+    hour edits shift the existing rows with F(), and rows whose last entry
+    went away are dropped.
+    """
+    added = {}
+    emptied = Q()
+    for (task_id, user_id, day), (entries, hours) in deltas.items():
+        hours = Decimal(str(hours))
+        if entries > 0:
+            added[(task_id, user_id, day)] = (entries, hours)
+        elif entries or hours:
+            key = Q(task_id=task_id, user_id=user_id, date=day)
+            DailyTimeRollup.objects.filter(key).update(
+                entry_count=F('entry_count') + entries, hours=F('hours') + hours
+            )
+            if entries < 0:
+                emptied |= key
+    if emptied:
+        DailyTimeRollup.objects.filter(emptied, entry_count__lte=0).delete()
+    if added:
+        _upsert_daily(added)
+
+
+def _upsert_daily(added):
+    """INSERT ... ON CONFLICT DO UPDATE adding to existing rollup rows.
+
+    The additive update cannot be expressed with bulk_create(update_conflicts=True),
+    which overwrites; the syntax is shared by SQLite and PostgreSQL.
+    """
+    owners = {
+        row['pk']: (row['project__tenant_id'], row['project_id'])
+        for row in Task.objects.filter(pk__in={task_id for task_id, _, _ in added})
+        .values('pk', 'project_id', 'project__tenant_id')
+    }
+    fields = [
+        DailyTimeRollup._meta.get_field(name)
+        for name in ('tenant', 'project', 'task', 'user', 'date', 'hours', 'entry_count')
+    ]
+    rows = [
+        (*owners[task_id], task_id, user_id, day, hours, entries)
+        for (task_id, user_id, day), (entries, hours) in added.items()
+        if task_id in owners
+    ]
+    connection = connections[router.db_for_write(DailyTimeRollup)]
+    table = connection.ops.quote_name(DailyTimeRollup._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    max_params = connection.features.max_query_params or 999
+    batch_size = max(1, max_params // len(fields))
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
+            params = [
+                field.get_db_prep_save(value, connection)
+                for row in batch for field, value in zip(fields, row)
+            ]
+            placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+                f"ON CONFLICT (task_id, user_id, date) DO UPDATE SET "
+                f"hours = {table}.hours + excluded.hours, "
+                f"entry_count = {table}.entry_count + excluded.entry_count",
+                params,
+            )
+
+
+def bulk_create_time_entries(entries, task_projects, batch_size=500):
+    """``bulk_create`` time entries and roll them up once per task and project.
+
+    ``bulk_create`` bypasses the post_save handler, so the deltas are summed
+    here and applied with one UPDATE per affected task and per affected
+    project. ``task_projects`` maps each entry's task_id to its project_id.
+    """
+    per_task = defaultdict(lambda: [0, Decimal('0')])
+    per_day = defaultdict(lambda: [0, Decimal('0')])
+    for entry in entries:
+        hours = Decimal(str(entry.hours))
+        for totals in (per_task[entry.task_id], per_day[(entry.task_id, entry.user_id, entry.date)]):
+            totals[0] += 1
+            totals[1] += hours
+    per_project = defaultdict(Decimal)
+    for task_id, (_, hours) in per_task.items():
+        per_project[task_projects[task_id]] += hours
+
+    with transaction.atomic():
+        created = TimeEntry.objects.bulk_create(entries, batch_size=batch_size)
+        for task_id, (count, hours) in per_task.items():
+            _shift_task(task_id, count, hours)
+        for project_id, hours in per_project.items():
+            apply_project_deltas(project_id, hours=hours)
+        apply_daily_deltas(per_day)
+    return created
+
+
+def bulk_update_tasks(task_ids, changes, batch_size=500):
+    """Apply ``changes`` (status, priority, assigned_to) to the given tasks.
+
+    One UPDATE per batch of ids instead of a save per task, then one
+    counter UPDATE per project whose completed count moved. ``completed_at``
+    follows TaskDetailSerializer.update: set when a task becomes completed,
+    kept when it already was, cleared when it leaves that status. Returns
+    how many tasks and projects were updated.
+    """
+    updates = dict(changes, updated_at=Now())
+    new_status = changes.get('status')
+    if new_status == 'completed':
+        # the CASE reads the row's status before this UPDATE sets it
+        updates['completed_at'] = Case(
+            When(status='completed', then=F('completed_at')), default=Now(),
+        )
+    elif new_status is not None:
+        updates['completed_at'] = None
+
+    with transaction.atomic():
+        rows = list(
+            Task.objects.filter(pk__in=task_ids).select_for_update()
+            .values_list('pk', 'project_id', 'status')
+        )
+        per_project = defaultdict(int)
+        for _, project_id, status in rows:
+            if new_status is not None and (new_status == 'completed') != (status == 'completed'):
+                per_project[project_id] += 1 if new_status == 'completed' else -1
+            else:
+                per_project.setdefault(project_id, 0)
+        pks = [pk for pk, _, _ in rows]
+        for offset in range(0, len(pks), batch_size):
+            Task.objects.filter(pk__in=pks[offset:offset + batch_size]).update(**updates)
+        for project_id, completed in per_project.items():
+            apply_project_deltas(project_id, completed=completed)
+    return {'updated': len(pks), 'projects': len(per_project)}
+
+
+def _cascaded_from(origin, parents):
+    """True when the delete started at one of ``parents``.
+
+    Deleting a task, project, client or tenant accounts for the rows it
+    cascades to (or takes the counters with it), so repeating the deltas
+    in the children's handlers would count them twice. Other cascades,
+    e.g. from a deleted user, still need the children's deltas.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, parents)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    completed = 1 if instance.status == 'completed' else 0
+    if created:
+        apply_project_deltas(instance.project_id, 1, completed, instance.hours_logged)
+    else:
+        previous_project = instance.tracked_previous('project_id')
+        previous_status = instance.tracked_previous('status')
+        if previous_project is not None and previous_status is not None:
+            was_completed = 1 if previous_status == 'completed' else 0
+            if previous_project != instance.project_id:
+                apply_project_deltas(previous_project, -1, -was_completed, -instance.hours_logged)
+                apply_project_deltas(instance.project_id, 1, completed, instance.hours_logged)
+                DailyTimeRollup.objects.filter(task_id=instance.pk).update(project_id=instance.project_id)
+            else:
+                apply_project_deltas(instance.project_id, completed=completed - was_completed)
+    instance.snapshot_tracked()
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance, origin=None, **kwargs):
+    # queryset deletes collect fresh rows, but a long-lived instance may
+    # predate F() increments to its own counters
+    if origin is instance:
+        instance.refresh_from_db(fields=['status', 'hours_logged'])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded_from(origin, (Project, Client, Tenant)):
+        return
+    completed = 1 if instance.status == 'completed' else 0
+    apply_project_deltas(instance.project_id, -1, -completed, -instance.hours_logged)
+
+
+def _day_key(entry, previous=False):
+    if previous:
+        return tuple(entry.tracked_previous(name) for name in ('task_id', 'user_id', 'date'))
+    # instances built with a date string still need to match loaded rows
+    day = TimeEntry._meta.get_field('date').to_python(entry.date)
+    return (entry.task_id, entry.user_id, day)
+
+
+@receiver(post_save, sender=TimeEntry)
+def time_entry_saved(sender, instance, created, **kwargs):
+    hours = Decimal(str(instance.hours))
+    if created:
+        apply_task_deltas(instance.task_id, 1, hours)
+        apply_daily_deltas({_day_key(instance): (1, hours)})
+    else:
+        previous_task = instance.tracked_previous('task_id')
+        previous_hours = instance.tracked_previous('hours')
+        if previous_task is not None and previous_hours is not None:
+            if previous_task != instance.task_id:
+                apply_task_deltas(previous_task, -1, -previous_hours)
+                apply_task_deltas(instance.task_id, 1, hours)
+            else:
+                apply_task_deltas(instance.task_id, hours=hours - previous_hours)
+            previous_key = _day_key(instance, previous=True)
+            if previous_key == _day_key(instance):
+                apply_daily_deltas({previous_key: (0, hours - previous_hours)})
+            elif None not in previous_key:
+                apply_daily_deltas({previous_key: (-1, -previous_hours)})
+                apply_daily_deltas({_day_key(instance): (1, hours)})
+    instance.snapshot_tracked()
+
+
+@receiver(pre_delete, sender=TimeEntry)
+def time_entry_deleting(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        instance.refresh_from_db(fields=['task', 'user', 'date', 'hours'])
+
+
+@receiver(post_delete, sender=TimeEntry)
+def time_entry_deleted(sender, instance, origin=None, **kwargs):
+    if not _cascaded_from(origin, (Task, Project, Client, Tenant)):
+        apply_task_deltas(instance.task_id, -1, -instance.hours)
+        apply_daily_deltas({_day_key(instance): (-1, -Decimal(str(instance.hours)))})
+
+
+def _chunked_pks(queryset, chunk_size):
+    "Yield lists of primary keys in ascending order, one chunk at a time"
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def rebuild_task_counters(chunk_size=500):
+    "Recompute Task.hours_logged/time_entry_count from time entries"
+    rebuilt = 0
+    for pks in _chunked_pks(Task.objects.all(), chunk_size):
+        stats = {
+            row['task_id']: row
+            for row in TimeEntry.objects.filter(task_id__in=pks)
+            .order_by().values('task_id')
+            .annotate(hours=Sum('hours'), entries=Count('pk'))
+        }
+        tasks = [
+            Task(
+                pk=pk,
+                hours_logged=stats.get(pk, {}).get('hours') or Decimal('0.00'),
+                time_entry_count=stats.get(pk, {}).get('entries', 0),
+            )
+            for pk in pks
+        ]
+        with transaction.atomic():
+            Task.objects.bulk_update(tasks, ['hours_logged', 'time_entry_count'])
+        rebuilt += len(pks)
+    return rebuilt
+
+
+def rebuild_project_counters(chunk_size=500):
+    "Recompute the Project counters from its tasks"
+    rebuilt = 0
+    for pks in _chunked_pks(Project.objects.all(), chunk_size):
+        projects = [
+            Project(
+                pk=row['pk'],
+                task_count=row['num_tasks'],
+                completed_task_count=row['num_completed_tasks'],
+                hours_logged_total=row['hours_logged_sum'],
+            )
+            for row in Project.objects.filter(pk__in=pks).order_by().with_task_stats()
+            .values('pk', 'num_tasks', 'num_completed_tasks', 'hours_logged_sum')
+        ]
+        with transaction.atomic():
+            Project.objects.bulk_update(
+                projects, ['task_count', 'completed_task_count', 'hours_logged_total']
+            )
+        rebuilt += len(pks)
+    return rebuilt
+
+
+def rebuild_daily_rollups(start, end, tenant=None, progress=None):
+    """Recompute DailyTimeRollup for ``start``..``end`` inclusive, one day per transaction.
+
+    ``progress(days_done, days_total)`` is called after every day. Returns
+    the number of rollup rows written.
+    """
+    written = 0
+    days = (end - start).days + 1
+    day = start
+    while day <= end:
+        entries = TimeEntry.objects.filter(date=day)
+        rollups = DailyTimeRollup.objects.filter(date=day)
+        if tenant is not None:
+            entries = entries.filter(task__project__tenant=tenant)
+            rollups = rollups.filter(tenant=tenant)
+        rows = (
+            entries.order_by()
+            .values('task_id', 'user_id', 'task__project_id', 'task__project__tenant_id')
+            .annotate(total=Sum('hours'), entries=Count('pk'))
+        )
+        with transaction.atomic():
+            rollups.delete()
+            created = DailyTimeRollup.objects.bulk_create(
+                (
+                    DailyTimeRollup(
+                        tenant_id=row['task__project__tenant_id'],
+                        project_id=row['task__project_id'],
+                        task_id=row['task_id'],
+                        user_id=row['user_id'],
+                        date=day,
+                        hours=row['total'],
+                        entry_count=row['entries'],
+                    )
+                    for row in rows.iterator()
+                ),
+                batch_size=1000,
+            )
+        written += len(created)
+        day += timedelta(days=1)
+        if progress is not None:
+            progress((day - start).days, days)
+    return written
@@ -0,0 +1,226 @@
+"""Read-only serialization straight from ``values_list()`` rows.
+
+A ``RowPlan`` is compiled once per serializer class (and set of queryset
+annotations): every readable field is resolved to a ``values_list()``
+lookup and the cheapest converter that gives the same output as the
+field's ``to_representation``. Rendering a list then skips model
+instantiation and DRF's per-field attribute traversal entirely.
+
+Fields resolve as follows:
+
+* model fields, following ``source`` through relations, become lookups
+  such as ``assigned_to__profile__created_at``;
+* ``AnnotatedReadOnlyField`` reads its annotation when the queryset has
+  it; on a nested serializer the annotation is looked for on the root
+  row as ``<path>_<annotation>`` (see ``ProjectClientStatsMixin``);
+* nested serializers are inlined, and come out as ``None`` when the
+  relation is empty;
+* anything else (model properties) must be listed in the serializer's
+  ``row_plan_columns`` with the columns the property reads; it is then
+  evaluated on a bare model instance carrying only those columns.
+"""
+import threading
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializer import AnnotatedReadOnlyField
+
+# to_representation is the identity for the values these fields get back
+# from the database, so the call can be skipped
+_IDENTITY_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.BooleanField,
+    serializers.IntegerField,
+)
+
+
+def _iso_datetime(field):
+    """False unless the field renders ISO 8601.
+
+    Otherwise the field's fixed timezone, or None to follow the current one.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not isinstance(output_format, str) or output_format.lower() != ISO_8601:
+        return False
+    return getattr(field, 'timezone', None)
+
+
+def _identity_field(field):
+    if isinstance(field, serializers.ChoiceField):
+        return False
+    if isinstance(field, serializers.CharField):
+        return True
+    return isinstance(field, _IDENTITY_FIELDS)
+
+
+class RowPlan:
+    "compiled field plan for one serializer class over one queryset shape"
+
+    def __init__(self, serializer_class, model, annotations, prefix=(), root=None):
+        self.serializer_class = serializer_class
+        self.model = model
+        self.root = root or self
+        if root is None:
+            self.lookups = []
+            self.annotations = annotations
+        self.prefix = prefix
+        # (key, kind, payload) where kind is 'value', 'datetime', 'property'
+        # or 'nested'
+        self.steps = []
+        self.presence = None
+        if prefix:
+            self.presence = self.root.column('__'.join(prefix + (model._meta.pk.attname,)))
+        self._compile(serializer_class())
+
+    def column(self, lookup):
+        "index of ``lookup`` in the root values_list(), adding it if needed"
+        lookups = self.root.lookups
+        if lookup not in lookups:
+            lookups.append(lookup)
+        return lookups.index(lookup)
+
+    def _compile(self, serializer):
+        property_columns = getattr(self.serializer_class, 'row_plan_columns', {})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name}: nested lists have no row plan'
+                )
+            if isinstance(field, serializers.BaseSerializer):
+                related = self._resolve(field.source_attrs)
+                if related is None or not related.is_relation:
+                    raise ImproperlyConfigured(
+                        f'{self.serializer_class.__name__}.{name}: {field.source} is not a relation'
+                    )
+                nested = RowPlan(
+                    type(field), related.related_model, None,
+                    prefix=self.prefix + tuple(field.source_attrs), root=self.root,
+                )
+                self.steps.append((name, 'nested', nested))
+                continue
+            if isinstance(field, AnnotatedReadOnlyField):
+                annotation = '_'.join(self.prefix + (field.annotation,))
+                if annotation in self.root.annotations:
+                    self.steps.append((name, 'value', (self.column(annotation), None)))
+                    continue
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                lookup = '__'.join(self.prefix + tuple(field.source_attrs) + ('pk',))
+                self.steps.append((name, 'value', (self.column(lookup), None)))
+                continue
+            if isinstance(field, serializers.RelatedField):
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name}: only primary key relations have a row plan'
+                )
+
+            convert = None if _identity_field(field) else field.to_representation
+            model_field = self._resolve(field.source_attrs)
+            if model_field is not None and model_field.concrete and not model_field.is_relation:
+                lookup = '__'.join(self.prefix + tuple(field.source_attrs))
+                field_timezone = (
+                    _iso_datetime(field) if isinstance(field, serializers.DateTimeField) else False
+                )
+                if field_timezone is not False:
+                    self.steps.append((name, 'datetime', (self.column(lookup), field_timezone, convert)))
+                else:
+                    self.steps.append((name, 'value', (self.column(lookup), convert)))
+            elif field.source in property_columns:
+                columns = [
+                    (attname, self.column('__'.join(self.prefix + (attname,))))
+                    for attname in property_columns[field.source]
+                ]
+                self.steps.append((name, 'property', (field.source, columns, convert)))
+            else:
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name}: {field.source!r} is not a '
+                    f'column; list the columns it reads in row_plan_columns'
+                )
+
+    def _resolve(self, source_attrs):
+        "the model field ``source_attrs`` ends on, or None for a non-field attribute"
+        model, field = self.model, None
+        for attr in source_attrs:
+            if model is None:
+                return None
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model if field.is_relation else None
+        return field
+
+    def build(self, row, current_timezone):
+        "one serialized row, equal to what the serializer would have produced"
+        if self.presence is not None and row[self.presence] is None:
+            return None
+        out = {}
+        for key, kind, payload in self.steps:
+            if kind == 'value':
+                index, convert = payload
+                value = row[index]
+                if value is not None and convert is not None:
+                    value = convert(value)
+            elif kind == 'datetime':
+                # DateTimeField.to_representation without looking up the
+                # current timezone for every value
+                index, field_timezone, convert = payload
+                value = row[index]
+                if value is not None:
+                    tz = field_timezone or current_timezone
+                    if value.utcoffset() is None:
+                        value = convert(value)
+                    else:
+                        value = value.astimezone(tz or dt_timezone.utc)
+                        if tz is None:
+                            value = value.replace(tzinfo=None)
+                        value = value.isoformat()
+                        if value.endswith('+00:00'):
+                            value = value[:-6] + 'Z'
+            elif kind == 'nested':
+                value = payload.build(row, current_timezone)
+            else:
+                source, columns, convert = payload
+                instance = self.model.__new__(self.model)
+                instance.__dict__.update((attname, row[index]) for attname, index in columns)
+                value = getattr(instance, source)
+                if value is not None and convert is not None:
+                    value = convert(value)
+            out[key] = value
+        return out
+
+    def values_list(self, queryset):
+        "``queryset`` reduced to the plan's columns, as named rows"
+        return queryset.values_list(*self.lookups, named=True)
+
+    def render(self, rows):
+        build = self.build
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [build(row, current_timezone) for row in rows]
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_row_plan(serializer_class, queryset, extra_columns=()):
+    """The compiled plan for ``serializer_class`` over ``queryset``.
+
+    ``extra_columns`` are fetched without being rendered (e.g. the keyset
+    pagination ordering), so they are addressable on the named rows.
+    """
+    annotations = frozenset(queryset.query.annotations)
+    key = (serializer_class, queryset.model, annotations, tuple(extra_columns))
+    plan = _plans.get(key)
+    if plan is None:
+        plan = RowPlan(serializer_class, queryset.model, annotations)
+        for lookup in extra_columns:
+            plan.column(lookup)
+        with _plans_lock:
+            plan = _plans.setdefault(key, plan)
+    return plan
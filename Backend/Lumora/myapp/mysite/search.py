@@ -0,0 +1,194 @@
+"""Tenant-scoped full-text search over clients, projects and tasks.
+
+Each searchable object has a ``SearchDocument`` row, upserted from the
+post_save signal and removed on post_delete; writes that bypass the
+signals (``bulk_create``, ``update()``) go through ``index_objects`` or
+the ``rebuild_search_index`` command. The full-text index over the
+documents is maintained by the database: an FTS5 table on SQLite, a
+tsvector column on PostgreSQL (see migration 0010). Other databases fall
+back to ``icontains``.
+
+Every word of the query must match, as a prefix, the title or body.
+Titles weigh more than bodies in the ranking.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+from .db import read_alias
+from .models import Client, Project, SearchDocument, Task, Tenant
+
+# kind -> (model, tenant lookup, title field, body field)
+SEARCH_KINDS = {
+    'client': (Client, 'tenant_id', 'name', 'company'),
+    'project': (Project, 'tenant_id', 'name', 'description'),
+    'task': (Task, 'project__tenant_id', 'title', 'description'),
+}
+KIND_OF_MODEL = {model: kind for kind, (model, *_) in SEARCH_KINDS.items()}
+
+_words = re.compile(r'\w+')
+
+
+def _document(kind, pk, tenant_id, title, body):
+    title_field = SearchDocument._meta.get_field('title')
+    return SearchDocument(
+        tenant_id=tenant_id, kind=kind, object_id=pk,
+        title=title[:title_field.max_length], body=body or '',
+    )
+
+
+def _upsert(documents, batch_size=1000):
+    # one INSERT ... ON CONFLICT per batch; the index follows via the
+    # database's own triggers or generated column
+    SearchDocument.objects.bulk_create(
+        documents, batch_size=batch_size, update_conflicts=True,
+        unique_fields=['kind', 'object_id'], update_fields=['tenant', 'title', 'body'],
+    )
+
+
+def index_objects(kind, queryset, chunk_size=1000, progress=None):
+    """(Re)index the objects of ``queryset``; returns how many were indexed.
+
+    ``progress(indexed)`` is called after every batch.
+    """
+    model, tenant, title, body = SEARCH_KINDS[kind]
+    rows = queryset.values_list('pk', tenant, title, body).order_by('pk')
+    batch, count = [], 0
+    for pk, tenant_id, title_text, body_text in rows.iterator(chunk_size=chunk_size):
+        batch.append(_document(kind, pk, tenant_id, title_text, body_text))
+        if len(batch) == chunk_size:
+            _upsert(batch)
+            count += len(batch)
+            batch = []
+            if progress is not None:
+                progress(count)
+    if batch:
+        _upsert(batch)
+        count += len(batch)
+        if progress is not None:
+            progress(count)
+    return count
+
+
+def rebuild_index(tenant=None, chunk_size=1000, progress=None):
+    """Drop and rebuild the documents of one tenant, or of every tenant.
+
+    ``progress(indexed, total)`` is called after every batch.
+    """
+    documents = SearchDocument.objects.all()
+    if tenant is not None:
+        documents = documents.filter(tenant=tenant)
+    querysets = {}
+    for kind, (model, tenant_lookup, *_) in SEARCH_KINDS.items():
+        queryset = model.objects.all()
+        if tenant is not None:
+            queryset = queryset.filter(**{tenant_lookup: tenant.pk})
+        querysets[kind] = queryset
+    total = sum(queryset.count() for queryset in querysets.values()) if progress is not None else None
+    documents.delete()
+    if progress is not None:
+        progress(0, total)
+    counts, done = {}, 0
+    for kind, queryset in querysets.items():
+        report = None
+        if progress is not None:
+            report = lambda indexed, before=done: progress(before + indexed, total)
+        counts[kind] = index_objects(kind, queryset, chunk_size, report)
+        done += counts[kind]
+    return counts
+
+
+def search(tenant, query, kinds=None, limit=20):
+    """Ranked ``{'type', 'id', 'title', 'score'}`` matches for ``query``.
+
+    A higher score is a better match; ``kinds`` narrows the result types.
+    """
+    words = _words.findall(query.lower())
+    if not words:
+        return []
+    kinds = list(kinds or SEARCH_KINDS)
+    connection = connections[read_alias()]
+    if connection.vendor == 'sqlite':
+        rows = _search_sqlite(connection, tenant.pk, words, kinds, limit)
+    elif connection.vendor == 'postgresql':
+        rows = _search_postgres(connection, tenant.pk, words, kinds, limit)
+    else:
+        rows = _search_fallback(connection.alias, tenant.pk, words, kinds, limit)
+    return [
+        {'type': kind, 'id': object_id, 'title': title, 'score': round(score, 4)}
+        for kind, object_id, title, score in rows
+    ]
+
+
+def _search_sqlite(connection, tenant_id, words, kinds, limit):
+    # quoted prefix terms, so user input can never be FTS5 syntax
+    terms = ' AND '.join(f'"{word}"*' for word in words)
+    match = f'tenant_id : "{tenant_id}" AND {{title body}} : ({terms})'
+    placeholders = ', '.join(['%s'] * len(kinds))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT d.kind, d.object_id, d.title,
+                       -bm25(search_document_fts, 10.0, 1.0, 0.0) AS score
+                FROM search_document_fts
+                JOIN search_document d ON d.id = search_document_fts.rowid
+                WHERE search_document_fts MATCH %s AND d.tenant_id = %s
+                  AND d.kind IN ({placeholders})
+                ORDER BY score DESC, d.id
+                LIMIT %s""",
+            [match, tenant_id, *kinds, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_postgres(connection, tenant_id, words, kinds, limit):
+    placeholders = ', '.join(['%s'] * len(kinds))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""SELECT d.kind, d.object_id, d.title, ts_rank(d.search_vector, q) AS score
+                FROM search_document d, to_tsquery('simple', %s) q
+                WHERE d.search_vector @@ q AND d.tenant_id = %s
+                  AND d.kind IN ({placeholders})
+                ORDER BY score DESC, d.id
+                LIMIT %s""",
+            [' & '.join(f'{word}:*' for word in words), tenant_id, *kinds, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(alias, tenant_id, words, kinds, limit):
+    documents = SearchDocument.objects.using(alias).filter(tenant_id=tenant_id, kind__in=kinds)
+    for word in words:
+        documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return [
+        (kind, object_id, title, 0.0)
+        for kind, object_id, title in documents.order_by('id').values_list('kind', 'object_id', 'title')[:limit]
+    ]
+
+
+def object_saved(sender, instance, created, update_fields=None, **kwargs):
+    kind = KIND_OF_MODEL[sender]
+    _, tenant_lookup, title, body = SEARCH_KINDS[kind]
+    if update_fields is not None and not {title, body} & set(update_fields):
+        return
+    if sender is Task:
+        tenant_id = (
+            instance.project.tenant_id if 'project' in instance._state.fields_cache
+            else Project.objects.filter(pk=instance.project_id).values_list('tenant_id', flat=True).first()
+        )
+    else:
+        tenant_id = instance.tenant_id
+    _upsert([_document(kind, instance.pk, tenant_id, getattr(instance, title), getattr(instance, body))])
+
+
+def object_deleted(sender, instance, origin=None, **kwargs):
+    # a deleted tenant takes its documents with it
+    if isinstance(origin, Tenant):
+        return
+    SearchDocument.objects.filter(kind=KIND_OF_MODEL[sender], object_id=instance.pk).delete()
+
+
+for _model in KIND_OF_MODEL:
+    post_save.connect(object_saved, sender=_model, dispatch_uid=f'search.{_model.__name__}')
+    post_delete.connect(object_deleted, sender=_model, dispatch_uid=f'search.{_model.__name__}')
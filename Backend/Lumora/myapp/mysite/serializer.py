@@ -2,10 +2,14 @@
 "conver between django models and json for Api responses"
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.contrib.auth.password_validation import validate_password, validated_data
-from .models import User,Client, ClientContact, Project, Task, TimeEntry
+from django.contrib.auth.password_validation import validate_password
+from .models import (
+    User, Client, ClientContact, Invoice, InvoiceLine, Job, Project, ProjectTemplate, Task, TaskTemplate,
+    TimeEntry,
+)
 from decimal import Decimal
 from django.db import models
+from .exports import EXPORT_FORMATS, EXPORTS
 
 
 
@@ -101,19 +105,36 @@ class TenantFilteredSerializer(TimestampedSerializer):
         return super().create(validated_data)
 
 
+class AnnotatedReadOnlyField(serializers.ReadOnlyField):
+    """Read-only field that prefers a queryset annotation.
+
+    Falls back to the model attribute (usually a property) when the
+    instance was not loaded through the annotating queryset.
+    """
+
+    def __init__(self, annotation, **kwargs):
+        self.annotation = annotation
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if hasattr(instance, self.annotation):
+            return getattr(instance, self.annotation)
+        return super().get_attribute(instance)
+
+
 class ClientContactSerializer(serializers.ModelSerializer):
     "client contact serializer"
     class Meta:
         model = ClientContact
-        field = ['id','name','email','phone','position','is_primary','created_at']
+        fields = ['id','name','email','phone','position','is_primary','created_at']
         read_only_fields = ['id','created_at']
 
 class ClientListSerializer(TenantFilteredSerializer):
     "client list serializer with basic information"
 
-    total_projects = serializers.ReadOnlyField()
-    active_projects = serializers.ReadOnlyField()
-    total_invoiced = serializers.ReadOnlyField()
+    total_projects = AnnotatedReadOnlyField('num_projects')
+    active_projects = AnnotatedReadOnlyField('num_active_projects')
+    total_invoiced = AnnotatedReadOnlyField('invoiced_sum')
 
     class Meta:
         model = Client
@@ -128,13 +149,13 @@ class ClientDetailSerializer(TenantFilteredSerializer):
 
     contacts = ClientContactSerializer(many=True, read_only=True)
     created_by = UserSerializer(read_only=True)
-    total_projects = serializers.ReadOnlyField()
-    active_projects = serializers.ReadOnlyField()
-    total_invoiced = serializers.ReadOnlyField()
+    total_projects = AnnotatedReadOnlyField('num_projects')
+    active_projects = AnnotatedReadOnlyField('num_active_projects')
+    total_invoiced = AnnotatedReadOnlyField('invoiced_sum')
 
     class Meta:
         model = Client
-        field = [
+        fields = [
             'id', 'name', 'email', 'phone', 'company', 'address',
             'website', 'tax_id', 'status', 'notes', 'contacts',
             'created_by', 'total_projects', 'active_projects',
@@ -171,24 +192,37 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['id','user','created_at']
 
     def create(self,validated_data):
+        # task/project hour rollups are bumped by the post_save handler
         validated_data['user'] = self.context['request'].user
-        time_entry = super().create(validated_data)
-
-                # Update task hours_logged
-        task = time_entry.task
-        task.hours_logged = task.time_entries.aggregate(
-            total=models.Sum('hours')
-        )['total'] or Decimal('0.00')
-        task.save()
-        
-        return time_entry
+        return super().create(validated_data)
+
+
+class TimeEntryBulkSerializer(serializers.ModelSerializer):
+    "one row of a bulk time entry upload; the task is checked against the tenant by the caller"
+    task_id = serializers.IntegerField()
+
+    class Meta:
+        model = TimeEntry
+        fields = ['task_id', 'hours', 'description', 'date']
+
+
+class TimeEntryImportSerializer(TimeEntryBulkSerializer):
+    "one CSV row for the import_time_entries command, which names the user"
+    user_id = serializers.IntegerField()
+
+    class Meta(TimeEntryBulkSerializer.Meta):
+        fields = TimeEntryBulkSerializer.Meta.fields + ['user_id']
 
 
 class TaskListSerializer(serializers.ModelSerializer):
     """Task list serializer"""
     
     assigned_to = UserSerializer(read_only=True)
-    is_overdue = serializers.ReadOnlyField()
+    # Task.objects.with_overdue() computes it in the query
+    is_overdue = AnnotatedReadOnlyField('overdue')
+
+    # columns the properties read, for the values_list() fast path (rowplans.py)
+    row_plan_columns = {'is_overdue': ('due_date', 'status')}
     
     class Meta:
         model = Task
@@ -263,14 +297,36 @@ class TaskCreateUpdateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProjectListSerializer(TenantFilteredSerializer):
+class ProjectClientStatsMixin:
+    "hand client stats annotated on a project row to the nested client"
+
+    client_annotations = ['num_projects', 'num_active_projects', 'invoiced_sum']
+
+    def to_representation(self, instance):
+        # for_listing() annotates client stats as client_<name> on the project
+        for name in self.client_annotations:
+            key = f'client_{name}'
+            if hasattr(instance, key):
+                setattr(instance.client, name, getattr(instance, key))
+        return super().to_representation(instance)
+
+
+class ProjectListSerializer(ProjectClientStatsMixin, TenantFilteredSerializer):
     """Project list serializer"""
     
     client = ClientListSerializer(read_only=True)
-    total_tasks = serializers.ReadOnlyField()
-    completed_tasks = serializers.ReadOnlyField()
+    total_tasks = AnnotatedReadOnlyField('num_tasks')
+    completed_tasks = AnnotatedReadOnlyField('num_completed_tasks')
     progress_percentage = serializers.ReadOnlyField()
-    total_hours_logged = serializers.ReadOnlyField()
+    total_hours_logged = AnnotatedReadOnlyField('hours_logged_sum')
+
+    # columns the properties read, for the values_list() fast path (rowplans.py)
+    row_plan_columns = {
+        'total_tasks': ('task_count',),
+        'completed_tasks': ('completed_task_count',),
+        'progress_percentage': ('task_count', 'completed_task_count'),
+        'total_hours_logged': ('hours_logged_total',),
+    }
     
     class Meta:
         model = Project
@@ -282,17 +338,17 @@ class ProjectListSerializer(TenantFilteredSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ProjectDetailSerializer(TenantFilteredSerializer):
+class ProjectDetailSerializer(ProjectClientStatsMixin, TenantFilteredSerializer):
     """Project detail serializer"""
     
     client = ClientListSerializer(read_only=True)
     tasks = TaskListSerializer(many=True, read_only=True)
     created_by = UserSerializer(read_only=True)
     assigned_to = UserSerializer(many=True, read_only=True)
-    total_tasks = serializers.ReadOnlyField()
-    completed_tasks = serializers.ReadOnlyField()
+    total_tasks = AnnotatedReadOnlyField('num_tasks')
+    completed_tasks = AnnotatedReadOnlyField('num_completed_tasks')
     progress_percentage = serializers.ReadOnlyField()
-    total_hours_logged = serializers.ReadOnlyField()
+    total_hours_logged = AnnotatedReadOnlyField('hours_logged_sum')
     
     class Meta:
         model = Project
@@ -374,6 +430,208 @@ class ProjectCreateUpdateSerializer(TenantFilteredSerializer):
         return project
 
 
+class InvoiceLineSerializer(serializers.ModelSerializer):
+    "invoice line serializer"
+    project_name = serializers.CharField(source='project.name', read_only=True)
+
+    class Meta:
+        model = InvoiceLine
+        fields = ['id', 'project', 'project_name', 'description', 'hours', 'rate', 'amount']
+        read_only_fields = fields
+
+
+class InvoiceListSerializer(TimestampedSerializer):
+    "invoice list serializer"
+    client_name = serializers.CharField(source='client.name', read_only=True)
+
+    class Meta:
+        model = Invoice
+        fields = [
+            'id', 'invoice_number', 'client', 'client_name', 'status',
+            'period_start', 'period_end', 'issue_date', 'due_date', 'total',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class InvoiceDetailSerializer(InvoiceListSerializer):
+    "invoice detail serializer with its lines"
+    lines = InvoiceLineSerializer(many=True, read_only=True)
+
+    class Meta(InvoiceListSerializer.Meta):
+        fields = InvoiceListSerializer.Meta.fields + ['subtotal', 'notes', 'lines']
+        read_only_fields = fields
+
+
+class InvoiceUpdateSerializer(serializers.ModelSerializer):
+    "amounts come from the billed time, so only status, due date and notes are editable"
+
+    class Meta:
+        model = Invoice
+        fields = ['status', 'due_date', 'notes']
+
+
+class TaskTemplateSerializer(serializers.ModelSerializer):
+    "one task of a project template"
+
+    class Meta:
+        model = TaskTemplate
+        fields = ['id', 'title', 'description', 'priority', 'hours_estimated', 'due_offset_days']
+        read_only_fields = ['id']
+
+
+class ProjectTemplateSerializer(TenantFilteredSerializer):
+    """Project template with its tasks.
+
+    ``tasks`` given on update replace the template's tasks.
+    """
+
+    tasks = TaskTemplateSerializer(many=True, required=False)
+
+    class Meta:
+        model = ProjectTemplate
+        fields = [
+            'id', 'name', 'description', 'priority', 'estimated_hours', 'duration_days',
+            'tasks', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def create(self, validated_data):
+        tasks = validated_data.pop('tasks', [])
+        validated_data['created_by'] = self.context['request'].user
+        template = super().create(validated_data)
+        TaskTemplate.objects.bulk_create(TaskTemplate(template=template, **task) for task in tasks)
+        return template
+
+    def update(self, instance, validated_data):
+        tasks = validated_data.pop('tasks', None)
+        template = super().update(instance, validated_data)
+        if tasks is not None:
+            template.tasks.all().delete()
+            TaskTemplate.objects.bulk_create(TaskTemplate(template=template, **task) for task in tasks)
+        return template
+
+
+class ProjectCopySerializer(serializers.Serializer):
+    "where a cloned or templated project goes: client, start date and name"
+    start_date = serializers.DateField()
+    name = serializers.CharField(max_length=200, required=False)
+    client_id = serializers.IntegerField(required=False)
+
+    def validate_client_id(self, value):
+        client = Client.objects.filter(id=value, tenant=self.context['tenant']).first()
+        if client is None:
+            raise serializers.ValidationError('Invalid client ID')
+        return client
+
+
+class TemplateInstantiateSerializer(ProjectCopySerializer):
+    "a project made from a template needs a client"
+    client_id = serializers.IntegerField()
+
+
+class TaskBulkFilterSerializer(serializers.Serializer):
+    "which of the tenant's tasks a bulk update applies to"
+    project = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Give at least one filter.")
+        return attrs
+
+
+class TaskBulkUpdateSerializer(serializers.Serializer):
+    "a bulk task update: the tasks, by ``ids`` or ``filter``, and the changes"
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=5000,
+    )
+    filter = TaskBulkFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    change_fields = ('status', 'priority', 'assigned_to')
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Give either ids or filter.")
+        if not any(field in attrs for field in self.change_fields):
+            raise serializers.ValidationError(
+                f"Nothing to change; give {', '.join(self.change_fields)}."
+            )
+        return attrs
+
+
+class InvoiceGenerateSerializer(serializers.Serializer):
+    "parameters of an invoice run"
+    period_start = serializers.DateField()
+    period_end = serializers.DateField()
+    issue_date = serializers.DateField(required=False)
+    due_days = serializers.IntegerField(required=False, min_value=0, max_value=365, default=30)
+
+    def validate(self, attrs):
+        if attrs['period_start'] > attrs['period_end']:
+            raise serializers.ValidationError("period_start must not be after period_end")
+        return attrs
+
+
+class DateRangeSerializer(serializers.Serializer):
+    "a start..end date range"
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class ExportJobSerializer(serializers.Serializer):
+    "an export written to a file by a background job"
+    resource = serializers.ChoiceField(choices=sorted(EXPORTS))
+    fmt = serializers.ChoiceField(choices=sorted(EXPORT_FORMATS), default='csv')
+    start = serializers.DateField(required=False, allow_null=True, default=None)
+    end = serializers.DateField(required=False, allow_null=True, default=None)
+    project_id = serializers.IntegerField(required=False, allow_null=True, default=None)
+
+
+class TenantDeletionSerializer(serializers.Serializer):
+    "the tenant a deletion job removes, and its batch size"
+    tenant_id = serializers.IntegerField(min_value=1)
+    batch_size = serializers.IntegerField(min_value=1, max_value=10000, default=500)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    "a background job and its progress"
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'payload', 'status', 'priority', 'attempts', 'max_attempts',
+            'progress', 'result', 'error', 'run_after', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, job):
+        percent = None
+        if job.status == Job.SUCCEEDED:
+            percent = 100.0
+        elif job.progress_total:
+            percent = round(job.progress_done * 100 / job.progress_total, 1)
+        return {'done': job.progress_done, 'total': job.progress_total, 'percent': percent}
+
 
+# jobs members may queue through POST /api/jobs/; the others, such as
+# delete_tenant, are only queued by the application itself
+USER_JOB_KINDS = ['export_tenant_data', 'generate_invoices', 'rebuild_daily_rollups', 'rebuild_search_index']
 
 
+class JobCreateSerializer(serializers.Serializer):
+    "a job to enqueue; the payload is checked by the job's own serializer"
+    kind = serializers.ChoiceField(choices=USER_JOB_KINDS)
+    payload = serializers.DictField(required=False, default=dict)
+    priority = serializers.IntegerField(required=False, default=0, min_value=-10, max_value=10)
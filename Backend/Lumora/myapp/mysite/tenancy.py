@@ -0,0 +1,169 @@
+"""Cached tenant and membership lookups.
+
+Every API request resolves its tenant and the user's membership, so both
+lookups go through a small process-local LRU (``TENANT_LOCAL_CACHE_*``)
+in front of Django's cache framework (``TENANT_CACHE_TTL``). Saves and
+deletes of ``Tenant``/``TenantMembership`` evict the affected keys; other
+processes' local caches catch up within ``TENANT_LOCAL_CACHE_TTL``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Tenant, TenantMembership
+
+_MISSING = object()
+
+
+class LocalTTLCache:
+    "thread-safe LRU cache whose entries expire ``ttl`` seconds after being set"
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTTLCache(
+    maxsize=getattr(settings, 'TENANT_LOCAL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TENANT_LOCAL_CACHE_TTL', 30),
+)
+
+
+def _tenant_key(subdomain):
+    return f'tenancy:tenant:{subdomain.lower()}'
+
+
+def _membership_key(tenant_id, user_id):
+    return f'tenancy:membership:{tenant_id}:{user_id}'
+
+
+def _cached(key, load):
+    "Read through the local cache, then the shared cache, then ``load()``"
+    value = local_cache.get(key)
+    if value is not _MISSING:
+        return value
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = load()
+        # misses are cached too, so unknown subdomains cannot hammer the DB
+        cache.set(key, value, getattr(settings, 'TENANT_CACHE_TTL', 300))
+    local_cache.set(key, value)
+    return value
+
+
+def _evict(key):
+    local_cache.delete(key)
+    cache.delete(key)
+
+
+def get_tenant(subdomain):
+    "The tenant for ``subdomain``, or None"
+    return _cached(
+        _tenant_key(subdomain),
+        lambda: Tenant.objects.filter(subdomain__iexact=subdomain).first(),
+    )
+
+
+def get_membership(tenant_id, user_id):
+    "The user's active membership in the tenant, or None"
+    return _cached(
+        _membership_key(tenant_id, user_id),
+        lambda: TenantMembership.objects.filter(
+            tenant_id=tenant_id, user_id=user_id, is_active=True
+        ).first(),
+    )
+
+
+def tenant_subdomain_from_request(request):
+    """The tenant subdomain named by the request, if any.
+
+    A subdomain of ``TENANT_BASE_DOMAIN`` wins over the ``TENANT_HEADER``
+    header; with no base domain configured only the header is used.
+    """
+    base_domain = getattr(settings, 'TENANT_BASE_DOMAIN', None)
+    if base_domain:
+        host = request.get_host().rsplit(':', 1)[0].lower()
+        suffix = '.' + base_domain.lower()
+        if host.endswith(suffix):
+            subdomain = host[:-len(suffix)]
+            if subdomain and '.' not in subdomain:
+                return subdomain
+    header = getattr(settings, 'TENANT_HEADER', 'X-Tenant')
+    return request.headers.get(header) or None
+
+
+def attach_membership(request, user):
+    """Resolve ``user``'s membership in ``request.tenant`` and attach it.
+
+    Sets ``request.tenant_membership`` and ``user.current_tenant``; both are
+    None when the user is not an active member.
+    """
+    tenant = request.tenant
+    membership = get_membership(tenant.pk, user.pk) if tenant is not None else None
+    request.tenant_membership = membership
+    user.current_tenant = tenant if membership is not None else None
+    return membership
+
+
+def forget_tenant(subdomain):
+    "Drop the cached lookup of ``subdomain``, for tenants written without save()"
+    _evict(_tenant_key(subdomain))
+
+
+def clear_caches():
+    local_cache.clear()
+
+
+@receiver(pre_save, sender=Tenant)
+def tenant_saving(sender, instance, **kwargs):
+    # a renamed subdomain must stop resolving under its old name
+    if instance.pk:
+        previous = Tenant.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+        if previous and previous != instance.subdomain:
+            _evict(_tenant_key(previous))
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def tenant_changed(sender, instance, **kwargs):
+    _evict(_tenant_key(instance.subdomain))
+
+
+@receiver(post_save, sender=TenantMembership)
+@receiver(post_delete, sender=TenantMembership)
+def membership_changed(sender, instance, **kwargs):
+    _evict(_membership_key(instance.tenant_id, instance.user_id))
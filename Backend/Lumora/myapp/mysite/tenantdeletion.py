@@ -0,0 +1,126 @@
+"""Tenant deletion in the background.
+
+``schedule_tenant_deletion`` deactivates the tenant at once, so it stops
+resolving and its queued jobs stop running, and queues a ``delete_tenant``
+job. The job removes the tenant's rows bottom-up, children before their
+parents, in batches of ``batch_size`` primary keys. Each batch is one raw
+DELETE: no collector walks the relations and no delete signals are sent,
+so a batch costs the same two statements whatever the tenant holds, and
+locks are held only for one statement.
+
+Every step deletes whatever of the tenant is still there, so an
+interrupted deletion resumes where it stopped when it is run again; the
+worker that picks up a lost job simply starts over the remaining rows.
+The tenant row itself goes last, through the ORM, so its cache entry is
+evicted and anything written meanwhile is removed with it.
+"""
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+
+from .models import (
+    Client, ClientContact, DailyTimeRollup, Invoice, InvoiceLine, Job, OverdueDigest,
+    Project, ProjectTemplate, SearchDocument, Task, TaskTemplate, Tenant, TenantMembership,
+    TimeEntry,
+)
+from .responsecache import bump_tenant_version
+
+# (step, model, lookup from the model to its tenant), in deletion order:
+# every row is deleted before the rows it references
+STEPS = [
+    ('time_entry', TimeEntry, 'task__project__tenant'),
+    ('daily_rollup', DailyTimeRollup, 'tenant'),
+    ('search_document', SearchDocument, 'tenant'),
+    ('overdue_digest', OverdueDigest, 'tenant'),
+    ('invoice_line', InvoiceLine, 'invoice__tenant'),
+    ('invoice', Invoice, 'tenant'),
+    ('task', Task, 'project__tenant'),
+    ('project_member', Project.assigned_to.through, 'project__tenant'),
+    ('project', Project, 'tenant'),
+    ('task_template', TaskTemplate, 'template__tenant'),
+    ('project_template', ProjectTemplate, 'tenant'),
+    ('client_contact', ClientContact, 'client__tenant'),
+    ('client', Client, 'tenant'),
+    ('job', Job, 'tenant'),
+    ('membership', TenantMembership, 'tenant'),
+]
+
+DELETE_JOB = 'delete_tenant'
+
+
+def _remaining(tenant):
+    "step -> queryset of the tenant's rows still to delete"
+    return {
+        name: model.objects.filter(**{lookup: tenant.pk}).order_by()
+        for name, model, lookup in STEPS
+    }
+
+
+def _delete_batch(queryset, batch_size):
+    "Delete up to ``batch_size`` rows of ``queryset`` with one raw DELETE; returns how many"
+    pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+    if pks:
+        queryset.model.objects.filter(pk__in=pks)._raw_delete(queryset.db)
+    return len(pks)
+
+
+def deactivate_tenant(tenant):
+    "Stop ``tenant`` from resolving and from running queued jobs"
+    with transaction.atomic():
+        tenant.is_active = False
+        # save() rather than update(), for the tenant cache signal
+        tenant.save(update_fields=['is_active', 'updated_at'])
+        Job.objects.filter(tenant=tenant, status=Job.QUEUED).update(
+            status=Job.FAILED, error='The tenant is being deleted',
+        )
+    bump_tenant_version(tenant.pk)
+
+
+def schedule_tenant_deletion(tenant, batch_size=500, created_by=None):
+    """Deactivate ``tenant`` and queue the job that deletes it.
+
+    ``created_by``, when given, must be staff or the tenant's owner; the
+    delete_tenant command passes none. A deletion already queued or
+    running for the tenant is returned instead of queueing a second one.
+    """
+    from .jobs import enqueue
+
+    if created_by is not None and not (created_by.is_staff or created_by.pk == tenant.owner_id):
+        raise PermissionDenied("Only staff or the tenant's owner may delete it.")
+    if tenant.is_active:
+        deactivate_tenant(tenant)
+    pending = Job.objects.filter(
+        kind=DELETE_JOB, payload__tenant_id=tenant.pk, status__in=[Job.QUEUED, Job.RUNNING],
+    ).first()
+    if pending is not None:
+        return pending
+    return enqueue(
+        DELETE_JOB, payload={'tenant_id': tenant.pk, 'batch_size': batch_size}, created_by=created_by,
+    )
+
+
+def delete_tenant_data(tenant, batch_size=500, progress=None):
+    """Delete an inactive ``tenant`` and everything it owns, ``batch_size`` rows at a time.
+
+    ``progress(done, total)`` is called after every batch. Returns the
+    number of rows deleted per step.
+    """
+    if tenant.is_active:
+        raise ValueError(f'Tenant {tenant.subdomain!r} is active; deactivate it first')
+    remaining = _remaining(tenant)
+    total = sum(queryset.count() for queryset in remaining.values())
+    done = 0
+    deleted = {}
+    if progress is not None:
+        progress(done, total)
+    for name, queryset in remaining.items():
+        deleted[name] = 0
+        while True:
+            count = _delete_batch(queryset, batch_size)
+            if not count:
+                break
+            deleted[name] += count
+            done += count
+            if progress is not None:
+                progress(done, total)
+    tenant.delete()
+    return deleted
@@ -1,3 +1,1820 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import invoicing, tenancy
+from .db import read_alias, start_request
+from .invoicing import generate_invoices
+from .jobs import claim, enqueue, job, requeue_lost, work
+from .querycount import start_counting
+from .renderers import FastJSONRenderer
+from .tenantdeletion import delete_tenant_data, schedule_tenant_deletion
+from .models import (
+    Client, ClientContact, DailyTimeRollup, Invoice, InvoiceLine, Job, OverdueDigest, Project,
+    ProjectTemplate, SearchDocument, Task, TaskTemplate, Tenant, TenantMembership, TimeEntry,
+)
+
+User = get_user_model()
+
+
+class TenantFixtureMixin:
+    "shared tenant/user fixtures for API tests"
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pw'
+        )
+        self.tenant = Tenant.objects.create(
+            name='Acme', subdomain='acme', owner=self.user
+        )
+        TenantMembership.objects.create(user=self.user, tenant=self.tenant, role='owner')
+        self.user.current_tenant = self.tenant
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.user)
+        cache.clear()
+
+    def make_client(self, index, projects=0):
+        client = Client.objects.create(
+            tenant=self.tenant,
+            name=f'Client {index}',
+            email=f'client{index}@example.com',
+            created_by=self.user,
+        )
+        for p in range(projects):
+            Project.objects.create(
+                tenant=self.tenant,
+                client=client,
+                name=f'Project {index}.{p}',
+                status='active' if p % 2 == 0 else 'planning',
+                start_date='2025-01-01',
+                created_by=self.user,
+            )
+        return client
+
+    def make_tasks(self, project, count, completed=0):
+        for t in range(count):
+            Task.objects.create(
+                project=project,
+                title=f'Task {t}',
+                status='completed' if t < completed else 'todo',
+                hours_logged=Decimal('1.50'),
+                assigned_to=self.user,
+                created_by=self.user,
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries), response
+
+    def assertConstantQueries(self, url, grow, rounds=2):
+        """``url`` must run as many queries after each ``grow()`` as before it.
+
+        Counts come from QueryCountMiddleware's X-Query-Count header, with
+        the response cache cleared so every request renders.
+        """
+        counts = []
+        for round in range(rounds + 1):
+            if round:
+                grow()
+            cache.clear()
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(int(response['X-Query-Count']))
+        self.assertEqual(len(set(counts)), 1, f'{url} ran {counts} queries as its fixtures grew')
+        return counts[0]
+
+
+class ClientStatsTests(TenantFixtureMixin, TestCase):
+
+    def test_with_stats_matches_properties(self):
+        client = self.make_client(1, projects=3)
+        annotated = Client.objects.with_stats().get(pk=client.pk)
+        self.assertEqual(annotated.num_projects, client.total_projects)
+        self.assertEqual(annotated.num_active_projects, client.active_projects)
+
+    def test_client_list_query_count_is_constant(self):
+        self.make_client(1, projects=2)
+        small, response = self.count_queries('/api/clients/')
+        self.assertEqual(response.data[0]['total_projects'], 2)
+        self.assertEqual(response.data[0]['active_projects'], 1)
+
+        for i in range(2, 12):
+            self.make_client(i, projects=3)
+        large, response = self.count_queries('/api/clients/')
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(small, large)
+
+
+class ProjectListingTests(TenantFixtureMixin, TestCase):
+    # projects, clients and every stat come back in a single SELECT, plus
+    # the ETag validator aggregate
+    LIST_QUERY_BUDGET = 2
+
+    def test_project_list_stats(self):
+        client = self.make_client(1, projects=1)
+        self.make_tasks(client.projects.get(), 4, completed=1)
+        _, response = self.count_queries('/api/projects/')
+        row = response.data[0]
+        self.assertEqual(row['total_tasks'], 4)
+        self.assertEqual(row['completed_tasks'], 1)
+        self.assertEqual(row['progress_percentage'], 25.0)
+        self.assertEqual(row['total_hours_logged'], Decimal('6.00'))
+        self.assertEqual(row['client']['total_projects'], 1)
+        self.assertEqual(row['client']['active_projects'], 1)
+
+    def test_project_list_query_budget(self):
+        for i in range(10):
+            client = self.make_client(i, projects=2)
+            for project in client.projects.all():
+                self.make_tasks(project, 3, completed=1)
+        queries, response = self.count_queries('/api/projects/')
+        self.assertEqual(len(response.data), 20)
+        self.assertLessEqual(queries, self.LIST_QUERY_BUDGET)
+
+    def test_project_detail_query_count_is_constant(self):
+        client = self.make_client(1, projects=1)
+        project = client.projects.get()
+        self.make_tasks(project, 2)
+        small, _ = self.count_queries(f'/api/projects/{project.pk}/')
+        self.make_tasks(project, 20)
+        large, response = self.count_queries(f'/api/projects/{project.pk}/')
+        self.assertEqual(len(response.data['tasks']), 22)
+        self.assertEqual(small, large)
+
+
+class RollupCounterTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_client(1, projects=1).projects.get()
+        self.task = Task.objects.create(project=self.project, title='Build', created_by=self.user)
+
+    def log(self, hours, task=None):
+        return TimeEntry.objects.create(
+            task=task or self.task, user=self.user, hours=Decimal(hours), date='2025-01-02'
+        )
+
+    def assertCounters(self, tasks, completed, hours, task_hours=None, entries=None):
+        self.project.refresh_from_db()
+        self.assertEqual(
+            (self.project.task_count, self.project.completed_task_count, self.project.hours_logged_total),
+            (tasks, completed, Decimal(hours)),
+        )
+        if task_hours is not None:
+            self.task.refresh_from_db()
+            self.assertEqual((self.task.hours_logged, self.task.time_entry_count), (Decimal(task_hours), entries))
+
+    def test_time_entries_update_task_and_project(self):
+        first = self.log('2.00')
+        self.log('1.25')
+        self.assertCounters(1, 0, '3.25', task_hours='3.25', entries=2)
+
+        first.hours = Decimal('4.00')
+        first.save()
+        self.assertCounters(1, 0, '5.25', task_hours='5.25', entries=2)
+
+        first.delete()
+        self.assertCounters(1, 0, '1.25', task_hours='1.25', entries=1)
+
+    def test_task_status_and_deletion(self):
+        self.log('2.00')
+        task = Task.objects.get(pk=self.task.pk)
+        task.status = 'completed'
+        task.save()
+        self.assertCounters(1, 1, '2.00')
+
+        # a stale instance must not clobber the counters on save
+        self.log('1.00')
+        task.title = 'Build it'
+        task.save()
+        self.assertCounters(1, 1, '3.00', task_hours='3.00', entries=2)
+
+        task.delete()
+        self.assertCounters(0, 0, '0.00')
+
+    def test_entries_created_from_strings_can_be_saved_again(self):
+        entry = TimeEntry.objects.create(task=self.task, user=self.user, hours='1.50', date='2025-01-02')
+        entry.hours = Decimal('2.00')
+        entry.save()
+        self.assertCounters(1, 0, '2.00', task_hours='2.00', entries=1)
+        self.assertEqual(
+            list(DailyTimeRollup.objects.values_list('date', 'hours', 'entry_count')),
+            [(date(2025, 1, 2), Decimal('2.00'), 1)],
+        )
+
+    def test_deleting_a_user_removes_their_hours(self):
+        member = User.objects.create_user(username='member', email='member@example.com')
+        TimeEntry.objects.create(task=self.task, user=member, hours=Decimal('2.00'), date='2025-01-02')
+        self.log('1.00')
+        member.delete()
+        self.assertCounters(1, 0, '1.00', task_hours='1.00', entries=1)
+        self.assertEqual(
+            list(DailyTimeRollup.objects.values_list('user', 'hours', 'entry_count')),
+            [(self.user.pk, Decimal('1.00'), 1)],
+        )
+
+    def test_rebuild_command(self):
+        self.log('2.00')
+        Project.objects.update(task_count=9, hours_logged_total=Decimal('99'))
+        Task.objects.update(time_entry_count=0)
+        call_command('rebuild_rollups', chunk_size=1, stdout=StringIO())
+        self.assertCounters(1, 0, '2.00', task_hours='2.00', entries=1)
+
+
+class TaskBulkUpdateTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.projects = list(self.make_client(1, projects=2).projects.order_by('pk'))
+        for project in self.projects:
+            self.make_tasks(project, 4, completed=1)
+        self.done = Task.objects.filter(status='completed').order_by('pk').first()
+        self.done.completed_at = timezone.now() - timedelta(days=3)
+        self.done.save()
+
+    def bulk(self, payload, status_code=200):
+        response = self.api.post('/api/tasks/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.data
+
+    def completed_counts(self):
+        return [p.completed_task_count for p in Project.objects.order_by('pk')]
+
+    def test_complete_and_reopen(self):
+        ids = list(Task.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.bulk({'ids': ids, 'status': 'completed', 'priority': 4})
+        self.assertEqual(summary, {'updated': 8, 'projects': 2})
+        # read, update, one counter update per project (plus savepoints)
+        self.assertLessEqual(len([q for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]), 8)
+        self.assertEqual(self.completed_counts(), [4, 4])
+        # already completed tasks keep their completed_at, even an empty one
+        self.assertEqual(Task.objects.filter(completed_at__isnull=True).count(), 1)
+        self.assertEqual(Task.objects.get(pk=self.done.pk).completed_at, self.done.completed_at)
+        self.assertEqual(set(Task.objects.values_list('priority', flat=True)), {4})
+
+        summary = self.bulk({'filter': {'project': self.projects[0].pk}, 'status': 'in_progress'})
+        self.assertEqual(summary, {'updated': 4, 'projects': 1})
+        self.assertEqual(self.completed_counts(), [0, 4])
+        self.assertFalse(Task.objects.filter(project=self.projects[0], completed_at__isnull=False).exists())
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.completed_counts(), [0, 4])
+
+    def test_reassign_by_filter(self):
+        colleague = User.objects.create_user(username='colleague', password='pw')
+        TenantMembership.objects.create(user=colleague, tenant=self.tenant, role='member')
+        summary = self.bulk({'filter': {'assigned_to': self.user.pk}, 'assigned_to': colleague.pk})
+        self.assertEqual(summary['updated'], 8)
+        self.assertEqual(set(Task.objects.values_list('assigned_to', flat=True)), {colleague.pk})
+        # priority and completion untouched
+        self.assertEqual(self.completed_counts(), [1, 1])
+        self.assertIsNotNone(Task.objects.get(pk=self.done.pk).completed_at)
+
+    def test_invalid_requests(self):
+        task = Task.objects.first()
+        self.bulk({'ids': [task.pk], 'filter': {'project': 1}, 'status': 'todo'}, status_code=400)
+        self.bulk({'ids': [task.pk]}, status_code=400)
+        self.bulk({'filter': {}, 'status': 'todo'}, status_code=400)
+        self.assertIn('ids', self.bulk({'ids': [task.pk, 999999], 'status': 'todo'}, status_code=400))
+        outsider = User.objects.create_user(username='outsider', password='pw')
+        self.assertIn('assigned_to', self.bulk({'ids': [task.pk], 'assigned_to': outsider.pk}, status_code=400))
+        self.assertEqual(Task.objects.get(pk=task.pk).status, task.status)
+
+
+class ProjectCloneTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member', password='pw')
+        TenantMembership.objects.create(user=self.member, tenant=self.tenant, role='member')
+
+    def make_project(self, tasks):
+        project = Project.objects.create(
+            tenant=self.tenant, client=self.make_client(len(Client.objects.all())), name='Launch',
+            start_date=date(2025, 1, 1), end_date=date(2025, 3, 1), hourly_rate=Decimal('80.00'),
+            status='active',
+        )
+        project.assigned_to.set([self.user, self.member])
+        Task.objects.bulk_create(
+            Task(project=project, title=f'Step {t}', priority=1 + t % 4, status='completed' if t % 2 else 'todo',
+                 hours_estimated=Decimal('2.50'), due_date=date(2025, 1, 1) + timedelta(days=t) if t % 3 else None,
+                 assigned_to=self.member if t % 2 else None)
+            for t in range(tasks)
+        )
+        return project
+
+    def clone(self, project, payload, status_code=201):
+        response = self.api.post(f'/api/projects/{project.pk}/clone/', payload, format='json')
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.data
+
+    def test_clone_copies_tasks_members_and_shifts_dates(self):
+        source = self.make_project(6)
+        data = self.clone(source, {'start_date': '2025-02-01'})
+        self.assertEqual((data['name'], data['status'], data['total_tasks']), ('Launch (copy)', 'planning', 6))
+
+        copy = Project.objects.get(pk=data['id'])
+        self.assertEqual((copy.start_date, copy.end_date), (date(2025, 2, 1), date(2025, 4, 1)))
+        self.assertEqual(copy.client_id, source.client_id)
+        self.assertCountEqual(copy.assigned_to.all(), [self.user, self.member])
+        self.assertEqual(
+            list(copy.tasks.order_by('pk').values_list('title', 'priority', 'due_date', 'assigned_to', 'status')),
+            [
+                (title, priority, due + timedelta(days=31) if due else None, assignee, 'todo')
+                for title, priority, due, assignee in source.tasks.order_by('pk').values_list(
+                    'title', 'priority', 'due_date', 'assigned_to')
+            ],
+        )
+        # the fixture's bulk_create left the source unindexed; the copy is
+        self.assertEqual(len(self.api.get('/api/search/', {'q': 'step'}).data['results']), 6)
+
+    def test_clone_queries_do_not_grow_with_tasks(self):
+        counts = []
+        for tasks in (3, 60):
+            source = self.make_project(tasks)
+            with CaptureQueriesContext(connection) as ctx:
+                self.clone(source, {'start_date': '2025-06-01', 'name': 'Again'})
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_clone_to_another_client(self):
+        source = self.make_project(1)
+        other = self.make_client(99)
+        self.assertEqual(Project.objects.get(pk=self.clone(source, {'start_date': '2025-01-01', 'client_id': other.pk})['id']).client, other)
+        foreign = Client.objects.create(
+            tenant=Tenant.objects.create(name='Other', subdomain='other', owner=self.user),
+            name='Theirs', email='theirs@example.com',
+        )
+        self.assertIn('client_id', self.clone(source, {'start_date': '2025-01-01', 'client_id': foreign.pk}, 400))
+
+    def test_templates(self):
+        source = self.make_project(4)
+        response = self.api.post(f'/api/projects/{source.pk}/save-template/', {'name': 'Launch kit'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        template = response.data
+        self.assertEqual((template['name'], template['duration_days'], len(template['tasks'])), ('Launch kit', 59, 4))
+        self.assertEqual([task['due_offset_days'] for task in template['tasks']], [None, 1, 2, None])
+
+        client = self.make_client(7)
+        response = self.api.post(
+            f'/api/project-templates/{template["id"]}/instantiate/',
+            {'client_id': client.pk, 'start_date': '2025-05-10'}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        project = Project.objects.get(pk=response.data['id'])
+        self.assertEqual((project.name, project.client, project.end_date), ('Launch kit', client, date(2025, 7, 8)))
+        self.assertEqual(
+            list(project.tasks.order_by('pk').values_list('due_date', flat=True)),
+            [None, date(2025, 5, 11), date(2025, 5, 12), None],
+        )
+        self.assertFalse(project.assigned_to.exists())
+
+        response = self.api.patch(
+            f'/api/project-templates/{template["id"]}/',
+            {'tasks': [{'title': 'Only step', 'due_offset_days': 3}]}, format='json',
+        )
+        self.assertEqual([task['title'] for task in response.data['tasks']], ['Only step'])
+        response = self.api.post('/api/project-templates/', {'name': 'Blank', 'tasks': [{'title': 'One'}]}, format='json')
+        self.assertEqual((response.status_code, len(response.data['tasks'])), (201, 1))
+
+    def test_template_of_a_project_ending_before_it_starts(self):
+        source = self.make_project(1)
+        response = self.api.patch(f'/api/projects/{source.pk}/', {'end_date': '2024-12-01'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.api.post(f'/api/projects/{source.pk}/save-template/', {}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['duration_days'], 0)
+
+
+class OverdueTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member', password='pw')
+        self.today = timezone.now().date()
+        client = self.make_client(1, projects=2)
+        self.first, self.second = client.projects.order_by('pk')
+        day = timedelta(days=1)
+        self.late = [
+            Task.objects.create(project=self.first, title='Late', due_date=self.today - 3 * day, assigned_to=self.member),
+            Task.objects.create(project=self.first, title='Later', due_date=self.today - day, assigned_to=self.user),
+            Task.objects.create(project=self.second, title='Unassigned', due_date=self.today - 2 * day),
+        ]
+        Task.objects.create(project=self.first, title='Done', due_date=self.today - day, status='completed')
+        Task.objects.create(project=self.first, title='Due today', due_date=self.today, assigned_to=self.member)
+        Task.objects.create(project=self.second, title='Undated')
+
+    def test_queryset_agrees_with_property(self):
+        self.assertCountEqual(Task.objects.overdue(), self.late)
+        for task in Task.objects.with_overdue():
+            self.assertEqual(task.overdue, task.is_overdue, task.title)
+        self.assertIn('task_open_due_date_idx', Task.objects.overdue().explain())
+
+    def test_task_list_uses_annotation(self):
+        response = self.api.get('/api/tasks/')
+        flags = {row['title']: row['is_overdue'] for row in response.data}
+        self.assertEqual(flags, {
+            'Late': True, 'Later': True, 'Unassigned': True,
+            'Done': False, 'Due today': False, 'Undated': False,
+        })
+        response = self.api.get('/api/tasks/', {'overdue': 'true'})
+        self.assertCountEqual([row['id'] for row in response.data], [task.pk for task in self.late])
+        response = self.api.get(f'/api/projects/{self.second.pk}/')
+        self.assertEqual({task['title']: task['is_overdue'] for task in response.data['tasks']},
+                         {'Unassigned': True, 'Undated': False})
+
+    def test_digest_command(self):
+        other = Tenant.objects.create(name='Other', subdomain='other', owner=self.member)
+        client = Client.objects.create(tenant=other, name='Theirs', email='theirs@example.com')
+        project = Project.objects.create(tenant=other, client=client, name='Theirs', start_date=self.today)
+        theirs = Task.objects.create(project=project, title='Theirs', due_date=self.today - timedelta(days=5),
+                                     assigned_to=self.member)
+        inactive = Tenant.objects.create(name='Gone', subdomain='gone', owner=self.user, is_active=False)
+        Task.objects.create(
+            project=Project.objects.create(
+                tenant=inactive, client=Client.objects.create(tenant=inactive, name='Gone', email='g@example.com'),
+                name='Gone', start_date=self.today,
+            ),
+            title='Ignored', due_date=self.today - timedelta(days=5),
+        )
+        stale = OverdueDigest.objects.create(
+            tenant=self.tenant, date=self.today - timedelta(days=40), project=self.first,
+            task_ids=[], oldest_due_date=self.today,
+        )
+
+        out = StringIO()
+        call_command('overdue_digest', stdout=out)
+        self.assertIn('Wrote 6 digests for 4 overdue tasks in 2 tenants', out.getvalue())
+        call_command('overdue_digest', stdout=StringIO())
+
+        digests = {
+            (digest.tenant_id, digest.user_id, digest.project_id): (digest.task_ids, digest.oldest_due_date)
+            for digest in OverdueDigest.objects.all()
+        }
+        late, later, unassigned = self.late
+        self.assertEqual(digests, {
+            (self.tenant.pk, self.member.pk, None): ([late.pk], late.due_date),
+            (self.tenant.pk, self.user.pk, None): ([later.pk], later.due_date),
+            (self.tenant.pk, None, self.first.pk): ([late.pk, later.pk], late.due_date),
+            (self.tenant.pk, None, self.second.pk): ([unassigned.pk], unassigned.due_date),
+            (other.pk, self.member.pk, None): ([theirs.pk], theirs.due_date),
+            (other.pk, None, project.pk): ([theirs.pk], theirs.due_date),
+        })
+        self.assertFalse(OverdueDigest.objects.filter(pk=stale.pk).exists())
+
+
+class TimeEntryIngestionTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_client(1, projects=1).projects.get()
+        self.tasks = [
+            Task.objects.create(project=self.project, title=f'Task {i}', created_by=self.user)
+            for i in range(2)
+        ]
+
+    def test_bulk_endpoint_rolls_up_once_per_task(self):
+        payload = [
+            {'task_id': task.pk, 'hours': '1.50', 'date': '2025-01-02'}
+            for task in self.tasks for _ in range(5)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.post('/api/time-entries/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 10)
+        # task lookup, insert, one UPDATE per task and per project,
+        # daily rollup owner lookup and upsert, savepoint
+        self.assertLessEqual(len(ctx.captured_queries), 9)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.hours_logged_total, Decimal('15.00'))
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('hours_logged', 'time_entry_count')),
+            [(Decimal('7.50'), 5), (Decimal('7.50'), 5)],
+        )
+
+    def test_bulk_endpoint_rejects_foreign_tasks(self):
+        payload = [{'task_id': 999999, 'hours': '1.00', 'date': '2025-01-02'}]
+        response = self.api.post('/api/time-entries/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TimeEntry.objects.exists())
+
+    def test_csv_import_streams_chunks_and_skips_bad_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('task_id,user_id,hours,date,description\n')
+            for i in range(7):
+                handle.write(f'{self.tasks[i % 2].pk},{self.user.pk},1.00,2025-01-0{i + 1},row {i}\n')
+            handle.write(f'{self.tasks[0].pk},{self.user.pk},not-hours,2025-01-09,bad\n')
+        self.addCleanup(os.unlink, handle.name)
+        err = StringIO()
+        call_command(
+            'import_time_entries', handle.name, tenant='acme', chunk_size=3,
+            stdout=StringIO(), stderr=err,
+        )
+        self.assertEqual(TimeEntry.objects.count(), 7)
+        self.assertIn('line 9', err.getvalue())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.hours_logged_total, Decimal('7.00'))
+
+
+class TenantResolutionTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tenancy.clear_caches()
+        self.addCleanup(tenancy.clear_caches)
+        cache.clear()
+        # rely on the middleware rather than the fixture's shortcut
+        del self.user.current_tenant
+        self.make_client(1)
+
+    def test_header_resolves_tenant_from_cache(self):
+        response = self.api.get('/api/clients/', HTTP_X_TENANT='acme')
+        self.assertEqual(len(response.data), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/clients/', HTTP_X_TENANT='acme')
+        self.assertEqual(len(response.data), 1)
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('tenants_tenant', tables)
+        self.assertNotIn('tenants_membership', tables)
+
+    def test_unknown_tenant_is_404(self):
+        response = self.api.get('/api/clients/', HTTP_X_TENANT='nope')
+        self.assertEqual(response.status_code, 404)
+
+    def test_membership_changes_invalidate_cache(self):
+        self.assertEqual(self.api.get('/api/clients/', HTTP_X_TENANT='acme').status_code, 200)
+        TenantMembership.objects.filter(user=self.user).delete()
+        self.assertEqual(self.api.get('/api/clients/', HTTP_X_TENANT='acme').status_code, 403)
+
+    def test_renamed_subdomain_stops_resolving(self):
+        self.api.get('/api/clients/', HTTP_X_TENANT='acme')
+        self.tenant.subdomain = 'acme-co'
+        self.tenant.save()
+        self.assertEqual(self.api.get('/api/clients/', HTTP_X_TENANT='acme').status_code, 404)
+        self.assertEqual(self.api.get('/api/clients/', HTTP_X_TENANT='acme-co').status_code, 200)
+
+
+class KeysetPaginationTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_client(1, projects=1).projects.get()
+        self.make_tasks(self.project, 7)
+        # identical sort keys force the id tiebreaker to do its job
+        Task.objects.filter(pk__in=Task.objects.values('pk')[:4]).update(
+            priority=1, created_at='2025-01-01T00:00:00Z'
+        )
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_pages_follow_meta_ordering(self):
+        pages = self.walk('/api/tasks/?page_size=3')
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        walked = [row['id'] for page in pages for row in page['results']]
+        expected = list(Task.objects.order_by('priority', '-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(walked, expected)
+
+        previous = self.api.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+        self.assertIsNotNone(previous['previous'])
+
+    def test_unpaginated_without_params(self):
+        response = self.api.get('/api/tasks/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.api.get('/api/tasks/?cursor=garbage').status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(TestCase):
+    """Fail when a hot query falls back to a full table scan.
+
+    Runs EXPLAIN QUERY PLAN against a seeded, ANALYZEd database so the
+    planner sees realistic selectivity.
+    """
+
+    # a SCAN, with or without an index, visits every row of the table
+    full_scan = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(username=f'seed{i}', email=f'seed{i}@example.com')
+            for i in range(10)
+        ]
+        cls.user = users[0]
+        cls.tenant = Tenant.objects.create(name='Seed', subdomain='seed', owner=cls.user)
+        other = Tenant.objects.create(name='Other', subdomain='other', owner=cls.user)
+        clients = Client.objects.bulk_create(
+            Client(tenant=tenant, name=f'C{i}', email=f'c{i}@example.com')
+            for tenant in (cls.tenant, other) for i in range(20)
+        )
+        statuses = [choice for choice, _ in Project.STATUS_CHOICES]
+        projects = Project.objects.bulk_create(
+            Project(tenant=client.tenant, client=client, name=f'P{i}',
+                    status=statuses[i % len(statuses)], start_date=date(2025, 1, 1))
+            for client in clients for i in range(5)
+        )
+        task_statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        tasks = Task.objects.bulk_create(
+            Task(project=project, title=f'T{i}', status=task_statuses[i % len(task_statuses)],
+                 assigned_to=users[(p + i) % len(users)],
+                 due_date=date(2025, 1, 1) + timedelta(days=i) if i % 2 else None)
+            for p, project in enumerate(projects) for i in range(10)
+        )
+        TimeEntry.objects.bulk_create(
+            TimeEntry(task=task, user=users[(t + i) % len(users)], hours=Decimal('1.00'),
+                      date=date(2025, 1, 1) + timedelta(days=i))
+            for t, task in enumerate(tasks[::4]) for i in range(5)
+        )
+        cls.project = projects[0]
+        cls.task = tasks[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        scans = [line for line in plan.splitlines() if self.full_scan.search(line)]
+        self.assertEqual(scans, [], f'full table scan in:\n{plan}')
+
+    def test_projects_by_tenant_and_status(self):
+        self.assertNoFullScan(Project.objects.filter(tenant=self.tenant, status='active'))
+
+    def test_tasks_by_project_and_status(self):
+        self.assertNoFullScan(Task.objects.filter(project=self.project, status='todo'))
+
+    def test_tasks_by_assignee_and_due_date(self):
+        self.assertNoFullScan(
+            Task.objects.filter(assigned_to=self.user, due_date__lte=date(2025, 1, 5))
+        )
+
+    def test_open_tasks_with_due_date(self):
+        self.assertNoFullScan(
+            Task.objects.filter(due_date__isnull=False, due_date__lt=date(2025, 1, 5))
+            .exclude(status='completed')
+        )
+
+    def test_time_entries_by_task_and_date(self):
+        self.assertNoFullScan(
+            TimeEntry.objects.filter(task=self.task, date__range=(date(2025, 1, 1), date(2025, 1, 3)))
+        )
+
+    def test_time_entries_by_user_and_date(self):
+        self.assertNoFullScan(
+            TimeEntry.objects.filter(user=self.user, date__range=(date(2025, 1, 1), date(2025, 1, 3)))
+        )
+
+    def test_clients_by_tenant(self):
+        self.assertNoFullScan(Client.objects.filter(tenant=self.tenant))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'PRAGMAs are SQLite only')
+class SQLiteTuningTests(TestCase):
+
+    def open_scratch(self, alias):
+        "a connection to a throwaway database file, as ``alias``"
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        default = connections['default']
+        settings_dict = dict(default.settings_dict, NAME=os.path.join(directory.name, 'scratch.sqlite3'))
+        scratch = type(default)(settings_dict, alias=alias)
+        scratch.ensure_connection()
+        self.addCleanup(scratch.close)
+        return scratch
+
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        scratch = self.open_scratch('default')
+        self.assertEqual(self.pragma(scratch, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(scratch, 'synchronous'), 1)
+        self.assertEqual(self.pragma(scratch, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(scratch, 'cache_size'), -64000)
+        self.assertEqual(self.pragma(scratch, 'query_only'), 0)
+
+    def test_read_alias_cannot_write(self):
+        scratch = self.open_scratch('readonly')
+        self.assertEqual(self.pragma(scratch, 'query_only'), 1)
+        with self.assertRaises(OperationalError), scratch.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (id integer)')
+
+    def test_read_alias_falls_back_inside_transactions(self):
+        # TestCase runs every test in a transaction
+        self.assertEqual(read_alias(), 'default')
+        with override_settings(READ_DATABASE=None):
+            self.assertEqual(read_alias(), 'default')
+
+
+class ReadAliasJobSerializer(serializers.Serializer):
+    write = serializers.BooleanField(default=False)
+
+
+@job('test_read_alias', ReadAliasJobSerializer)
+def read_alias_job(tenant, write):
+    if write:
+        Client.objects.filter(tenant=tenant).update(name='Renamed')
+    return router.db_for_read(Client)
+
+
+class ReplicaRoutingTests(TenantFixtureMixin, TransactionTestCase):
+    # the read alias mirrors the default database; its connection only
+    # sees committed rows, as a replica would
+    databases = {'default', 'readonly'}
+
+    def client_queries(self, alias, url):
+        "queries of the clients table on ``alias`` while fetching ``url``"
+        with CaptureQueriesContext(connections[alias]) as ctx:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [q['sql'] for q in ctx.captured_queries if 'clients_client' in q['sql']]
+
+    def test_reads_go_to_the_replica_until_the_client_writes(self):
+        self.make_client(1)
+        self.assertTrue(self.client_queries('readonly', '/api/clients/'))
+
+        response = self.api.post('/api/clients/', {'name': 'New', 'email': 'new@example.com'})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn('pin_primary', response.cookies)
+        self.assertEqual(response.cookies['pin_primary']['max-age'], 5)
+
+        # the pin cookie keeps the follow-up read on the primary
+        self.assertFalse(self.client_queries('readonly', '/api/clients/?page_size=10'))
+        self.assertTrue(self.client_queries('default', '/api/clients/?page_size=20'))
+
+        self.api.cookies.pop('pin_primary')
+        self.assertTrue(self.client_queries('readonly', '/api/clients/?page_size=30'))
+
+    def test_router(self):
+        # the fixtures' writes pinned this context to the primary
+        self.assertEqual(router.db_for_read(Client), 'default')
+        start_request(pinned=False)
+        self.assertEqual(router.db_for_read(Client), 'readonly')
+        self.assertEqual(router.db_for_read(Tenant), 'default')
+        self.assertEqual(router.db_for_write(Client), 'default')
+        self.assertFalse(router.allow_migrate('readonly', 'mysite'))
+
+    def test_only_statements_that_write_pin(self):
+        client = self.make_client(1)
+        start_request(pinned=False)
+        Client.objects.get_or_create(tenant=self.tenant, email=client.email, defaults={'name': 'Unused'})
+        client.validate_constraints()
+        self.assertEqual(router.db_for_read(Client), 'readonly')
+        Client.objects.filter(pk=client.pk).update(name='Renamed')
+        self.assertEqual(router.db_for_read(Client), 'default')
+
+    def test_jobs_read_their_own_writes(self):
+        reader = enqueue('test_read_alias', self.tenant)
+        writer = enqueue('test_read_alias', self.tenant, payload={'write': True})
+        self.assertEqual(work('w', once=True), 2)
+        reader.refresh_from_db()
+        writer.refresh_from_db()
+        self.assertEqual((reader.result, writer.result), ('readonly', 'default'))
+
+
+class ExportTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        project = self.make_client(1, projects=1).projects.get()
+        task = Task.objects.create(project=project, title='Build', created_by=self.user)
+        for day in (1, 2, 3):
+            TimeEntry.objects.create(
+                task=task, user=self.user, hours=Decimal('1.50'), date=date(2025, 1, day)
+            )
+
+    def test_ndjson_time_entries_with_date_filter(self):
+        response = self.api.get('/api/exports/time-entries.ndjson?start=2025-01-02')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['date'] for row in rows], ['2025-01-02', '2025-01-03'])
+        self.assertEqual(rows[0]['hours'], '1.50')
+        self.assertEqual(rows[0]['client_name'], 'Client 1')
+
+    def test_csv_projects(self):
+        response = self.api.get('/api/exports/projects.csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,name,status'))
+        self.assertEqual(len(lines), 2)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.api.get('/api/exports/projects.xml').status_code, 404)
+
+    def test_command_writes_csv(self):
+        out = StringIO()
+        call_command('export_tenant_data', 'time-entries', tenant='acme', end='2025-01-01', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+class DashboardSummaryTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for i in range(5):
+            self.make_client(i, projects=2)
+        Project.objects.filter(pk=Project.objects.values('pk')[:1]).update(status='completed')
+
+    def test_counts_and_recent_rows(self):
+        queries, response = self.count_queries('/api/dashboard/summary/')
+        data = response.data
+        self.assertEqual(data['clients']['count'], 5)
+        self.assertEqual(len(data['clients']['recent']), 3)
+        self.assertEqual(data['clients']['recent'][0]['name'], 'Client 4')
+        self.assertEqual((data['projects']['count'], data['projects']['open']), (10, 9))
+        self.assertEqual(len(data['projects']['recent']), 3)
+        self.assertEqual(data['hours'], {'this_week': Decimal('0.00'), 'this_month': Decimal('0.00')})
+        # counts and recent rows per section, one aggregate for the hours
+        self.assertLessEqual(queries, 7)
+
+        cached, _ = self.count_queries('/api/dashboard/summary/')
+        self.assertEqual(cached, 0)
+
+
+class AsyncViewTests(TenantFixtureMixin, TransactionTestCase):
+    # the query pool's threads only see committed rows
+    databases = {'default', 'readonly'}
+
+    def setUp(self):
+        super().setUp()
+        for i in range(4):
+            self.make_client(i, projects=2)
+        task = Task.objects.create(project=Project.objects.first(), title='Build', created_by=self.user)
+        for day in (1, 2, 2):
+            TimeEntry.objects.create(task=task, user=self.user, hours=Decimal('1.25'), date=date(2025, 1, day))
+
+    def assertSameResponse(self, sync_url, async_url):
+        expected = self.api.get(sync_url)
+        cache.clear()
+        response = self.api.get(async_url)
+        self.assertEqual(expected.status_code, 200, expected.content)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, expected.content)
+
+    def test_same_payload_as_sync_views(self):
+        self.assertSameResponse('/api/dashboard/summary/?recent=5', '/api/dashboard/summary/async/?recent=5')
+        self.assertSameResponse(
+            '/api/reports/time/?group_by=day&start=2025-01-02',
+            '/api/reports/time/async/?group_by=day&start=2025-01-02',
+        )
+
+    def test_query_pool_queries_are_counted(self):
+        expected = self.api.get('/api/dashboard/summary/')
+        cache.clear()
+        response = self.api.get('/api/dashboard/summary/async/')
+        self.assertEqual(response['X-Query-Count'], expected['X-Query-Count'])
+
+    def test_errors_match_sync_views(self):
+        for url in ('/api/reports/time/?group_by=colour', '/api/reports/time/?start=soon'):
+            expected = self.api.get(url)
+            response = self.api.get(url.replace('/?', '/async/?'))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.content, expected.content)
+
+        self.assertEqual(self.api.post('/api/dashboard/summary/async/').status_code, 405)
+        anonymous = APIClient().get('/api/dashboard/summary/async/')
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(anonymous.content, APIClient().get('/api/dashboard/summary/').content)
+
+        outsider = User.objects.create_user(username='outsider', password='pw')
+        api = APIClient()
+        api.force_authenticate(user=outsider)
+        response = api.get('/api/dashboard/summary/async/', HTTP_X_TENANT='acme')
+        self.assertEqual(response.status_code, 403)
+
+
+class SearchTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client_obj = Client.objects.create(
+            tenant=self.tenant, name='Northwind', email='nw@example.com', company='Harbour Traders',
+        )
+        self.project = Project.objects.create(
+            tenant=self.tenant, client=self.client_obj, name='Harbour website',
+            description='Rebuild of the Northwind storefront', start_date='2025-01-01',
+        )
+        self.task = Task.objects.create(project=self.project, title='Design harbour map', description='')
+
+    def search(self, query, status_code=200):
+        response = self.api.get('/api/search/', {'q': query} if isinstance(query, str) else query)
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.data
+
+    def hits(self, query):
+        return [(row['type'], row['id']) for row in self.search(query)['results']]
+
+    def test_ranked_typed_results(self):
+        # titles outrank bodies; words match as prefixes
+        hits = self.hits('harb')
+        self.assertCountEqual(hits[:2], [('project', self.project.pk), ('task', self.task.pk)])
+        self.assertEqual(hits[2:], [('client', self.client_obj.pk)])
+        self.assertEqual(self.hits('northwind'), [('client', self.client_obj.pk), ('project', self.project.pk)])
+        self.assertEqual(self.hits('harbour map'), [('task', self.task.pk)])
+        self.assertEqual(
+            self.search({'q': 'harbour', 'type': 'client,task'})['results'][0]['type'], 'task'
+        )
+        self.assertEqual(self.hits('"harbour" OR NEAR('), [])
+
+    def test_index_follows_writes_and_tenants(self):
+        self.task.title = 'Chart the bay'
+        self.task.save()
+        self.assertEqual(self.hits('map'), [])
+        self.assertEqual(self.hits('bay'), [('task', self.task.pk)])
+
+        self.client_obj.delete()
+        self.assertEqual(self.hits('harbour'), [])
+
+        other = Tenant.objects.create(name='Other', subdomain='other', owner=self.user)
+        Client.objects.create(tenant=other, name='Bay traders', email='bay@example.com')
+        self.assertEqual(self.hits('bay'), [])
+
+    def test_rebuild_command_indexes_bulk_writes(self):
+        Task.objects.bulk_create([Task(project=self.project, title='Quayside signage')])
+        self.assertEqual(self.hits('quayside'), [])
+        call_command('rebuild_search_index', tenant='acme', stdout=StringIO())
+        self.assertEqual(len(self.hits('quayside')), 1)
+        self.assertEqual(len(self.hits('harbour')), 3)
+
+    def test_invalid_parameters(self):
+        self.assertIn('q', self.search({'q': ' '}, status_code=400))
+        self.assertIn('type', self.search({'q': 'harbour', 'type': 'invoice'}, status_code=400))
+
+
+class DailyTimeRollupTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_client(1, projects=1).projects.get()
+        self.task = Task.objects.create(project=self.project, title='Build', created_by=self.user)
+
+    def rollups(self):
+        return list(DailyTimeRollup.objects.order_by('date').values_list('date', 'hours', 'entry_count'))
+
+    def test_entries_update_rollups_incrementally(self):
+        first = TimeEntry.objects.create(task=self.task, user=self.user, hours=Decimal('2.00'), date=date(2025, 1, 1))
+        TimeEntry.objects.create(task=self.task, user=self.user, hours=Decimal('1.00'), date=date(2025, 1, 1))
+        self.assertEqual(self.rollups(), [(date(2025, 1, 1), Decimal('3.00'), 2)])
+
+        first.date = date(2025, 1, 2)
+        first.save()
+        self.assertEqual(self.rollups(), [
+            (date(2025, 1, 1), Decimal('1.00'), 1),
+            (date(2025, 1, 2), Decimal('2.00'), 1),
+        ])
+
+        first.delete()
+        self.assertEqual(self.rollups(), [(date(2025, 1, 1), Decimal('1.00'), 1)])
+
+    def test_rebuild_command_and_report(self):
+        for day in (1, 1, 2):
+            TimeEntry.objects.create(task=self.task, user=self.user, hours=Decimal('1.50'), date=date(2025, 1, day))
+        expected = self.rollups()
+        DailyTimeRollup.objects.all().delete()
+        call_command('rebuild_daily_rollups', start=date(2025, 1, 1), end=date(2025, 1, 3), stdout=StringIO())
+        self.assertEqual(self.rollups(), expected)
+
+        response = self.api.get('/api/reports/time/?group_by=day&start=2025-01-02')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_hours'], Decimal('1.50'))
+        self.assertEqual(response.data['rows'], [{'date': date(2025, 1, 2), 'hours': Decimal('1.50'), 'entries': 1}])
+
+
+class InvoicingTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.tasks = []
+        for i in range(3):
+            project = self.make_client(i, projects=1).projects.get()
+            project.hourly_rate = Decimal('100.00')
+            project.save()
+            task = Task.objects.create(project=project, title='Build', created_by=self.user)
+            for day in (1, 15):
+                TimeEntry.objects.create(
+                    task=task, user=self.user, hours=Decimal('1.25'), date=date(2025, 1, day)
+                )
+            self.tasks.append(task)
+        # no rate: left unbilled
+        unpriced = self.make_client(9, projects=1).projects.get()
+        task = Task.objects.create(project=unpriced, title='Pro bono', created_by=self.user)
+        TimeEntry.objects.create(task=task, user=self.user, hours=Decimal('3.00'), date=date(2025, 1, 2))
+
+    def generate(self):
+        response = self.api.post('/api/invoices/generate/', {
+            'period_start': '2025-01-01', 'period_end': '2025-01-31', 'issue_date': '2025-02-01',
+        }, format='json')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return response.data
+
+    def test_generates_one_invoice_per_client_and_marks_entries_billed(self):
+        summary = self.generate()
+        self.assertEqual((summary['invoices'], summary['lines']), (3, 3))
+        self.assertEqual(summary['total'], Decimal('750.00'))
+        self.assertEqual(summary['unpriced_projects'], 1)
+        self.assertEqual(TimeEntry.objects.filter(invoice_line__isnull=True).count(), 1)
+
+        invoice = Invoice.objects.get(client=self.tasks[0].project.client)
+        self.assertEqual(invoice.total, Decimal('250.00'))
+        self.assertEqual(invoice.due_date, date(2025, 3, 3))
+        self.assertEqual(invoice.lines.get().hours, Decimal('2.50'))
+        self.assertEqual(
+            sorted(Invoice.objects.values_list('invoice_number', flat=True)),
+            ['INV-000001', 'INV-000002', 'INV-000003'],
+        )
+
+    def test_rerun_only_bills_new_hours(self):
+        self.generate()
+        self.assertEqual(self.generate()['invoices'], 0)
+
+        TimeEntry.objects.create(task=self.tasks[1], user=self.user, hours=Decimal('2.00'), date=date(2025, 1, 20))
+        summary = self.generate()
+        self.assertEqual((summary['invoices'], summary['total']), (1, Decimal('200.00')))
+        self.assertEqual(Invoice.objects.latest('id').invoice_number, 'INV-000004')
+
+    def test_client_totals_count_sent_and_paid_invoices(self):
+        self.generate()
+        client = self.tasks[0].project.client
+        self.assertEqual(client.total_invoiced, 0)
+        response = self.api.patch(f'/api/invoices/{client.invoices.get().pk}/', {'status': 'sent'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(client.total_invoiced, Decimal('250.00'))
+        self.assertEqual(Client.objects.with_stats().get(pk=client.pk).invoiced_sum, Decimal('250.00'))
+
+        summary = self.api.get('/api/dashboard/summary/').data['invoices']
+        self.assertEqual((summary['outstanding_count'], summary['outstanding_total']), (3, Decimal('750.00')))
+
+    def test_deleting_an_invoice_releases_its_entries(self):
+        self.generate()
+        self.api.delete(f'/api/invoices/{Invoice.objects.first().pk}/')
+        self.assertEqual(TimeEntry.objects.filter(invoice_line__isnull=True).count(), 3)
+        self.assertEqual(self.generate()['invoices'], 1)
+
+    def test_numbers_follow_invoices_created_meanwhile(self):
+        def other_run(done, total):
+            # another run for the tenant finishing between two chunks
+            if done == 1:
+                Invoice.objects.create(
+                    tenant=self.tenant, client=self.tasks[0].project.client, invoice_number='INV-000002',
+                    period_start=date(2024, 12, 1), period_end=date(2024, 12, 31), issue_date=date(2025, 1, 1),
+                )
+
+        generate_invoices(
+            self.tenant, date(2025, 1, 1), date(2025, 1, 31), chunk_size=1, progress=other_run,
+        )
+        self.assertEqual(
+            sorted(Invoice.objects.values_list('invoice_number', flat=True)),
+            ['INV-000001', 'INV-000002', 'INV-000003', 'INV-000004'],
+        )
+
+    def test_numbers_count_on_past_six_digits(self):
+        client = self.tasks[0].project.client
+        for number, sequence in [('INV-999998', 999998), ('INV-7', None), ('INV-1000000', None)]:
+            # the last two entered by hand: neither counted from nor reused
+            Invoice.objects.create(
+                tenant=self.tenant, client=client, invoice_number=number, sequence=sequence,
+                period_start=date(2024, 12, 1), period_end=date(2024, 12, 31), issue_date=date(2025, 1, 1),
+            )
+        self.generate()
+        TimeEntry.objects.create(task=self.tasks[1], user=self.user, hours=Decimal('2.00'), date=date(2025, 1, 20))
+        self.generate()
+        self.assertEqual(
+            list(
+                Invoice.objects.filter(sequence__gt=999998).order_by('sequence')
+                .values_list('invoice_number', flat=True)
+            ),
+            ['INV-999999', 'INV-1000001', 'INV-1000002', 'INV-1000003'],
+        )
+
+    def test_overlapping_runs_do_not_bill_hours_twice(self):
+        lock_tenant = invoicing._lock_tenant
+        overlapped = {}
+
+        def other_run_first(tenant):
+            # the other run held the lock and billed the period meanwhile
+            if not overlapped:
+                overlapped['run'] = None
+                overlapped['run'] = generate_invoices(tenant, date(2025, 1, 1), date(2025, 1, 31))
+            lock_tenant(tenant)
+
+        with mock.patch.object(invoicing, '_lock_tenant', other_run_first):
+            summary = generate_invoices(self.tenant, date(2025, 1, 1), date(2025, 1, 31))
+        self.assertEqual((overlapped['run']['invoices'], summary['invoices']), (3, 0))
+        self.assertEqual(Invoice.objects.count(), 3)
+        self.assertFalse(Invoice.objects.filter(lines__time_entries__isnull=True).exists())
+
+    def test_chunk_is_rolled_back_when_its_entries_change_meanwhile(self):
+        unbilled = invoicing._InvoiceRun.unbilled
+
+        def changed_meanwhile(run, client_ids):
+            clients = unbilled(run, client_ids)
+            TimeEntry.objects.filter(task=self.tasks[0], date=date(2025, 1, 15)).delete()
+            return clients
+
+        with mock.patch.object(invoicing._InvoiceRun, 'unbilled', changed_meanwhile), \
+                self.assertRaises(invoicing.BillingConflict):
+            generate_invoices(self.tenant, date(2025, 1, 1), date(2025, 1, 31))
+        self.assertFalse(Invoice.objects.exists())
+        self.assertEqual(TimeEntry.objects.filter(invoice_line__isnull=False).count(), 0)
+
+    def test_invoiced_project_cannot_be_deleted_alone(self):
+        self.generate()
+        project = self.tasks[0].project
+        response = self.api.delete(f'/api/projects/{project.pk}/')
+        self.assertEqual(response.status_code, 409, response.content)
+        self.assertIn('invoice lines', response.data['detail'])
+        self.assertTrue(Project.objects.filter(pk=project.pk).exists())
+
+    def test_deleting_an_invoiced_client_removes_its_invoices(self):
+        self.generate()
+        client = self.tasks[0].project.client
+        response = self.api.delete(f'/api/clients/{client.pk}/')
+        self.assertEqual(response.status_code, 204, response.content)
+        self.assertFalse(Project.objects.filter(client_id=client.pk).exists())
+        self.assertFalse(Invoice.objects.filter(client_id=client.pk).exists())
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_command_invoices_every_tenant(self):
+        out = StringIO()
+        call_command('generate_invoices', start=date(2025, 1, 1), end=date(2025, 1, 31), stdout=out)
+        self.assertIn('acme: 3 invoices', out.getvalue())
+        self.assertEqual(Invoice.objects.count(), 3)
+
+
+@job('test_failing')
+def failing_job(tenant):
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Tenant.objects.create(name='Other', subdomain='other', owner=self.user)
+
+    def test_enqueue_and_run_through_api(self):
+        project = self.make_client(1, projects=1).projects.get()
+        project.hourly_rate = Decimal('100.00')
+        project.save()
+        task = Task.objects.create(project=project, title='Build')
+        TimeEntry.objects.create(task=task, user=self.user, hours=Decimal('1.50'), date=date(2025, 1, 3))
+
+        response = self.api.post('/api/jobs/', {'kind': 'nope'}, format='json')
+        self.assertIn('kind', response.data)
+        response = self.api.post('/api/jobs/', {
+            'kind': 'generate_invoices', 'payload': {'period_start': '2025-02-01', 'period_end': '2025-01-01'},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('payload', response.data)
+
+        response = self.api.post('/api/jobs/', {
+            'kind': 'generate_invoices', 'payload': {'period_start': '2025-01-01', 'period_end': '2025-01-31'},
+        }, format='json')
+        self.assertEqual((response.status_code, response.data['status']), (202, 'queued'))
+        enqueue('rebuild_search_index', self.other)
+
+        out = StringIO()
+        call_command('run_workers', processes=1, once=True, stdout=out)
+        self.assertIn('Ran 2 jobs', out.getvalue())
+
+        data = self.api.get(f'/api/jobs/{response.data["id"]}/').data
+        self.assertEqual((data['status'], data['attempts'], data['result']['invoices']), ('succeeded', 1, 1))
+        self.assertEqual(data['progress'], {'done': 1, 'total': 1, 'percent': 100.0})
+        self.assertEqual(Invoice.objects.get().total, Decimal('150.00'))
+        self.assertEqual([job['id'] for job in self.api.get('/api/jobs/').data], [data['id']])
+
+    @override_settings(JOB_TENANT_CONCURRENCY=1)
+    def test_claims_by_priority_within_the_tenant_limit(self):
+        low = enqueue('rebuild_search_index', self.tenant)
+        high = enqueue('rebuild_search_index', self.tenant, priority=5)
+        other = enqueue('rebuild_search_index', self.other)
+        untenanted = enqueue('rebuild_search_index', priority=-1)
+
+        self.assertEqual(claim('w1'), high)
+        self.assertEqual(claim('w2'), other)
+        self.assertEqual(claim('w3'), untenanted)
+        self.assertIsNone(claim('w4'))
+        Job.objects.filter(pk=high.pk).update(status=Job.SUCCEEDED)
+        self.assertEqual(claim('w4'), low)
+        self.assertEqual(Job.objects.get(pk=low.pk).worker, 'w4')
+
+    @override_settings(JOB_RETRY_DELAY=60)
+    def test_retries_then_fails(self):
+        flaky = enqueue('test_failing', self.tenant, max_attempts=2)
+        with self.assertLogs('mysite.jobs', 'ERROR'):
+            self.assertEqual(work('w', once=True), 1)
+        flaky.refresh_from_db()
+        self.assertEqual((flaky.status, flaky.attempts, flaky.error), ('queued', 1, 'RuntimeError: boom'))
+        self.assertGreater(flaky.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(work('w', once=True), 0)
+
+        Job.objects.filter(pk=flaky.pk).update(run_after=timezone.now())
+        with self.assertLogs('mysite.jobs', 'ERROR'):
+            work('w', once=True)
+        flaky.refresh_from_db()
+        self.assertEqual((flaky.status, flaky.attempts), ('failed', 2))
+        self.assertIsNotNone(flaky.finished_at)
+
+        # a kind nobody registered fails without retries
+        gone = Job.objects.create(kind='removed_job', tenant=self.tenant)
+        with self.assertLogs('mysite.jobs', 'ERROR'):
+            work('w', once=True)
+        gone.refresh_from_db()
+        self.assertEqual((gone.status, gone.attempts), ('failed', 1))
+
+    def test_lost_worker_requeues_the_job(self):
+        lost = enqueue('rebuild_search_index', self.tenant)
+        claim('w')
+        Job.objects.filter(pk=lost.pk).update(lease_expires=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_lost(), 1)
+        lost.refresh_from_db()
+        self.assertEqual((lost.status, lost.attempts), ('queued', 1))
+        self.assertIn('lease', lost.error)
+
+    def test_export_job_writes_a_file_to_download(self):
+        project = self.make_client(1, projects=1).projects.get()
+        task = Task.objects.create(project=project, title='Build')
+        for day in (3, 4, 5):
+            TimeEntry.objects.create(task=task, user=self.user, hours=Decimal('1.50'), date=date(2025, 1, day))
+        response = self.api.post('/api/jobs/', {
+            'kind': 'export_tenant_data', 'payload': {'resource': 'time-entries', 'start': '2025-01-04'},
+        }, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        pk = response.data['id']
+        self.assertEqual(self.api.get(f'/api/jobs/{pk}/download/').status_code, 404)
+
+        with tempfile.TemporaryDirectory() as root, override_settings(EXPORT_ROOT=root):
+            self.assertEqual(work('test', once=True), 1)
+            export = Job.objects.get(pk=pk)
+            self.assertEqual(export.status, Job.SUCCEEDED, export.error)
+            self.assertEqual(export.result, {'file': f'acme-time-entries-{pk}.csv', 'lines': 3})
+            self.assertEqual(os.listdir(root), [export.result['file']])
+            response = self.api.get(f'/api/jobs/{pk}/download/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/csv')
+            body = b''.join(response.streaming_content).decode()
+            response.close()
+        self.assertEqual(body.count('2025-01-0'), 2)
+
+    def test_search_rebuild_reports_progress(self):
+        self.make_client(1, projects=2)
+        rebuild = enqueue('rebuild_search_index', self.tenant)
+        work('test', once=True)
+        rebuild.refresh_from_db()
+        self.assertEqual(rebuild.result, {'client': 1, 'project': 2, 'task': 0})
+        self.assertEqual((rebuild.progress_done, rebuild.progress_total), (3, 3))
+
+class TenantArchiveTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw')
+        TenantMembership.objects.create(user=self.member, tenant=self.tenant, role='member')
+        client = self.make_client(1, projects=2)
+        ClientContact.objects.create(client=client, name='Pat', email='pat@example.com')
+        self.project = client.projects.order_by('pk').first()
+        self.project.hourly_rate = Decimal('90.00')
+        self.project.save()
+        self.project.assigned_to.set([self.member])
+        for t in range(3):
+            task = Task.objects.create(project=self.project, title=f'Step {t}', assigned_to=self.member)
+            TimeEntry.objects.create(task=task, user=self.member, hours=Decimal('1.25'), date=date(2025, 1, 2 + t))
+        self.api.post('/api/invoices/generate/', {'period_start': '2025-01-01', 'period_end': '2025-01-02'},
+                      format='json')
+        self.path = os.path.join(tempfile.mkdtemp(), 'acme.ndjson.gz')
+        self.addCleanup(lambda: os.path.exists(self.path) and os.remove(self.path))
+
+    def export(self, **options):
+        call_command('export_tenant_archive', tenant='acme', output=self.path, stdout=StringIO(), **options)
+
+    def test_round_trip(self):
+        self.export(chunk_size=2)
+        with open(self.path, 'rb') as handle:
+            self.assertEqual(handle.read(2), b'\x1f\x8b')
+        users = User.objects.count()
+        out = StringIO()
+        call_command('import_tenant_archive', self.path, subdomain='acme-copy', stdout=out)
+        self.assertIn('3 task, 1 invoice, 1 invoice_line, 3 time_entry', out.getvalue())
+        self.assertEqual(User.objects.count(), users)
+
+        copy = Tenant.objects.get(subdomain='acme-copy')
+        self.assertEqual((copy.name, copy.owner, copy.created_at), ('Acme', self.user, self.tenant.created_at))
+        self.assertCountEqual(copy.members.all(), [self.user, self.member])
+        project = Project.objects.get(tenant=copy, name=self.project.name)
+        self.assertNotEqual(project.pk, self.project.pk)
+        self.assertEqual(
+            (project.client.contacts.get().email, project.task_count, project.hours_logged_total),
+            ('pat@example.com', 3, Decimal('3.75')),
+        )
+        self.assertEqual(list(project.assigned_to.all()), [self.member])
+        self.assertEqual(
+            sorted(TimeEntry.objects.filter(task__project=project).values_list('task__title', 'date', 'user')),
+            sorted(TimeEntry.objects.filter(task__project=self.project).values_list('task__title', 'date', 'user')),
+        )
+        billed = TimeEntry.objects.get(task__project=project, invoice_line__isnull=False)
+        self.assertEqual((billed.date, billed.invoice_line.invoice.tenant), (date(2025, 1, 2), copy))
+        self.assertEqual(DailyTimeRollup.objects.filter(tenant=copy).count(), 3)
+        copy_api = APIClient()
+        copy_api.force_authenticate(user=self.user)
+        response = copy_api.get('/api/search/', {'q': 'step'}, HTTP_X_TENANT='acme-copy')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_subdomain_resolves_as_soon_as_it_is_imported(self):
+        # a copy imported by an earlier test may still be in the local cache
+        tenancy.clear_caches()
+        self.addCleanup(tenancy.clear_caches)
+        self.export()
+        self.assertEqual(self.api.get('/api/projects/', HTTP_X_TENANT='acme-copy').status_code, 404)
+        call_command('import_tenant_archive', self.path, subdomain='acme-copy', stdout=StringIO())
+        self.assertEqual(self.api.get('/api/projects/', HTTP_X_TENANT='acme-copy').status_code, 200)
+
+    def test_missing_users_are_created_without_password(self):
+        self.export()
+        self.member.delete()
+        call_command('import_tenant_archive', self.path, subdomain='acme-copy', stdout=StringIO())
+        member = User.objects.get(username='member')
+        self.assertFalse(member.has_usable_password())
+        self.assertTrue(Task.objects.filter(project__tenant__subdomain='acme-copy', assigned_to=member).exists())
+
+    def test_refuses_truncated_archive_and_taken_subdomain(self):
+        self.export(compress=False)
+        with self.assertRaisesMessage(CommandError, "already exists"):
+            call_command('import_tenant_archive', self.path, stdout=StringIO())
+        with open(self.path) as handle:
+            lines = handle.readlines()
+        with open(self.path, 'w') as handle:
+            handle.writelines(lines[:-2])
+        with self.assertRaisesMessage(CommandError, "truncated"):
+            call_command('import_tenant_archive', self.path, subdomain='acme-copy', stdout=StringIO())
+        self.assertFalse(Tenant.objects.filter(subdomain='acme-copy').exists())
+
+
+@job('test_slow')
+def slow_job(tenant):
+    # one long step, with no progress reported
+    time.sleep(1)
+    return {'requeued': requeue_lost()}
+
+
+class JobLeaseTests(TenantFixtureMixin, TransactionTestCase):
+    # the heartbeat thread has its own connection, which only sees
+    # committed rows
+
+    @override_settings(JOB_LEASE_SECONDS=0.5, JOB_HEARTBEAT_SECONDS=0.1)
+    def test_slow_job_keeps_its_lease_while_running(self):
+        slow = enqueue('test_slow', self.tenant)
+        self.assertEqual(work('w', once=True), 1)
+        slow.refresh_from_db()
+        self.assertEqual((slow.status, slow.attempts, slow.result), ('succeeded', 1, {'requeued': 0}))
+
+
+class TenantDeletionTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pw')
+        TenantMembership.objects.create(user=self.member, tenant=self.tenant, role='member')
+        client = self.make_client(1, projects=2)
+        ClientContact.objects.create(client=client, name='Pat', email='pat@example.com')
+        project = client.projects.order_by('pk').first()
+        project.hourly_rate = Decimal('90.00')
+        project.save()
+        project.assigned_to.set([self.member])
+        for t in range(4):
+            task = Task.objects.create(project=project, title=f'Step {t}', assigned_to=self.member)
+            TimeEntry.objects.create(task=task, user=self.member, hours=Decimal('1.25'), date=date(2025, 1, 2 + t))
+        self.api.post('/api/invoices/generate/', {'period_start': '2025-01-01', 'period_end': '2025-01-03'},
+                      format='json')
+        self.api.post(f'/api/projects/{project.pk}/save-template/', {}, format='json')
+        # a neighbour that must come through untouched
+        self.other = Tenant.objects.create(name='Other', subdomain='other', owner=self.member)
+        other_client = Client.objects.create(tenant=self.other, name='Kept', email='kept@example.com')
+        other_project = Project.objects.create(
+            tenant=self.other, client=other_client, name='Kept', start_date='2025-01-01',
+        )
+        other_task = Task.objects.create(project=other_project, title='Kept')
+        TimeEntry.objects.create(task=other_task, user=self.member, hours=Decimal('2.00'), date=date(2025, 1, 2))
+
+    def assertTenantGone(self):
+        self.assertFalse(Tenant.objects.filter(pk=self.tenant.pk).exists())
+        self.assertFalse(TenantMembership.objects.filter(tenant_id=self.tenant.pk).exists())
+        for model in (Client, Project, DailyTimeRollup, SearchDocument):
+            self.assertFalse(model.objects.exclude(tenant=self.other).exists(), model.__name__)
+        self.assertFalse(InvoiceLine.objects.exists())
+        self.assertEqual(Task.objects.get().title, 'Kept')
+        self.assertEqual(TimeEntry.objects.get().hours, Decimal('2.00'))
+        self.assertEqual(Project.objects.get().hours_logged_total, Decimal('2.00'))
+
+    def test_deactivates_at_once_and_deletes_in_a_job(self):
+        self.assertEqual(self.api.get('/api/projects/', HTTP_X_TENANT='acme').status_code, 200)
+        queued = enqueue('rebuild_search_index', tenant=self.tenant)
+        deletion = schedule_tenant_deletion(self.tenant, batch_size=2)
+        self.assertEqual(schedule_tenant_deletion(self.tenant).pk, deletion.pk)
+        self.assertEqual(self.api.get('/api/projects/', HTTP_X_TENANT='acme').status_code, 404)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.FAILED)
+
+        self.assertEqual(work('test', once=True), 1)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, Job.SUCCEEDED, deletion.error)
+        self.assertEqual(deletion.progress_done, deletion.progress_total)
+        self.assertEqual(deletion.result['deleted']['time_entry'], 4)
+        self.assertTenantGone()
+
+    def test_resumes_after_interruption(self):
+        schedule_tenant_deletion(self.tenant)
+        self.tenant.refresh_from_db()
+        calls = []
+
+        def interrupt(done, total):
+            calls.append(done)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            delete_tenant_data(self.tenant, 3, interrupt)
+        self.assertEqual(TimeEntry.objects.filter(task__project__tenant=self.tenant).count(), 0)
+        self.assertTrue(Task.objects.filter(project__tenant=self.tenant).exists())
+
+        out = StringIO()
+        call_command('delete_tenant', tenant='acme', now=True, batch_size=3, stdout=out)
+        self.assertIn('Deleted acme: ', out.getvalue())
+        self.assertNotIn('time_entry', out.getvalue())
+        self.assertTenantGone()
+
+    def test_only_staff_or_the_owner_may_schedule_it(self):
+        with self.assertRaises(PermissionDenied):
+            schedule_tenant_deletion(self.tenant, created_by=self.member)
+        self.tenant.refresh_from_db()
+        self.assertTrue(self.tenant.is_active)
+        self.assertEqual(schedule_tenant_deletion(self.tenant, created_by=self.user).created_by, self.user)
+
+    def test_members_cannot_queue_it_through_the_api(self):
+        # not even for a tenant that is already inactive
+        self.other.is_active = False
+        self.other.save()
+        response = self.api.post('/api/jobs/', {
+            'kind': 'delete_tenant', 'payload': {'tenant_id': self.other.pk},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('kind', response.data)
+        self.assertFalse(Job.objects.exists())
+
+    def test_refuses_an_active_tenant(self):
+        with self.assertRaisesMessage(ValueError, 'is active'):
+            delete_tenant_data(self.tenant)
+        self.assertTrue(TimeEntry.objects.filter(task__project__tenant=self.tenant).exists())
+
+
+class QueryCountTests(TenantFixtureMixin, TestCase):
+    "every list and detail endpoint renders in the same number of queries whatever the data"
+
+    LIST_URLS = [
+        '/api/clients/', '/api/projects/', '/api/project-templates/', '/api/tasks/',
+        '/api/time-entries/', '/api/invoices/', '/api/jobs/',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.grown = 0
+        self.client_ = self.make_client(0, projects=1)
+        self.project = self.client_.projects.get()
+        self.task = Task.objects.create(project=self.project, title='Anchor', assigned_to=self.user)
+        self.entry = TimeEntry.objects.create(task=self.task, user=self.user, hours=Decimal('1.00'), date=date(2025, 1, 2))
+        self.invoice = Invoice.objects.create(
+            tenant=self.tenant, client=self.client_, invoice_number='INV-0',
+            period_start=date(2025, 1, 1), period_end=date(2025, 1, 31), issue_date=date(2025, 2, 1),
+        )
+        self.template = ProjectTemplate.objects.create(tenant=self.tenant, name='Anchor')
+        self.job = enqueue('rebuild_search_index', tenant=self.tenant)
+        self.grow()
+
+    def grow(self):
+        "add a bit of everything, both new rows and children of the anchor rows"
+        self.grown += 1
+        n = self.grown
+        user = User.objects.create_user(username=f'user{n}', email=f'user{n}@example.com')
+        TenantMembership.objects.create(user=user, tenant=self.tenant, role='member')
+        client = self.make_client(n, projects=1)
+        project = client.projects.get()
+        for owner in (client, self.client_):
+            ClientContact.objects.create(client=owner, name=f'Contact {n}', email=f'contact{n}@example.com')
+        self.project.assigned_to.add(user)
+        for parent in (project, self.project):
+            task = Task.objects.create(project=parent, title=f'Task {n}', assigned_to=user, created_by=user)
+            TimeEntry.objects.create(task=task, user=user, hours=Decimal('2.00'), date=date(2025, 1, n))
+        TimeEntry.objects.create(task=self.task, user=user, hours=Decimal('0.50'), date=date(2025, 1, n))
+        invoice = Invoice.objects.create(
+            tenant=self.tenant, client=client, invoice_number=f'INV-{n}',
+            period_start=date(2025, 1, 1), period_end=date(2025, 1, 31), issue_date=date(2025, 2, 1),
+        )
+        for owner in (invoice, self.invoice):
+            InvoiceLine.objects.create(
+                invoice=owner, project=project, description=project.name,
+                hours=Decimal('2.00'), rate=Decimal('50.00'), amount=Decimal('100.00'),
+            )
+        template = ProjectTemplate.objects.create(tenant=self.tenant, name=f'Template {n}', created_by=user)
+        for owner in (template, self.template):
+            TaskTemplate.objects.create(template=owner, title=f'Step {n}')
+        enqueue('rebuild_search_index', tenant=self.tenant, created_by=user)
+
+    def test_list_endpoints(self):
+        for url in self.LIST_URLS:
+            with self.subTest(url=url):
+                self.assertConstantQueries(url, self.grow)
+
+    def test_detail_endpoints(self):
+        for url in [
+            f'/api/clients/{self.client_.pk}/', f'/api/projects/{self.project.pk}/',
+            f'/api/project-templates/{self.template.pk}/', f'/api/tasks/{self.task.pk}/',
+            f'/api/time-entries/{self.entry.pk}/', f'/api/invoices/{self.invoice.pk}/',
+            f'/api/jobs/{self.job.pk}/',
+        ]:
+            with self.subTest(url=url):
+                self.assertConstantQueries(url, self.grow)
+
+    def test_headers_count_every_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/clients/')
+        self.assertEqual(response['X-Query-Count'], str(len(ctx.captured_queries)))
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[0-9.]+;desc="{len(ctx.captured_queries)} queries"$')
+
+    def test_logs_requests_over_budget(self):
+        with override_settings(QUERY_BUDGETS={'client-list': 0}), \
+                self.assertLogs('mysite.middleware', 'WARNING') as logs:
+            self.api.get('/api/clients/')
+        self.assertIn('GET /api/clients/ (client-list) ran', logs.output[0])
+        with override_settings(QUERY_BUDGETS={}, QUERY_BUDGET=100), \
+                self.assertNoLogs('mysite.middleware', 'WARNING'):
+            self.api.get('/api/clients/')
+        # per-name budgets are for reads; writes are keyed with their method
+        with override_settings(QUERY_BUDGETS={'client-detail': 0, 'DELETE client-detail': 100}), \
+                self.assertNoLogs('mysite.middleware', 'WARNING'):
+            self.api.delete(f'/api/clients/{self.make_client(9).pk}/')
+
+    def test_streaming_responses_are_not_checked(self):
+        with override_settings(QUERY_BUDGET=0), self.assertNoLogs('mysite.middleware', 'WARNING'):
+            response = self.api.get('/api/exports/time-entries.csv')
+            b''.join(response.streaming_content)
+        self.assertFalse(response.has_header('X-Query-Count'))
+
+    def test_concurrent_requests_on_one_thread_count_their_own_queries(self):
+        # how requests share the sync thread under ASGI
+        async def request(queries):
+            counter = start_counting()
+            for _ in range(queries):
+                await sync_to_async(lambda: list(Client.objects.all()))()
+                await asyncio.sleep(0)
+            return counter.count
+
+        async def both():
+            return await asyncio.gather(request(2), request(5))
+
+        self.assertEqual(async_to_sync(both)(), [2, 5])
+
+
+class RowPlanListTests(TenantFixtureMixin, TestCase):
+    "the values_list() fast path must render exactly what the serializers do"
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(username='nobody', email='nobody@example.com')
+        other.profile.delete()
+        for i in range(3):
+            project = self.make_client(i, projects=2).projects.first()
+            project.budget = Decimal('1234.50')
+            project.end_date = date(2025, 6, 30)
+            project.save()
+            self.make_tasks(project, 4, completed=1)
+        Task.objects.filter(pk=Task.objects.order_by('pk').values('pk')[:1]).update(
+            assigned_to=None, status='todo', due_date=date(2020, 1, 1), title='Caf\u00e9 \u2028 line',
+        )
+        Task.objects.filter(pk=Task.objects.order_by('-pk').values('pk')[:1]).update(
+            assigned_to=other, due_date=date(2099, 1, 1),
+        )
+
+    def assertSameBytes(self, url):
+        cache.clear()
+        fast = self.api.get(url)
+        cache.clear()
+        with override_settings(ROW_PLAN_LISTS=False):
+            slow = self.api.get(url)
+        self.assertEqual(fast.status_code, 200, fast.content)
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast.content, JSONRenderer().render(slow.data))
+        return fast
+
+    def test_project_list_matches_serializer(self):
+        response = self.assertSameBytes('/api/projects/')
+        self.assertEqual(len(response.json()), 6)
+        self.assertSameBytes('/api/projects/?page_size=4')
+        cursor = self.api.get('/api/projects/?page_size=4').data['next']
+        self.assertSameBytes(cursor.replace('http://testserver', ''))
+
+    def test_task_list_matches_serializer(self):
+        response = self.assertSameBytes('/api/tasks/')
+        tasks = response.json()
+        self.assertEqual(len(tasks), 12)
+        self.assertTrue(any(task['assigned_to'] is None and task['is_overdue'] for task in tasks))
+        self.assertSameBytes('/api/tasks/?page_size=5')
+
+    def test_list_query_count(self):
+        queries, _ = self.count_queries('/api/tasks/')
+        self.assertEqual(queries, 1)
+
+
+class FastJSONRendererTests(unittest.TestCase):
+
+    def test_matches_stock_renderer(self):
+        from datetime import datetime, timezone as dt_timezone
+        from uuid import UUID
+        from django.utils.translation import gettext_lazy
+
+        payloads = [
+            {'a': 1, 'b': [1.5, None, True], 'c': 'caf\u00e9 \u2028\u2029 "quoted"'},
+            [{'when': datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+              'day': date(2025, 1, 2), 'amount': Decimal('12.50'),
+              'id': UUID(int=7), 'label': gettext_lazy('Active'), 'pair': (1, 2)}],
+            {1: 'non-str key'},
+            {'big': 2 ** 70},
+        ]
+        for payload in payloads:
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(
+            FastJSONRenderer().render({'a': [1]}, 'application/json; indent=2'),
+            JSONRenderer().render({'a': [1]}, 'application/json; indent=2'),
+        )
+
+
+class ResponseCacheTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client_obj = self.make_client(1, projects=1)
+        self.project = self.client_obj.projects.get()
+        self.make_tasks(self.project, 2)
+
+    def get(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response['X-Cache'], response.data
+
+    def test_repeat_reads_are_served_from_cache(self):
+        url = f'/api/projects/{self.project.pk}/'
+        self.assertEqual(self.get(url)[0], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            hit, data = self.get(url)
+        self.assertEqual((hit, len(ctx.captured_queries)), ('HIT', 0))
+        self.assertEqual(len(data['tasks']), 2)
+        # query parameters are part of the key
+        self.assertEqual(self.get('/api/projects/?page_size=1')[0], 'MISS')
+
+    def test_writes_to_tenant_data_invalidate(self):
+        project_url = f'/api/projects/{self.project.pk}/'
+        task = self.project.tasks.first()
+        writes = [
+            lambda: Task.objects.get(pk=task.pk).save(),
+            lambda: ClientContact.objects.create(client=self.client_obj, name='Ann', email='ann@example.com'),
+            lambda: TimeEntry.objects.create(task=Task.objects.get(pk=task.pk), user=self.user,
+                                             hours=Decimal('1.00'), date=date(2025, 1, 1)),
+            lambda: TimeEntry.objects.get().delete(),
+            lambda: self.api.post('/api/time-entries/bulk/', [
+                {'task_id': task.pk, 'hours': '1.00', 'date': '2025-01-02'},
+            ], format='json'),
+        ]
+        for write in writes:
+            self.get(project_url)
+            self.get('/api/clients/')
+            self.assertEqual(self.get(project_url)[0], 'HIT')
+            write()
+            self.assertEqual(self.get(project_url)[0], 'MISS')
+            self.assertEqual(self.get('/api/clients/')[0], 'MISS')
+
+    def test_other_tenants_keep_their_cache(self):
+        self.get('/api/clients/')
+        other = Tenant.objects.create(name='Other', subdomain='other', owner=self.user)
+        Client.objects.create(tenant=other, name='Elsewhere', email='e@example.com')
+        self.assertEqual(self.get('/api/clients/')[0], 'HIT')
+
+    def test_works_with_file_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': backend}):
+                url = f'/api/projects/{self.project.pk}/'
+                self.assertEqual(self.get(url)[0], 'MISS')
+                self.assertEqual(self.get(url)[0], 'HIT')
+                self.project.save()
+                hit, data = self.get(url)
+                self.assertEqual((hit, data['name']), ('MISS', self.project.name))
+
+
+class ConditionalGetTests(TenantFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client_obj = self.make_client(1, projects=1)
+        self.project = self.client_obj.projects.get()
+        self.make_tasks(self.project, 3)
+        self.url = f'/api/projects/{self.project.pk}/'
+
+    def etag(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response['ETag']
+
+    def test_current_copy_gets_304_from_one_aggregate(self):
+        response = self.api.get(self.url)
+        etag = response['ETag']
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response['ETag'], etag)
+
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_deleted_rows_are_not_hidden_by_if_modified_since(self):
+        self.make_client(2, projects=1)
+        response = self.api.get('/api/clients/')
+        self.assertEqual(len(response.data), 2)
+        self.assertFalse(response.has_header('Last-Modified'))
+        Client.objects.get(name='Client 2').delete()
+        response = self.api.get('/api/clients/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_changes_to_children_move_the_etag(self):
+        task = self.project.tasks.first()
+        changes = [
+            lambda: Task.objects.filter(pk=task.pk).get().save(),
+            lambda: TimeEntry.objects.create(task=task, user=self.user, hours=Decimal('1.00'), date=date(2025, 1, 1)),
+            lambda: self.project.tasks.last().delete(),
+            lambda: Project.objects.create(tenant=self.tenant, client=self.client_obj, name='Sibling',
+                                           start_date=date(2025, 1, 1)),
+            lambda: Client.objects.filter(pk=self.client_obj.pk).get().save(),
+        ]
+        etags = {self.etag(self.url)}
+        for change in changes:
+            change()
+            etag = self.etag(self.url)
+            self.assertNotIn(etag, etags)
+            etags.add(etag)
+        # another client's projects leave this one alone
+        self.make_client(2, projects=1)
+        self.assertEqual(self.etag(self.url), etag)
+
+    def test_list_and_client_validators(self):
+        self.assertNotEqual(self.etag('/api/projects/'), self.etag('/api/projects/?page_size=1'))
+        etag = self.etag('/api/clients/')
+        self.assertEqual(self.api.get('/api/clients/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        contact = ClientContact.objects.create(client=self.client_obj, name='Ann', email='ann@example.com')
+        moved = self.etag(f'/api/clients/{self.client_obj.pk}/')
+        contact.phone = '555'
+        contact.save()
+        self.assertNotEqual(self.etag(f'/api/clients/{self.client_obj.pk}/'), moved)
+        self.assertNotEqual(self.etag('/api/clients/'), etag)
+
+    def test_missing_resource_is_still_404(self):
+        self.assertEqual(self.api.get('/api/projects/999999/').status_code, 404)
+        self.assertEqual(self.api.get('/api/projects/nope/').status_code, 404)
@@ -0,0 +1,24 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import async_views, views
+
+router = DefaultRouter()
+router.register('clients', views.ClientViewSet, basename='client')
+router.register('projects', views.ProjectViewSet, basename='project')
+router.register('project-templates', views.ProjectTemplateViewSet, basename='project-template')
+router.register('tasks', views.TaskViewSet, basename='task')
+router.register('time-entries', views.TimeEntryViewSet, basename='time-entry')
+router.register('invoices', views.InvoiceViewSet, basename='invoice')
+router.register('jobs', views.JobViewSet, basename='job')
+
+urlpatterns = [
+    path('time-entries/bulk/', views.TimeEntryBulkView.as_view(), name='time-entry-bulk'),
+    path('dashboard/summary/', views.DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('dashboard/summary/async/', async_views.dashboard_summary, name='dashboard-summary-async'),
+    path('reports/time/', views.TimeReportView.as_view(), name='time-report'),
+    path('reports/time/async/', async_views.time_report_view, name='time-report-async'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('exports/<slug:resource>.<slug:fmt>', views.ExportView.as_view(), name='export'),
+    path('', include(router.urls)),
+]
@@ -1,3 +1,666 @@
-from django.shortcuts import render
+import hashlib
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch, ProtectedError, RestrictedError
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
+from rest_framework import mixins, permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cloning import clone_project, create_template, instantiate_template
+from .dashboard import get_summary
+from .exports import EXPORT_FORMATS, EXPORTS, export_path, stream_export
+from .invoicing import generate_invoices
+from .jobs import enqueue
+from .models import Client, Invoice, Job, Project, ProjectTemplate, Task, TimeEntry
+from .pagination import KeysetPagination
+from .reports import REPORT_GROUPINGS, time_report
+from .responsecache import bump_tenant_version, get_cached, set_cached
+from .rollups import bulk_create_time_entries, bulk_update_tasks
+from .rowplans import get_row_plan
+from .search import SEARCH_KINDS, search
+from .serializer import (
+    ClientCreateUpdateSerializer,
+    ClientDetailSerializer,
+    ClientListSerializer,
+    InvoiceDetailSerializer,
+    InvoiceGenerateSerializer,
+    InvoiceListSerializer,
+    InvoiceUpdateSerializer,
+    JobCreateSerializer,
+    JobSerializer,
+    ProjectCopySerializer,
+    ProjectCreateUpdateSerializer,
+    ProjectDetailSerializer,
+    ProjectListSerializer,
+    ProjectTemplateSerializer,
+    TaskBulkUpdateSerializer,
+    TaskDetailSerializer,
+    TaskListSerializer,
+    TemplateInstantiateSerializer,
+    TimeEntryBulkSerializer,
+    TimeEntrySerializer,
+)
+from .tenancy import attach_membership, get_membership
+
+
+def int_param(params, name):
+    "an optional integer query parameter; 400 when it is not a number"
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise serializers.ValidationError({name: ['A valid integer is required.']})
+
+
+def date_param(params, name):
+    "an optional YYYY-MM-DD query parameter; 400 when it does not parse"
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise serializers.ValidationError({name: ['Date has wrong format. Use YYYY-MM-DD.']})
+    return parsed
+
+
+class TenantScopedMixin:
+    "restrict querysets to the tenant attached to the request user"
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # TenantMiddleware cannot see users that DRF authenticates itself
+        if getattr(request, 'tenant', None) is not None:
+            if getattr(request, 'tenant_membership', None) is None:
+                attach_membership(request, request.user)
+            if request.tenant_membership is None:
+                raise PermissionDenied('You are not a member of this tenant.')
+
+    def get_tenant(self):
+        return getattr(self.request.user, 'current_tenant', None)
+
+    def get_int_param(self, name):
+        return int_param(self.request.query_params, name)
+
+    def get_date_param(self, name):
+        return date_param(self.request.query_params, name)
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The request conflicts with the current state of the data.'
+    default_code = 'conflict'
+
+
+class RestrictedDeleteMixin:
+    "answer a delete refused by an on_delete=RESTRICT/PROTECT reference with 409"
+
+    def perform_destroy(self, instance):
+        try:
+            super().perform_destroy(instance)
+        except (ProtectedError, RestrictedError) as exc:
+            blocking = getattr(exc, 'restricted_objects', None) or exc.protected_objects
+            names = sorted({str(obj._meta.verbose_name_plural).lower() for obj in blocking})
+            raise Conflict(
+                f'This {instance._meta.verbose_name.lower()} is still referenced by '
+                f'{", ".join(names)}; delete those first.'
+            )
+
+
+class RowPlanListMixin:
+    """Render list() from ``values_list()`` rows through a compiled RowPlan.
+
+    The JSON is identical to the serializer's; ``ROW_PLAN_LISTS = False``
+    switches back to the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'ROW_PLAN_LISTS', True):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # keyset cursors are encoded from the ordering columns of each row
+        ordering = getattr(self.paginator, 'get_ordering', None)
+        extra = [field.attname for field, _ in ordering(queryset.model)] if ordering else []
+        plan = get_row_plan(self.get_serializer_class(), queryset, extra)
+        rows = plan.values_list(queryset)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+        return Response(plan.render(rows))
+
+
+class CachedResponseMixin:
+    """Serve list/retrieve from the per-tenant response cache.
+
+    Entries are keyed by the full URL and the tenant's data version, which
+    every save or delete of the tenant's data bumps (see responsecache.py).
+    """
+
+    cached_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        tenant = self.get_tenant()
+        if tenant is None or self.action not in self.cached_actions:
+            return handler(request, *args, **kwargs)
+        key, cached = get_cached(tenant.pk, request.build_absolute_uri())
+        if cached is not None:
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_cached(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """An ETag on list/retrieve; 304 before any serializing.
+
+    The ETag comes from the queryset's ``change_validators()``, a single
+    aggregate over the rows and their children, cached under the tenant's
+    data version like the responses, and also covers the URL and the
+    negotiated format, which shape the body. There is no Last-Modified:
+    the newest ``updated_at`` does not move when a row is deleted, so
+    ``If-Modified-Since`` alone would keep serving it. Only the row counts
+    in the ETag see deletions.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_validator_queryset(self):
+        "the rows the response is built from, without the serializer annotations"
+        queryset = self.get_queryset().model.objects.filter(tenant=self.get_tenant())
+        if self.action == 'retrieve':
+            queryset = queryset.filter(pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return queryset
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if self.get_tenant() is None or self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+        # validators change only with the tenant's data version, so they
+        # are cached alongside the responses
+        key, validators = get_cached(self.get_tenant().pk, request.build_absolute_uri() + '#validators')
+        if validators is None:
+            try:
+                validators = self.get_validator_queryset().change_validators()
+            except (ValueError, TypeError, DjangoValidationError):
+                return handler(request, *args, **kwargs)
+            set_cached(key, validators)
+        if self.action == 'retrieve' and not validators['rows']:
+            # let the handler answer with its 404
+            return handler(request, *args, **kwargs)
+
+        seed = '|'.join([request.build_absolute_uri(), request.accepted_media_type or '']
+                        + [f'{name}={validators[name]}' for name in sorted(validators)])
+        etag = quote_etag(hashlib.md5(seed.encode(), usedforsecurity=False).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        # revalidate every time rather than trusting heuristic freshness
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ClientViewSet(
+    TenantScopedMixin,
+    RestrictedDeleteMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    viewsets.ModelViewSet,
+):
+    "clients of the current tenant, annotated with project/invoice stats"
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return Client.objects.none()
+        queryset = Client.objects.filter(tenant=tenant).with_stats()
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('created_by__profile').prefetch_related('contacts')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ClientListSerializer
+        if self.action == 'retrieve':
+            return ClientDetailSerializer
+        return ClientCreateUpdateSerializer
+
+
+class ProjectViewSet(
+    TenantScopedMixin,
+    RestrictedDeleteMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    RowPlanListMixin,
+    viewsets.ModelViewSet,
+):
+    "projects of the current tenant; list and detail render in constant queries"
+
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return Project.objects.none()
+        queryset = Project.objects.filter(tenant=tenant)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.for_listing()
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('created_by__profile').prefetch_related(
+                Prefetch('tasks', queryset=Task.objects.with_overdue().select_related('assigned_to__profile')),
+                'assigned_to__profile',
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProjectListSerializer
+        if self.action == 'retrieve':
+            return ProjectDetailSerializer
+        return ProjectCreateUpdateSerializer
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        "copy the project with its tasks and members to a new ``start_date``"
+        source = self.get_object()
+        serializer = ProjectCopySerializer(data=request.data, context={'tenant': source.tenant_id})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        project = clone_project(
+            source, data['start_date'], request.user, client=data.get('client_id'), name=data.get('name'),
+        )
+        return Response(
+            ProjectListSerializer(Project.objects.for_listing().get(pk=project.pk)).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=['post'], url_path='save-template')
+    def save_template(self, request, pk=None):
+        "save the project's tasks and estimates as a template"
+        name = request.data.get('name') or None
+        template = create_template(self.get_object(), request.user, name=name)
+        return Response(ProjectTemplateSerializer(template).data, status=status.HTTP_201_CREATED)
+
+
+class ProjectTemplateViewSet(TenantScopedMixin, viewsets.ModelViewSet):
+    "project templates of the current tenant; ``instantiate`` makes a project from one"
+
+    serializer_class = ProjectTemplateSerializer
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return ProjectTemplate.objects.none()
+        return ProjectTemplate.objects.filter(tenant=tenant).prefetch_related('tasks')
+
+    @action(detail=True, methods=['post'])
+    def instantiate(self, request, pk=None):
+        "a new project for ``client_id`` starting on ``start_date``"
+        template = self.get_object()
+        serializer = TemplateInstantiateSerializer(data=request.data, context={'tenant': template.tenant_id})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        project = instantiate_template(
+            template, data['client_id'], data['start_date'], request.user, name=data.get('name'),
+        )
+        return Response(
+            ProjectListSerializer(Project.objects.for_listing().get(pk=project.pk)).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class TaskViewSet(TenantScopedMixin, RowPlanListMixin, viewsets.ReadOnlyModelViewSet):
+    "tasks across the current tenant's projects, optionally ?project=<id> and ?overdue=true"
+
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return Task.objects.none()
+        queryset = Task.objects.filter(project__tenant=tenant).select_related('assigned_to__profile')
+        project = self.get_int_param('project')
+        if project is not None:
+            queryset = queryset.filter(project_id=project)
+        if self.request.query_params.get('overdue') in ('1', 'true'):
+            queryset = queryset.overdue()
+        if self.action == 'list':
+            queryset = queryset.with_overdue()
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('created_by__profile').prefetch_related(
+                Prefetch('time_entries', queryset=TimeEntry.objects.select_related('user__profile'))
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return TaskDetailSerializer
+        return TaskListSerializer
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Change the status, priority or assignee of many tasks at once.
+
+        The tasks are given as ``ids`` or as a ``filter`` on project,
+        status, priority and assignee.
+        """
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        serializer = TaskBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        tasks = Task.objects.filter(project__tenant=tenant)
+        if 'ids' in data:
+            found = set(tasks.filter(pk__in=data['ids']).values_list('pk', flat=True))
+            missing = sorted(set(data['ids']) - found)
+            if missing:
+                raise serializers.ValidationError({'ids': [f'Invalid task IDs: {missing}']})
+            task_ids = sorted(found)
+        else:
+            filters = {
+                'project_id' if name == 'project' else name: value
+                for name, value in data['filter'].items()
+            }
+            task_ids = list(tasks.filter(**filters).values_list('pk', flat=True))
+
+        changes = {field: data[field] for field in serializer.change_fields if field in data}
+        if changes.get('assigned_to') is not None:
+            if get_membership(tenant.pk, changes['assigned_to']) is None:
+                raise serializers.ValidationError({'assigned_to': ['Not a member of this tenant.']})
+        if 'assigned_to' in changes:
+            changes['assigned_to_id'] = changes.pop('assigned_to')
+
+        summary = bulk_update_tasks(task_ids, changes)
+        if summary['updated']:
+            # update() sends no post_save
+            bump_tenant_version(tenant.pk)
+        return Response(summary)
+
+
+class TimeEntryViewSet(TenantScopedMixin, viewsets.ReadOnlyModelViewSet):
+    "time entries across the current tenant, optionally ?task=<id> or ?project=<id>"
+
+    pagination_class = KeysetPagination
+    serializer_class = TimeEntrySerializer
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return TimeEntry.objects.none()
+        queryset = TimeEntry.objects.filter(task__project__tenant=tenant).select_related('user__profile')
+        task = self.get_int_param('task')
+        if task is not None:
+            queryset = queryset.filter(task_id=task)
+        project = self.get_int_param('project')
+        if project is not None:
+            queryset = queryset.filter(task__project_id=project)
+        return queryset
+
+
+class InvoiceViewSet(
+    TenantScopedMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Invoices of the current tenant, optionally ?client=<id>&status=<status>.
+
+    Invoices are created by ``POST /invoices/generate/`` rather than one at
+    a time; deleting one releases its time entries for the next run.
+    """
+
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return Invoice.objects.none()
+        queryset = Invoice.objects.filter(tenant=tenant).select_related('client')
+        client = self.get_int_param('client')
+        if client is not None:
+            queryset = queryset.filter(client_id=client)
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('lines__project')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return InvoiceListSerializer
+        if self.action == 'retrieve':
+            return InvoiceDetailSerializer
+        return InvoiceUpdateSerializer
+
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        "invoice every client for its unbilled hours in the period"
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        serializer = InvoiceGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = generate_invoices(tenant, **serializer.validated_data)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['invoices'] else status.HTTP_200_OK)
+
+
+class JobViewSet(TenantScopedMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Background jobs of the current tenant, optionally ?status=<status>.
+
+    ``POST`` queues a job for ``manage.py run_workers`` and answers 202;
+    poll the job for its progress and result.
+    """
+
+    serializer_class = JobSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        tenant = self.get_tenant()
+        if tenant is None:
+            return Job.objects.none()
+        queryset = Job.objects.filter(tenant=tenant)
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        job = enqueue(
+            data['kind'], tenant, data['payload'], priority=data['priority'], created_by=request.user,
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        "the file a finished export_tenant_data job wrote"
+        job = self.get_object()
+        if job.kind != 'export_tenant_data' or job.status != Job.SUCCEEDED:
+            raise NotFound('This job has no export file.')
+        name = job.result['file']
+        try:
+            handle = open(export_path(name), 'rb')
+        except FileNotFoundError:
+            raise NotFound('The export file is gone.')
+        content_type = EXPORT_FORMATS[job.payload['fmt']]
+        return FileResponse(handle, as_attachment=True, filename=name, content_type=content_type)
+
+
+class TimeEntryBulkView(TenantScopedMixin, APIView):
+    """Log a batch of time entries for the requesting user.
+
+    The batch is validated as a whole, inserted with bulk_create and rolled
+    up into each affected task and project once.
+    """
+
+    max_batch_size = 1000
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of time entries.']})
+        if len(request.data) > self.max_batch_size:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'At most {self.max_batch_size} entries per request.']}
+            )
+        serializer = TimeEntryBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        task_ids = {row['task_id'] for row in rows}
+        task_projects = dict(
+            Task.objects.filter(pk__in=task_ids, project__tenant=self.get_tenant())
+            .values_list('pk', 'project_id')
+        )
+        errors = [
+            {} if row['task_id'] in task_projects else {'task_id': ['Invalid task ID']}
+            for row in rows
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        entries = [TimeEntry(user=request.user, **row) for row in rows]
+        bulk_create_time_entries(entries, task_projects)
+        # bulk_create sends no post_save
+        bump_tenant_version(self.get_tenant().pk)
+        return Response({'created': len(entries)}, status=status.HTTP_201_CREATED)
+
+
+class ExportView(TenantScopedMixin, APIView):
+    """Stream the tenant's time entries or projects as CSV or NDJSON.
+
+    ``/exports/<resource>.<format>`` with optional ``start``/``end`` dates
+    and ``project``; rows are streamed as they are read from the database.
+    """
+
+    def get(self, request, resource, fmt):
+        if resource not in EXPORTS or fmt not in EXPORT_FORMATS:
+            raise NotFound()
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        lines = stream_export(
+            resource, fmt, tenant,
+            start=self.get_date_param('start'),
+            end=self.get_date_param('end'),
+            project_id=self.get_int_param('project'),
+        )
+        response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{tenant.subdomain}-{resource}.{fmt}"'
+        return response
+
+
+def dashboard_params(params, max_recent=20):
+    "get_summary() keyword arguments from the query string"
+    recent = int_param(params, 'recent')
+    return {'recent': 3 if recent is None else max(0, min(recent, max_recent))}
+
+
+def report_params(params):
+    "time_report() keyword arguments from the query string"
+    group_by = params.get('group_by', 'project')
+    if group_by not in REPORT_GROUPINGS:
+        raise serializers.ValidationError(
+            {'group_by': [f'Choose one of: {", ".join(REPORT_GROUPINGS)}.']}
+        )
+    return {
+        'group_by': group_by,
+        'start': date_param(params, 'start'),
+        'end': date_param(params, 'end'),
+        'project_id': int_param(params, 'project'),
+        'user_id': int_param(params, 'user'),
+    }
+
+
+class DashboardSummaryView(TenantScopedMixin, APIView):
+    """Counts and the most recent clients/projects/invoices for the dashboard.
+
+    See async_views.dashboard_summary for the variant running its queries
+    concurrently under ASGI.
+    """
+
+    def get(self, request):
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        return Response(get_summary(tenant, **dashboard_params(request.query_params)))
+
+
+class TimeReportView(TenantScopedMixin, APIView):
+    """Hours per day/project/client/task/user from the daily rollup table.
+
+    ``?group_by=`` plus optional ``start``, ``end``, ``project`` and ``user``.
+    """
+
+    def get(self, request):
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        return Response(time_report(tenant, **report_params(request.query_params)))
+
+
+class SearchView(TenantScopedMixin, APIView):
+    """Ranked clients, projects and tasks matching ``?q=``.
+
+    ``type`` narrows the results to a comma-separated list of kinds and
+    ``limit`` (at most 50) caps them.
+    """
+
+    max_limit = 50
+
+    def get(self, request):
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied('No active tenant.')
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise serializers.ValidationError({'q': ['This parameter is required.']})
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+        if unknown:
+            raise serializers.ValidationError(
+                {'type': [f'Choose from: {", ".join(SEARCH_KINDS)}.']}
+            )
+        limit = self.get_int_param('limit')
+        limit = 20 if limit is None else max(1, min(limit, self.max_limit))
+        return Response({'query': query, 'results': search(tenant, query, kinds, limit)})